@@ -1,12 +1,13 @@
 import sys
 import os
+import json
 import logging
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from concurrent.futures import ThreadPoolExecutor
 import asyncio
 
-from chatbot.models.chatbot import chatbot
+from chatbot.models.chatbot import chatbot, create_answer_cache, astream_chain
 
 # 프로젝트 루트 디렉토리를 Python 경로에 추가
 sys.path.append(
@@ -31,12 +32,35 @@ class ChatResponse(BaseModel):
 # QA Chain 초기화
 qa_chain = chatbot()
 
-# ThreadPoolExecutor 초기화
-executor = ThreadPoolExecutor(max_workers=10)
+# 답변 캐시 초기화 (같거나 매우 비슷한 질문은 체인을 실행하지 않음)
+answer_cache = create_answer_cache()
 
 async def invoke_chatbot(request: str):
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(executor, qa_chain.invoke, request)
+    # 질문 임베딩(CPU 작업)은 이벤트 루프를 막지 않도록 스레드에서 실행
+    if answer_cache is not None:
+        cached = await asyncio.to_thread(answer_cache.lookup, request)
+        if cached is not None:
+            logger.info("Answer cache hit")
+            response, _ = cached
+            return response
+
+    # 검색과 LLM 호출을 스레드 없이 비동기로 실행
+    # 스트리밍과 같은 이벤트로 실행하여 답변과 함께 출처도 캐시에 저장
+    tokens, sources = [], []
+    stream = astream_chain(qa_chain, request)
+    try:
+        async for event, data in stream:
+            if event == "metadata":
+                sources = data["sources"]
+            else:
+                tokens.append(data)
+    finally:
+        await stream.aclose()
+
+    response = "".join(tokens)
+    if answer_cache is not None:
+        await asyncio.to_thread(answer_cache.store, request, response, sources)
+    return response
 
 @app.post("/api/v1/chat/sendMessage", response_model=ChatResponse)
 async def send_message(request: SendMessageRequest):
@@ -49,6 +73,64 @@ async def send_message(request: SendMessageRequest):
         logger.error(f"Chat processing error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data) -> str:
+    # 서버 전송 이벤트(SSE) 형식: event/data 줄 다음 빈 줄
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_chatbot(request: str, http_request: Request):
+    if answer_cache is not None:
+        cached = await asyncio.to_thread(answer_cache.lookup, request)
+        if cached is not None:
+            # 캐시된 답변은 저장된 출처와 함께 하나의 이벤트로 바로 전송
+            logger.info("Answer cache hit")
+            response, sources = cached
+            yield sse_event("metadata", {"sources": sources, "cached": True})
+            yield sse_event("token", {"token": response})
+            yield sse_event("done", {})
+            return
+
+    tokens, sources = [], []
+    stream = astream_chain(qa_chain, request)
+    try:
+        async for event, data in stream:
+            # 클라이언트 연결이 끊기면 스트림을 닫아 LLM 생성도 취소
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling generation")
+                return
+            if event == "metadata":
+                sources = data["sources"]
+                yield sse_event("metadata", {**data, "cached": False})
+            else:
+                tokens.append(data)
+                yield sse_event("token", {"token": data})
+    except Exception as e:
+        logger.error(f"Chat streaming error: {str(e)}")
+        yield sse_event("error", {"detail": str(e)})
+        return
+    finally:
+        await stream.aclose()
+
+    response = "".join(tokens)
+    logger.info(f"Generated response: {response}")
+    if answer_cache is not None:
+        await asyncio.to_thread(answer_cache.store, request, response, sources)
+    yield sse_event("done", {})
+
+@app.post("/api/v1/chat/streamMessage")
+async def stream_message(request: SendMessageRequest, http_request: Request):
+    logger.info(f"Received streaming chat request: {request}")
+    return StreamingResponse(
+        stream_chatbot(request.request, http_request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/v1/chat/cacheStats")
+async def cache_stats():
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
 @app.get("/ping")
 async def ping():
     return {"status": "running"}
@@ -0,0 +1,259 @@
+import os
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    """
+    질문 정규화 (유니코드 NFKC, 소문자 변환, 공백 정리, 끝의 문장부호 제거)
+
+    Args:
+        question (str): 원본 질문
+
+    Returns:
+        str: 정규화된 질문
+    """
+    question = unicodedata.normalize("NFKC", question).lower()
+    question = re.sub(r"\s+", " ", question).strip()
+    return question.rstrip("?!.~ ")
+
+
+def file_index_version(paths: List[str]) -> Callable[[], Tuple]:
+    """
+    인덱스 파일들의 수정 시각/크기로 인덱스 버전을 만드는 함수 반환
+
+    Args:
+        paths (List[str]): 벡터/BM25 인덱스 파일 경로 리스트
+
+    Returns:
+        Callable[[], Tuple]: 현재 인덱스 버전을 반환하는 함수
+    """
+
+    def version() -> Tuple:
+        stamps = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    return version
+
+
+class AnswerCache:
+    """
+    챗봇 답변 캐시 (답변과 함께 검색된 문서의 출처도 저장)
+
+    - 정규화한 질문이 같으면 바로 반환 (exact)
+    - 아니면 질문 임베딩의 코사인 유사도가 similarity_threshold 이상인 질문의 답변 반환 (semantic)
+    - 항목 유효 기간(ttl), 최대 항목 수를 넘으면 가장 오래 사용되지 않은 항목부터 제거(LRU)
+    - 인덱스 버전(벡터/BM25 인덱스 파일)이 바뀌면 전체 무효화
+    - 적중/실패 횟수 집계
+
+    종목명만 다른 질문도 임베딩이 비슷할 수 있으므로 유사도 기준은 높게 유지합니다.
+    """
+
+    def __init__(
+        self,
+        embedding=None,
+        max_entries: int = 1000,
+        ttl: Optional[float] = 3600,
+        similarity_threshold: float = 0.97,
+        index_version: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        답변 캐시 초기화
+
+        Args:
+            embedding: 질문 임베딩에 사용할 LangChain 임베딩 (None이면 exact 매칭만 사용)
+            max_entries (int): 최대 항목 수
+            ttl (float, optional): 항목 유효 기간(초) (None이면 만료 없음)
+            similarity_threshold (float): semantic 매칭 최소 코사인 유사도
+            index_version (Callable, optional): 현재 인덱스 버전을 반환하는 함수
+        """
+        self.embedding = embedding
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.index_version = index_version
+        self._version = index_version() if index_version else None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrix = None  # semantic 매칭용 (질문 키 리스트, 임베딩 행렬)
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _embed(self, key: str) -> Optional[np.ndarray]:
+        """정규화된 질문의 단위 벡터 임베딩 (조회와 저장에서 재사용하도록 메모이즈)"""
+        if self.embedding is None:
+            return None
+        with self._lock:
+            vector = self._embeddings.get(key)
+            if vector is not None:
+                self._embeddings.move_to_end(key)
+                return vector
+
+        vector = np.asarray(self.embedding.embed_query(key), dtype=np.float32)
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        with self._lock:
+            self._embeddings[key] = vector
+            while len(self._embeddings) > self.max_entries * 2:
+                self._embeddings.popitem(last=False)
+        return vector
+
+    def _check_version(self):
+        """인덱스가 갱신되었으면 전체 무효화 (잠금은 호출자가 보유)"""
+        if self.index_version is None:
+            return
+        version = self.index_version()
+        if version != self._version:
+            self._version = version
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def _is_expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl is not None and now - entry["created_at"] > self.ttl
+
+    def _semantic_match(self, vector: np.ndarray, now: float) -> Optional[str]:
+        """유사도가 가장 높은 유효 항목의 키 (잠금은 호출자가 보유)"""
+        if self._matrix is None:
+            keys = list(self._entries)
+            if not keys:
+                return None
+            self._matrix = (
+                keys,
+                np.stack([self._entries[key]["embedding"] for key in keys]),
+            )
+        keys, matrix = self._matrix
+        similarities = matrix @ vector
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.similarity_threshold:
+                return None
+            key = keys[index]
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if self._is_expired(entry, now):
+                self._remove(key)
+                self.expirations += 1
+                continue
+            return key
+        return None
+
+    def lookup(self, question: str) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        캐시된 답변 조회
+
+        Args:
+            question (str): 사용자 질문
+
+        Returns:
+            Optional[Tuple[str, List[Dict[str, Any]]]]: 캐시된 (답변, 출처 리스트) (없으면 None)
+        """
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry, now):
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"], entry["sources"]
+            if self.embedding is None or not self._entries:
+                self.misses += 1
+                return None
+
+        # 임베딩 계산은 잠금 밖에서 수행
+        vector = self._embed(key)
+        with self._lock:
+            match = self._semantic_match(vector, now)
+            if match is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(match)
+            self.semantic_hits += 1
+            entry = self._entries[match]
+            return entry["answer"], entry["sources"]
+
+    def store(
+        self,
+        question: str,
+        answer: str,
+        sources: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """
+        답변 저장
+
+        Args:
+            question (str): 사용자 질문
+            answer (str): 생성된 답변
+            sources (List[Dict[str, Any]], optional): 답변에 사용한 문서의 출처
+                (chatbot.document_sources 형식)
+        """
+        key = normalize_question(question)
+        vector = self._embed(key)
+        with self._lock:
+            self._check_version()
+            self._entries[key] = {
+                "answer": answer,
+                "sources": list(sources or []),
+                "embedding": vector,
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """모든 항목 삭제"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        캐시 통계 반환
+
+        Returns:
+            Dict[str, Any]: 적중(exact/semantic)/실패 횟수, 적중률, 제거/만료/무효화 횟수, 항목 수
+        """
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
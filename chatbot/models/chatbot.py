@@ -1,17 +1,20 @@
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from langchain.retrievers import BM25Retriever, EnsembleRetriever
+from langchain.retrievers import EnsembleRetriever
 from langchain_core.documents import Document
 import chromadb
 from chromadb.config import Settings
 import logging
 import subprocess
 import os
+from functools import lru_cache
 from .prompt_template import PROMPT_TEMPLATE
+from .answer_cache import AnswerCache, file_index_version
+from src.embeddings import load_embeddings
+from src.bm25_index import PersistentBM25Retriever, open_bm25_index
 from dotenv import load_dotenv
 
 # 로깅 설정
@@ -24,8 +27,43 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
+@lru_cache(maxsize=None)
 def load_embedding_model(model_name="jhgan/ko-sbert-sts"):
-    return HuggingFaceEmbeddings(model_name=model_name)
+    # EMBEDDING_BACKEND 환경 변수로 torch/onnx/onnx-int8 백엔드 선택
+    # 벡터스토어와 답변 캐시가 같은 모델 인스턴스를 공유하도록 캐시
+    return load_embeddings(model_name)
+
+
+def create_answer_cache(local_db_path="./data/vectordb"):
+    """
+    챗봇 답변 캐시 생성
+
+    환경 변수:
+        ANSWER_CACHE_DISABLED: 1이면 캐시를 사용하지 않음
+        ANSWER_CACHE_MAX_ENTRIES: 최대 항목 수 (기본값: 1000)
+        ANSWER_CACHE_TTL: 답변 유효 기간(초) (기본값: 3600)
+        ANSWER_CACHE_SIMILARITY: semantic 매칭 최소 코사인 유사도 (기본값: 0.97)
+    """
+    if os.environ.get("ANSWER_CACHE_DISABLED") == "1":
+        return None
+
+    # 벡터 DB나 BM25 인덱스 파일이 바뀌면 캐시된 답변을 모두 무효화
+    index_version = file_index_version(
+        [
+            os.path.join(local_db_path, "chroma.sqlite3"),
+            os.path.join(
+                os.environ.get("BM25_INDEX_PATH", "data/vectordb/bm25_index"),
+                "meta.json",
+            ),
+        ]
+    )
+    return AnswerCache(
+        embedding=load_embedding_model(),
+        max_entries=int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 1000)),
+        ttl=float(os.environ.get("ANSWER_CACHE_TTL", 3600)),
+        similarity_threshold=float(os.environ.get("ANSWER_CACHE_SIMILARITY", 0.97)),
+        index_version=index_version,
+    )
 
 
 def load_vectorstore(vectordb_path=None):
@@ -151,6 +189,49 @@ def create_prompt():
     return PromptTemplate.from_template(PROMPT_TEMPLATE)
 
 
+# 스트리밍 이벤트에서 컨텍스트 검색 결과를 구분하기 위한 리트리버 실행 이름
+RETRIEVER_RUN_NAME = "context_retriever"
+
+
+def document_sources(docs):
+    """검색된 문서의 출처 정보 (중복 제거, 검색 순서 유지)"""
+    sources = []
+    for doc in docs:
+        metadata = doc.metadata or {}
+        source = {
+            "source": metadata.get("source"),
+            "type": metadata.get("type"),
+            "page": metadata.get("page_number", metadata.get("page")),
+        }
+        if source not in sources:
+            sources.append(source)
+    return sources
+
+
+async def astream_chain(qa_chain, question):
+    """
+    체인을 스트리밍 실행하여 (이벤트 이름, 데이터)를 생성
+
+    검색이 끝나면 ("metadata", {"sources": [...]})를, 이후 LLM 토큰마다
+    ("token", 토큰 문자열)을 생성합니다. 제너레이터를 닫으면 LLM 스트림도 취소됩니다.
+    """
+    events = qa_chain.astream_events(question, version="v2")
+    try:
+        async for event in events:
+            if (
+                event["event"] == "on_retriever_end"
+                and event["name"] == RETRIEVER_RUN_NAME
+            ):
+                docs = event["data"].get("output") or []
+                yield "metadata", {"sources": document_sources(docs)}
+            elif event["event"] == "on_chat_model_stream":
+                token = event["data"]["chunk"].content
+                if token:
+                    yield "token", token
+    finally:
+        await events.aclose()
+
+
 def create_chain(retriever):
     llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0)
 
@@ -176,9 +257,21 @@ def create_chain(retriever):
             print(f"Error in retrieve_and_format: {str(e)}")
             return "문서 검색 중 오류가 발생했습니다."
 
+    async def aretrieve_and_format(question: str) -> str:
+        try:
+            # 비동기 검색 (BM25/임베딩 같은 CPU 작업은 각 리트리버가 스레드로 넘김)
+            # 스트리밍 시 검색 결과 이벤트를 찾을 수 있도록 실행 이름을 지정
+            docs = await retriever.ainvoke(question, {"run_name": RETRIEVER_RUN_NAME})
+            return "\n\n".join(doc.page_content for doc in docs)
+
+        except Exception as e:
+            print(f"Error in aretrieve_and_format: {str(e)}")
+            return "문서 검색 중 오류가 발생했습니다."
+
     chain = (
         {
-            "context": RunnableLambda(retrieve_and_format),
+            # invoke는 동기 함수, ainvoke/astream은 비동기 함수를 사용
+            "context": RunnableLambda(retrieve_and_format, afunc=aretrieve_and_format),
             "question": RunnablePassthrough(),
         }
         | create_prompt()
@@ -201,21 +294,12 @@ def initialize_retrievers(vectorstore):
     )
 
     try:
-        # Chroma에서 모든 문서를 가져오는 올바른 방법
-        collection = vectorstore._collection
-        result = collection.get()
-
-        documents = []
-        for i in range(len(result["documents"])):
-            doc = result["documents"][i]
-            metadata = result["metadatas"][i] if result["metadatas"] else {}
-            # 문서 내용이 너무 짧은 경우 제외
-            if len(str(doc).strip()) > 50:
-                documents.append(Document(page_content=doc, metadata=metadata))
-
-        if documents:
-            bm25_retriever = BM25Retriever.from_documents(documents)
-            bm25_retriever.k = 8  # BM25도 동일하게 k값 증가
+        # 인제스트 때 갱신되는 디스크 BM25 인덱스를 사용 (첫 검색 때 파일을 열기)
+        bm25_index = open_bm25_index()
+        if bm25_index.exists():
+            bm25_retriever = PersistentBM25Retriever(
+                index=bm25_index, k=8  # BM25도 동일하게 k값 증가
+            )
 
             # 앙상블 리트리버의 가중치 조정
             ensemble_retriever = EnsembleRetriever(
@@ -225,7 +309,10 @@ def initialize_retrievers(vectorstore):
             logger.info("앙상블 리트리버 초기화 성공")
             return ensemble_retriever
         else:
-            logger.warning("문서가 없어 Chroma 리트리버만 사용")
+            logger.warning(
+                f"BM25 인덱스가 없어 Chroma 리트리버만 사용: {bm25_index.directory} "
+                "(python -m src.bm25_index 로 생성)"
+            )
             return chroma_retriever
 
     except Exception as e:
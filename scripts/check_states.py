@@ -1,30 +1,46 @@
-import json
+import os
+import sys
 from pathlib import Path
 
+# 프로젝트 루트 디렉토리를 파이썬 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.state_store import open_state_store
+
 
 def check_processed_states():
-    processed_states_path = Path("./data/vectordb/processed_states.json")
+    persist_directory = Path("./data/vectordb")
 
-    if not processed_states_path.exists():
-        print("Error: processed_states.json not found!")
+    if (
+        not (persist_directory / "processed_states.sqlite3").exists()
+        and not (persist_directory / "processed_states.json").exists()
+    ):
+        print("Error: processed states not found!")
         return False
 
-    with open(processed_states_path, "r", encoding="utf-8") as f:
-        states = json.load(f)
+    # 문서 상태를 하나씩 읽어 전체 상태를 메모리에 올리지 않음
+    state_store = open_state_store(str(persist_directory))
+    states = state_store.iter_states(parsing_processed=True)
 
     has_errors = False
-    for pdf_file, state in states.items():
+    for pdf_file, state in states:
         print(f"\nChecking {pdf_file}:")
-        print(f"- Text summaries: {len(state['text_summary'])}")
-        print(f"- Image summaries: {len(state['image_summary'])}")
-        print(f"- Table summaries: {len(state['table_summary'])}")
+        print(f"- Text summaries: {len(state.get('text_summary', {}))}")
+        print(f"- Image summaries: {len(state.get('image_summary', {}))}")
+        print(f"- Table summaries: {len(state.get('table_summary', {}))}")
 
         if not any(
-            [state["text_summary"], state["image_summary"], state["table_summary"]]
+            [
+                state.get("text_summary"),
+                state.get("image_summary"),
+                state.get("table_summary"),
+            ]
         ):
             print(f"Warning: No summaries found for {pdf_file}")
             has_errors = True
 
+    print(f"\n{state_store.status_counts()}")
+    state_store.close()
     return not has_errors
 
 
@@ -0,0 +1,132 @@
+import argparse
+import hashlib
+import logging
+import os
+import sys
+
+# 프로젝트 루트 디렉토리를 파이썬 경로에 추가
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import chromadb
+from src.vectorstore import document_id
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def load_records(collection, page_size: int = 1000):
+    """컬렉션의 ID, 메타데이터, 문서를 page_size개씩 읽어 하나씩 반환합니다."""
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["metadatas", "documents"], limit=page_size, offset=offset
+        )
+        if not page["ids"]:
+            return
+        yield from zip(page["ids"], page["metadatas"], page["documents"])
+        offset += len(page["ids"])
+
+
+def dedup_collection(
+    persist_directory: str = "./data/vectordb",
+    collection_name: str = "pdf_collection",
+    batch_size: int = 1000,
+    dry_run: bool = False,
+):
+    """기존 컬렉션의 중복 벡터를 제거하고 남은 벡터를 결정적 ID로 옮깁니다.
+
+    (source, type, index, 내용)이 같은 벡터는 하나만 남깁니다. 남은 벡터의 ID가
+    VectorStore.upsert_documents가 생성하는 ID와 다르면 임베딩을 그대로 복사해
+    결정적 ID로 다시 저장하므로, 이후 upsert는 이 벡터들을 건너뜁니다.
+    index가 없는 문서(PDF 청크)는 같은 (source, type) 안에서의 순서를 index로 사용합니다.
+
+    Args:
+        persist_directory (str): 벡터스토어 디렉토리
+        collection_name (str): 정리할 컬렉션 이름
+        batch_size (int): 한 번에 읽고 쓸 벡터 수
+        dry_run (bool): True이면 변경하지 않고 결과만 출력
+    """
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_collection(collection_name)
+    total = collection.count()
+    logger.info(f"컬렉션 '{collection_name}' 벡터 수: {total}")
+
+    # 내용 기준 키별로 첫 번째 벡터를 남기고 나머지는 중복으로 처리
+    kept = {}  # 내용 키 -> (기존 ID, 결정적 ID)
+    duplicate_ids = []
+    ordinals = {}
+    for record_id, metadata, content in load_records(collection, batch_size):
+        metadata = metadata or {}
+        source, doc_type = metadata.get("source"), metadata.get("type")
+        content_hash = hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+        index = metadata.get("index")
+        # 경로에 따라 index가 숫자 또는 문자열로 저장되어 있으므로 문자열로 비교
+        key = (source, doc_type, None if index is None else str(index), content_hash)
+
+        if key in kept:
+            # 결정적 ID를 가진 벡터가 있으면 그 벡터를 남김
+            kept_id, stable_id = kept[key]
+            if record_id == stable_id:
+                duplicate_ids.append(kept_id)
+                kept[key] = (record_id, stable_id)
+            else:
+                duplicate_ids.append(record_id)
+            continue
+
+        if index is None:
+            index = ordinals.get((source, doc_type), 0)
+            ordinals[(source, doc_type)] = index + 1
+        kept[key] = (record_id, document_id(source, doc_type, index, content or ""))
+
+    renames = [(old_id, new_id) for old_id, new_id in kept.values() if old_id != new_id]
+    logger.info(f"중복 벡터: {len(duplicate_ids)}개")
+    logger.info(f"결정적 ID로 옮길 벡터: {len(renames)}개")
+    if dry_run:
+        return
+
+    for start in range(0, len(duplicate_ids), batch_size):
+        collection.delete(ids=duplicate_ids[start : start + batch_size])
+
+    for start in range(0, len(renames), batch_size):
+        batch = dict(renames[start : start + batch_size])
+        records = collection.get(
+            ids=list(batch), include=["embeddings", "metadatas", "documents"]
+        )
+        # 임베딩을 그대로 복사하므로 모델을 다시 실행하지 않음
+        collection.upsert(
+            ids=[batch[old_id] for old_id in records["ids"]],
+            embeddings=records["embeddings"],
+            metadatas=records["metadatas"],
+            documents=records["documents"],
+        )
+        collection.delete(ids=records["ids"])
+
+    logger.info(f"정리 완료 (벡터 수: {total} -> {collection.count()})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chroma 컬렉션 중복 벡터 정리")
+    parser.add_argument(
+        "--persist-directory", default="./data/vectordb", help="벡터스토어 디렉토리"
+    )
+    parser.add_argument(
+        "--collection", default="pdf_collection", help="정리할 컬렉션 이름"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="한 번에 읽고 쓸 벡터 수"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="변경하지 않고 결과만 출력"
+    )
+    args = parser.parse_args()
+
+    dedup_collection(
+        persist_directory=args.persist_directory,
+        collection_name=args.collection,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+    )
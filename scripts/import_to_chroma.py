@@ -10,6 +10,8 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 from src.vectorstore import VectorStore
+from src.bm25_index import open_bm25_index
+from src.state_store import StateStore, open_state_store
 from langchain.schema import Document
 
 logging.basicConfig(
@@ -18,18 +20,34 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def import_json_to_chroma(json_path: str = "./data/vectordb/processed_states.json"):
-    """JSON 파일에서 처리된 데이터를 읽어 Chroma 벡터 데이터베이스에 저장합니다."""
+def import_json_to_chroma(state_path: str = "./data/vectordb"):
+    """처리 상태 저장소의 데이터를 읽어 Chroma 벡터 데이터베이스에 저장합니다.
+
+    Args:
+        state_path (str): 벡터스토어 디렉토리(상태 저장소 위치), 상태 저장소 파일
+            또는 기존 processed_states.json 경로
+    """
     try:
-        # JSON 파일 읽기
-        logger.info(f"JSON 파일 읽기 시작: {json_path}")
-        with open(json_path, "r", encoding="utf-8") as f:
-            processed_states = json.load(f)
-        logger.info(f"총 {len(processed_states)}개의 PDF 파일 데이터 로드됨")
+        # 문서 상태를 하나씩 읽어 전체 상태를 메모리에 올리지 않음
+        logger.info(f"처리 상태 읽기 시작: {state_path}")
+        if state_path.endswith(".json"):
+            # 기존 JSON 파일은 임시 저장소로 마이그레이션하지 않고 그대로 읽음
+            with open(state_path, "r", encoding="utf-8") as f:
+                processed_states = json.load(f).items()
+            state_store = None
+        else:
+            if os.path.isdir(state_path):
+                state_store = open_state_store(state_path)
+            else:
+                state_store = StateStore(state_path)
+            processed_states = state_store.iter_states()
+            logger.info(f"총 {len(state_store)}개의 PDF 파일 상태")
 
         # VectorStore 초기화
         vector_store = VectorStore(
-            persist_directory="./data/vectordb", collection_name="pdf_collection"
+            persist_directory="./data/vectordb",
+            collection_name="pdf_collection",
+            bm25_index=open_bm25_index(),
         )
         logger.info("VectorStore 초기화 완료")
 
@@ -42,7 +60,7 @@ def import_json_to_chroma(json_path: str = "./data/vectordb/processed_states.jso
         ]
         total_added = 0
 
-        for pdf_file, state in processed_states.items():
+        for pdf_file, state in processed_states:
             logger.info(f"\n처리 중인 파일: {pdf_file}")
             for summary_type in summary_types:
                 if state.get(summary_type):
@@ -76,15 +94,17 @@ def import_json_to_chroma(json_path: str = "./data/vectordb/processed_states.jso
                             )
                             continue
 
+        if state_store is not None:
+            state_store.close()
+
         logger.info(f"\n처리 완료:")
         logger.info(f"- 추가된 문서: {total_added}개")
+        logger.info(f"- 임베딩 캐시: {vector_store.embedding_cache_stats()}")
 
     except Exception as e:
         logger.error(f"처리 중 예상치 못한 오류가 발생했습니다: {str(e)}")
 
 
 if __name__ == "__main__":
-    json_path = (
-        sys.argv[1] if len(sys.argv) > 1 else "./data/vectordb/processed_states.json"
-    )
-    import_json_to_chroma(json_path)
+    state_path = sys.argv[1] if len(sys.argv) > 1 else "./data/vectordb"
+    import_json_to_chroma(state_path)
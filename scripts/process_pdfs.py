@@ -5,19 +5,22 @@ import os
 import logging
 import psutil
 import argparse
+import pymupdf
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-import json
-from pathlib import Path
 from dotenv import load_dotenv
 from src.vectorstore import VectorStore
-from src.parser import process_single_pdf
+from src.bm25_index import open_bm25_index
+from src.scheduler import DocumentScheduler, DocumentTimeoutError, check_deadline
+from src.state_store import open_state_store
+from src.graphparser.rate_limit import configure_dependency_limit
+from src.parser import discard_checkpoints, prune_checkpoints
 from src.graphparser.state import GraphState
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
-    retry_if_exception_type,
+    retry_if_not_exception_type,
 )
 from langchain.schema import Document
 
@@ -30,20 +33,17 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
-def load_processed_states():
-    """처리된 PDF 파일 목록을 로드합니다."""
-    processed_states_path = Path("./data/vectordb/processed_states.json")
-    if processed_states_path.exists():
-        with open(processed_states_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+class InvalidPDFError(ValueError):
+    """PDF 파일이 없거나 비어 있거나 열 수 없을 때 발생하는 예외 (재시도해도 실패)"""
 
 
-def is_original_pdf(filename: str, processed_states: dict) -> bool:
+def is_original_pdf(filename: str, processed_files: set) -> bool:
     """원본 PDF 파일이면서 아직 처리되지 않은 파일인지 확인합니다."""
-    if filename in processed_states:
+    if filename in processed_files:
         return False
 
+    # 파서는 메모리 분할 모드로 동작하므로 분할 파일을 만들지 않지만,
+    # 이전 실행에서 남은 분할 파일(_XXXX_YYYY.pdf)은 계속 제외합니다.
     split_pattern = r"_\d{4}_\d{4}\.pdf$"
     return filename.endswith(".pdf") and not re.search(split_pattern, filename)
 
@@ -51,7 +51,8 @@ def is_original_pdf(filename: str, processed_states: dict) -> bool:
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type((Exception, ValueError)),
+    # 시간 초과된 문서와 잘못된 PDF는 재시도하지 않음
+    retry=retry_if_not_exception_type((DocumentTimeoutError, InvalidPDFError)),
 )
 def process_single_pdf_with_retry(pdf_path):
     try:
@@ -70,10 +71,18 @@ def process_single_pdf(pdf_path):
 
         # PDF 파일 유효성 검사
         if not os.path.exists(pdf_path):
-            raise ValueError(f"PDF 파일이 존재하지 않습니다: {pdf_path}")
+            raise InvalidPDFError(f"PDF 파일이 존재하지 않습니다: {pdf_path}")
 
         if os.path.getsize(pdf_path) == 0:
-            raise ValueError(f"PDF 파일이 비어있습니다: {pdf_path}")
+            raise InvalidPDFError(f"PDF 파일이 비어있습니다: {pdf_path}")
+
+        try:
+            with pymupdf.open(pdf_path) as doc:
+                num_pages = len(doc)
+        except Exception as e:
+            raise InvalidPDFError(f"PDF 파일을 열 수 없습니다: {pdf_path} ({e})")
+        if num_pages == 0:
+            raise InvalidPDFError(f"PDF 파일에 페이지가 없습니다: {pdf_path}")
 
         # PDF 처리 시도
         try:
@@ -83,6 +92,9 @@ def process_single_pdf(pdf_path):
 
             # 처리 결과 검증
             if state is None:
+                # 파서는 오류를 None으로 반환하므로 시간 초과 여부를 먼저 확인
+                # (시간 초과면 DocumentTimeoutError가 전파되어 재시도하지 않음)
+                check_deadline()
                 raise ValueError(f"PDF 처리 결과가 없습니다: {pdf_path}")
 
             required_keys = [
@@ -103,37 +115,43 @@ def process_single_pdf(pdf_path):
 
         except Exception as e:
             logger.error(f"PDF 파싱 중 오류 발생: {str(e)}", exc_info=True)
-            # 기본 상태 반환
-            return {
-                "text_summary": {},
-                "image_summary": {},
-                "table_summary": {},
-                "table_markdown": {},
-            }
+            # 빈 상태를 반환하면 재시도되지 않으므로 예외를 전파하여
+            # 노드 체크포인트에서 재개하도록 함
+            raise
 
     except Exception as e:
         logger.error(f"PDF 처리 중 치명적 오류 발생: {str(e)}", exc_info=True)
-        return None
+        raise
 
 
-def process_new_pdfs(limit: int = None):
+def process_new_pdfs(
+    limit: int = None,
+    workers: int = 1,
+    document_timeout: float = None,
+    layout_concurrency: int = None,
+    llm_concurrency: int = None,
+):
     """새로운 PDF 파일들을 처리하고 상태를 저장합니다.
 
     Args:
         limit (int, optional): 처리할 PDF 파일의 최대 개수. 기본값은 None으로 모든 파일 처리
+        workers (int): 동시에 처리할 PDF 파일 수
+        document_timeout (float, optional): 문서별 처리 시간 제한(초)
+        layout_concurrency (int, optional): 전체 문서에 걸친 레이아웃 API 동시 요청 수
+        llm_concurrency (int, optional): 전체 문서에 걸친 LLM 동시 요청 수
     """
     pdf_directory = "./data/pdf"
-    processed_states_path = Path("./data/vectordb/processed_states.json")
-    processed_states = load_processed_states()
+    # 문서별 상태 저장소 (처음 실행 시 processed_states.json에서 마이그레이션)
+    state_store = open_state_store("./data/vectordb")
+    processed_files = state_store.filenames()
 
     # 디버깅: 기존 상태 출력
     print("\n=== 기존 처리 상태 ===")
-    print(f"처리된 파일 수: {len(processed_states)}")
-    # print(f"처리된 파일 목록: {list(processed_states.keys())}")
+    print(f"처리된 파일 수: {len(processed_files)}")
 
     # 새로운 원본 PDF 파일만 필터링
     pdf_files = [
-        f for f in os.listdir(pdf_directory) if is_original_pdf(f, processed_states)
+        f for f in os.listdir(pdf_directory) if is_original_pdf(f, processed_files)
     ]
 
     # limit이 지정된 경우 처리할 파일 수 제한
@@ -145,77 +163,123 @@ def process_new_pdfs(limit: int = None):
     logger.info(f"처리할 새로운 PDF 파일: {len(pdf_files)}개")
     logger.info(f"PDF 파일 목록: {pdf_files}")
 
-    if pdf_files:
-        # VectorStore 초기화
-        vector_store = VectorStore(persist_directory="./data/vectordb")
-
-        for pdf_file in pdf_files:
-            try:
-                pdf_path = os.path.join(pdf_directory, pdf_file)
-                state = process_single_pdf_with_retry(pdf_path)
-
-                if state is None:
-                    logger.error(f"PDF 처리 실패: {pdf_file}")
-                    continue
-
-                # 디버깅: 상태 병합 전 출력
-                logger.info(f"\n=== 상태 병합 전 ({pdf_file}) ===")
-                if pdf_file in processed_states:
-                    logger.info(f"기존 상태: {processed_states[pdf_file]}")
-                else:
-                    logger.info("기존 상태 없음")
-
-                # 상태 정보 업데이트
-                state_dict = {
-                    "text_summary": state.get("text_summary", {}),
-                    "image_summary": state.get("image_summary", {}),
-                    "table_summary": state.get("table_summary", {}),
-                    "table_markdown": state.get("table_markdown", {}),
-                    "parsing_processed": True,
-                    "vectorstore_processed": True,
-                }
-
-                # 디버깅: 새로운 상태 출력
-                logger.info(f"새로운 상태: {state_dict}")
-
-                # 기존 상태 정보와 병합
-                if pdf_file in processed_states:
-                    processed_states[pdf_file].update(state_dict)
-                    logger.info(f"상태 병합 완료: {processed_states[pdf_file]}")
-                else:
-                    processed_states[pdf_file] = state_dict
-                    logger.info("새로운 상태 추가됨")
-
-                logger.info(f"\n=== 처리 완료: {pdf_file} ===")
-                logger.info(f"텍스트 요약 수: {len(state_dict['text_summary'])}")
-                logger.info(f"이미지 요약 수: {len(state_dict['image_summary'])}")
-                logger.info(f"테이블 요약 수: {len(state_dict['table_summary'])}")
-                logger.info(f"테이블 마크다운 수: {len(state_dict['table_markdown'])}")
-
-                # 텍스트 요약 저장
-                vector_store.add_documents(
-                    documents=[
-                        Document(
-                            page_content=text,
-                            metadata={"source": pdf_file, "type": "text_summary"},
-                        )
-                        for text in state.get("text_summary", {}).values()
-                    ]
-                )
-
-                # 상태 저장
-                with open(processed_states_path, "w", encoding="utf-8") as f:
-                    json.dump(processed_states, f, ensure_ascii=False, indent=2)
-                logger.info("상태 파일 저장 완료")
-
-            except Exception as e:
-                logger.error(f"처리 실패 ({pdf_file}): {str(e)}")
-                continue
+    if not pdf_files:
+        return
+
+    # 오래 남은 노드 체크포인트 정리
+    pruned = prune_checkpoints()
+    if pruned:
+        logger.info(f"오래된 체크포인트 정리: {pruned}개 문서")
+
+    # 외부 의존성별 전역 동시 요청 수 제한 (여러 문서를 동시에 처리할 때 공유)
+    configure_dependency_limit("layout", layout_concurrency)
+    configure_dependency_limit("llm", llm_concurrency)
+
+    # VectorStore 초기화 (저장한 요약은 BM25 인덱스에도 함께 반영)
+    vector_store = VectorStore(
+        persist_directory="./data/vectordb", bm25_index=open_bm25_index()
+    )
+
+    def handle_result(pdf_file, state, error):
+        # 결과 처리는 스케줄러를 호출한 스레드에서 순서대로 실행됩니다.
+        try:
+            if error is not None:
+                logger.error(f"처리 실패 ({pdf_file}): {str(error)}")
+                # 다시 처리해도 실패하는 잘못된 PDF만 체크포인트를 삭제. 시간 초과나
+                # 일시적인 API 오류는 다음 실행에서 재개하도록 남겨 두고 오래된
+                # 체크포인트는 checkpointer.prune으로 정리
+                if isinstance(error, InvalidPDFError):
+                    discard_checkpoints(os.path.join(pdf_directory, pdf_file))
+                return
+
+            if state is None:
+                logger.error(f"PDF 처리 실패: {pdf_file}")
+                return
+
+            # 디버깅: 상태 병합 전 출력
+            logger.info(f"\n=== 상태 병합 전 ({pdf_file}) ===")
+            previous_state = state_store.get(pdf_file)
+            if previous_state is not None:
+                logger.info(f"기존 상태: {previous_state}")
+            else:
+                logger.info("기존 상태 없음")
+
+            # 상태 정보 업데이트
+            state_dict = {
+                "text_summary": state.get("text_summary", {}),
+                "image_summary": state.get("image_summary", {}),
+                "table_summary": state.get("table_summary", {}),
+                "table_markdown": state.get("table_markdown", {}),
+                "parsing_processed": True,
+                "vectorstore_processed": True,
+            }
+
+            # 디버깅: 새로운 상태 출력
+            logger.info(f"새로운 상태: {state_dict}")
+
+            logger.info(f"\n=== 처리 완료: {pdf_file} ===")
+            logger.info(f"텍스트 요약 수: {len(state_dict['text_summary'])}")
+            logger.info(f"이미지 요약 수: {len(state_dict['image_summary'])}")
+            logger.info(f"테이블 요약 수: {len(state_dict['table_summary'])}")
+            logger.info(f"테이블 마크다운 수: {len(state_dict['table_markdown'])}")
+
+            # 텍스트 요약 저장 (import_to_chroma.py와 같은 메타데이터로 같은 ID가 생성됨)
+            vector_store.add_documents(
+                documents=[
+                    Document(
+                        page_content=text,
+                        metadata={
+                            "source": pdf_file,
+                            "type": "text_summary",
+                            "index": idx,
+                            "page_number": idx,
+                        },
+                    )
+                    for idx, text in state.get("text_summary", {}).items()
+                ]
+            )
+
+            # 기존 상태 정보와 병합하여 이 문서의 상태만 저장
+            state_store.upsert(pdf_file, state_dict)
+            if previous_state is not None:
+                logger.info("상태 병합 완료")
+            else:
+                logger.info("새로운 상태 추가됨")
+
+        except Exception as e:
+            logger.error(f"처리 실패 ({pdf_file}): {str(e)}")
+
+    scheduler = DocumentScheduler(
+        lambda pdf_file: process_single_pdf_with_retry(
+            os.path.join(pdf_directory, pdf_file)
+        ),
+        max_workers=workers,
+        document_timeout=document_timeout,
+    )
+    scheduler.run(pdf_files, handle_result)
+    logger.info(f"임베딩 캐시: {vector_store.embedding_cache_stats()}")
+    state_store.close()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="PDF 파일 처리 스크립트")
     parser.add_argument("--limit", type=int, help="처리할 PDF 파일 최대 개수")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="동시에 처리할 PDF 파일 수"
+    )
+    parser.add_argument(
+        "--document-timeout", type=float, help="문서별 처리 시간 제한(초)"
+    )
+    parser.add_argument(
+        "--layout-concurrency", type=int, help="레이아웃 API 전역 동시 요청 수"
+    )
+    parser.add_argument("--llm-concurrency", type=int, help="LLM 전역 동시 요청 수")
     args = parser.parse_args()
 
-    process_new_pdfs(limit=args.limit)
+    process_new_pdfs(
+        limit=args.limit,
+        workers=args.workers,
+        document_timeout=args.document_timeout,
+        layout_concurrency=args.layout_concurrency,
+        llm_concurrency=args.llm_concurrency,
+    )
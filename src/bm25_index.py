@@ -0,0 +1,580 @@
+import os
+import json
+import math
+import asyncio
+import threading
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from src.tokenizer import get_tokenizer
+
+# 인덱스 파일 형식 버전
+INDEX_FORMAT = 1
+
+# 너무 짧은 문서는 BM25 인덱스에 넣지 않음 (기존 BM25Retriever 구성과 동일)
+BM25_MIN_CHARS = 50
+
+
+class BM25Index:
+    """
+    디스크에 저장되는 증분형 BM25 역색인
+
+    - 문서를 추가할 때마다 새 세그먼트(용어 사전 .json + 포스팅 배열 .bin)를 기록하고,
+      세그먼트가 max_segments개를 넘으면 하나로 병합
+    - 포스팅(문서 번호 uint32, 빈도 uint16)은 memmap으로 읽어 메모리에 전부 올리지 않음
+    - 문서 본문은 documents.jsonl에 추가하고 오프셋 배열로 필요한 문서만 읽음
+    - meta.json을 마지막에 원자적으로 교체하므로 읽는 쪽은 항상 완성된 상태만 봄
+    - 문서 ID는 VectorStore와 같은 결정적 ID를 사용하여 중복 추가를 건너뜀
+
+    디렉토리 구성:
+        meta.json: 문서 수, 총 토큰 수, 문서 저장소 크기, 세그먼트 목록, 삭제된 문서 번호
+        documents.jsonl: 문서 ID/본문/메타데이터 (한 줄에 한 문서)
+        doc_offsets.bin: documents.jsonl 안의 문서별 시작 위치 (uint64)
+        doc_lengths.bin: 문서별 토큰 수 (uint32)
+        segment_<n>.json: 용어 -> [포스팅 시작 위치, 포스팅 수]
+        segment_<n>.docs.bin / segment_<n>.tfs.bin: 포스팅 배열
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        tokenizer: str = "korean",
+        k1: float = 1.5,
+        b: float = 0.75,
+        max_segments: int = 8,
+    ):
+        """
+        인덱스 초기화 (파일은 처음 검색/추가할 때 읽음)
+
+        Args:
+            directory (str): 인덱스 디렉토리
+            tokenizer (str): 문서/쿼리에 함께 사용할 토크나이저 이름 (src.tokenizer 등록 이름,
+                인덱스에 기록되어 불일치를 감지)
+            k1 (float): BM25 용어 빈도 포화 계수
+            b (float): BM25 문서 길이 정규화 계수
+            max_segments (int): 병합 전 최대 세그먼트 수
+        """
+        self.directory = Path(directory)
+        self.tokenizer_name = tokenizer
+        self.tokenizer = get_tokenizer(tokenizer)
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self._lock = threading.RLock()
+        self._meta = None
+        self._meta_mtime = None
+        self._segments = {}
+        self._doc_lengths = None
+        self._doc_offsets = None
+        self._live = None
+        self._live_length = 0
+        self._doc_keys = None  # 쓰기용: 문서 ID -> (문서 번호, source, type)
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    def exists(self) -> bool:
+        """인덱스가 디스크에 존재하는지 여부"""
+        return self.meta_path.exists()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._meta["num_docs"] - len(self._meta["deleted"])
+
+    # ------------------------------------------------------------------ 읽기
+
+    def _empty_meta(self) -> Dict[str, Any]:
+        return {
+            "format": INDEX_FORMAT,
+            "tokenizer": self.tokenizer_name,
+            "k1": self.k1,
+            "b": self.b,
+            "num_docs": 0,
+            "total_length": 0,
+            "documents_size": 0,
+            "next_segment": 0,
+            "segments": [],
+            "deleted": [],
+        }
+
+    def _refresh(self):
+        """meta.json이 바뀌었으면 인덱스를 다시 열기 (잠금은 호출자가 보유)"""
+        try:
+            mtime = self.meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            if self._meta is None:
+                self._meta = self._empty_meta()
+                self._open_arrays()
+            return
+
+        if mtime == self._meta_mtime:
+            return
+
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != INDEX_FORMAT:
+            raise ValueError(f"지원하지 않는 BM25 인덱스 형식: {meta.get('format')}")
+        if meta["tokenizer"] != self.tokenizer_name:
+            raise ValueError(
+                f"인덱스 토크나이저({meta['tokenizer']})와 "
+                f"현재 토크나이저({self.tokenizer_name})가 다릅니다. "
+                "python -m src.bm25_index --rebuild 로 인덱스를 다시 만드세요."
+            )
+        self._meta = meta
+        self._meta_mtime = mtime
+        self._open_arrays()
+
+    def _open_arrays(self):
+        """문서 배열과 세그먼트를 memmap으로 열기"""
+        num_docs = self._meta["num_docs"]
+        self._doc_lengths = self._memmap("doc_lengths.bin", np.uint32, num_docs)
+        self._doc_offsets = self._memmap("doc_offsets.bin", np.uint64, num_docs)
+        # 삭제 표시된 문서는 문서 수/평균 길이/문서 빈도(df) 계산에서도 제외
+        deleted = np.asarray(self._meta["deleted"], dtype=np.int64)
+        self._live = np.ones(num_docs, dtype=bool)
+        self._live[deleted] = False
+        self._live_length = self._meta["total_length"] - int(
+            self._doc_lengths[deleted].sum(dtype=np.uint64)
+        )
+
+        segments = {}
+        for name in self._meta["segments"]:
+            segments[name] = self._segments.get(name) or self._open_segment(name)
+        self._segments = segments
+
+    def _memmap(self, filename: str, dtype, length: int) -> np.ndarray:
+        """파일 앞부분 length개 항목을 memmap으로 열기 (비어 있으면 빈 배열)"""
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(
+            self.directory / filename, dtype=dtype, mode="r", shape=(length,)
+        )
+
+    def _open_segment(self, name: str) -> Tuple[Dict[str, List[int]], Any, Any]:
+        with open(self.directory / f"{name}.json", "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        size = sum(count for _, count in vocab.values())
+        return (
+            vocab,
+            self._memmap(f"{name}.docs.bin", np.uint32, size),
+            self._memmap(f"{name}.tfs.bin", np.uint16, size),
+        )
+
+    def _postings(self, term: str) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """모든 세그먼트에서 용어의 포스팅 (문서 번호, 빈도) 목록"""
+        postings = []
+        for vocab, docs, tfs in self._segments.values():
+            entry = vocab.get(term)
+            if entry is not None:
+                start, count = entry
+                postings.append(
+                    (docs[start : start + count], tfs[start : start + count])
+                )
+        return postings
+
+    def _read_document(self, f, docno: int) -> Dict[str, Any]:
+        f.seek(int(self._doc_offsets[docno]))
+        return json.loads(f.readline())
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """
+        BM25 점수 상위 k개 문서 검색
+
+        Args:
+            query (str): 검색 쿼리
+            k (int): 반환할 문서 수
+
+        Returns:
+            List[Tuple[Document, float]]: (문서, 점수) 리스트 (점수 내림차순)
+        """
+        with self._lock:
+            self._refresh()
+            num_docs = self._meta["num_docs"]
+            live_docs = num_docs - len(self._meta["deleted"])
+            if live_docs == 0:
+                return []
+
+            avg_length = self._live_length / live_docs
+            scores = np.zeros(num_docs, dtype=np.float32)
+
+            for term in set(self.tokenizer(query)):
+                postings = self._postings(term)
+                if len(self._meta["deleted"]):
+                    # 병합 전 세그먼트에 남은 삭제된 문서의 포스팅 제외
+                    postings = [
+                        (docs[self._live[docs]], tfs[self._live[docs]])
+                        for docs, tfs in postings
+                    ]
+                df = sum(len(docs) for docs, _ in postings)
+                if df == 0:
+                    continue
+                idf = math.log(1 + (live_docs - df + 0.5) / (df + 0.5))
+                for docs, tfs in postings:
+                    # 한 용어 안에서 문서 번호는 중복되지 않으므로 벡터 연산으로 누적
+                    tf = tfs.astype(np.float32)
+                    lengths = self._doc_lengths[docs].astype(np.float32)
+                    norms = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+                    scores[docs] += idf * tf * (self.k1 + 1) / (tf + norms)
+
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) == 0:
+                return []
+            if len(candidates) > k:
+                top = np.argpartition(-scores[candidates], k - 1)[:k]
+                candidates = candidates[top]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            results = []
+            with open(self.directory / "documents.jsonl", "r", encoding="utf-8") as f:
+                for docno in ranked:
+                    record = self._read_document(f, docno)
+                    document = Document(
+                        page_content=record["page_content"],
+                        metadata=record["metadata"],
+                        id=record["id"],
+                    )
+                    results.append((document, float(scores[docno])))
+            return results
+
+    # ------------------------------------------------------------------ 쓰기
+
+    def _load_doc_keys(self):
+        """문서 ID 목록을 읽기 (쓰기 작업에서 처음 한 번만)"""
+        if self._doc_keys is not None:
+            return
+        self._doc_keys = {}
+        if self._meta["num_docs"] == 0:
+            return
+        with open(self.directory / "documents.jsonl", "r", encoding="utf-8") as f:
+            for docno in range(self._meta["num_docs"]):
+                record = json.loads(f.readline())
+                metadata = record["metadata"]
+                self._doc_keys[record["id"]] = (
+                    docno,
+                    metadata.get("source"),
+                    metadata.get("type"),
+                )
+
+    def _append_array(self, filename: str, values: np.ndarray, length: int):
+        """기존 length개 항목 뒤에 배열을 이어서 기록 (중단된 쓰기의 나머지는 덮어씀)"""
+        path = self.directory / filename
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(length * values.dtype.itemsize)
+            f.truncate()
+            f.write(values.tobytes())
+
+    def _write_segment(self, name: str, postings: Dict[str, List[Tuple[int, int]]]):
+        """용어별 포스팅을 세그먼트 파일로 기록"""
+        vocab = {}
+        docs, tfs = [], []
+        for term in sorted(postings):
+            entries = postings[term]
+            vocab[term] = [len(docs), len(entries)]
+            for docno, tf in entries:
+                docs.append(docno)
+                tfs.append(min(tf, np.iinfo(np.uint16).max))
+
+        np.asarray(docs, dtype=np.uint32).tofile(self.directory / f"{name}.docs.bin")
+        np.asarray(tfs, dtype=np.uint16).tofile(self.directory / f"{name}.tfs.bin")
+        with open(self.directory / f"{name}.json", "w", encoding="utf-8") as f:
+            json.dump(vocab, f, ensure_ascii=False)
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        """meta.json을 원자적으로 교체하고 인덱스를 다시 열기"""
+        tmp_path = self.directory / f"meta.json.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+        self._meta_mtime = None
+        self._refresh()
+
+    def upsert_documents(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        min_chars: int = 0,
+        delete_stale: bool = True,
+    ) -> Dict[str, int]:
+        """
+        문서를 인덱스에 추가 (VectorStore.upsert_documents와 같은 규칙)
+
+        - 이미 같은 ID가 있는 문서는 건너뜀
+        - delete_stale이면 이번에 추가하는 (source, type)의 기존 문서 중
+          새 문서에 없는 것은 삭제 표시
+
+        Args:
+            documents (List[Document]): 추가할 문서 리스트
+            ids (List[str]): 문서 ID 리스트 (assign_document_ids로 생성)
+            min_chars (int): 이보다 짧은 문서는 인덱스에 넣지 않음
+            delete_stale (bool): 오래된 문서 삭제 여부 (문서 일부만 추가할 때는 False)
+
+        Returns:
+            Dict[str, int]: 추가/건너뜀/삭제된 문서 수
+        """
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._refresh()
+            self._load_doc_keys()
+            meta = json.loads(json.dumps(self._meta))
+
+            unique = {
+                doc_id: document
+                for doc_id, document in zip(ids, documents)
+                if len(document.page_content.strip()) > min_chars
+            }
+            groups = (
+                {
+                    (document.metadata.get("source"), document.metadata.get("type"))
+                    for document in documents
+                }
+                if delete_stale
+                else set()
+            )
+            deleted = set(meta["deleted"])
+            stale = [
+                docno
+                for doc_id, (docno, source, doc_type) in self._doc_keys.items()
+                if (source, doc_type) in groups
+                and doc_id not in unique
+                and docno not in deleted
+            ]
+            new_items = [
+                (doc_id, document)
+                for doc_id, document in unique.items()
+                if doc_id not in self._doc_keys or self._doc_keys[doc_id][0] in deleted
+            ]
+
+            if new_items:
+                self._append_documents(meta, new_items)
+            meta["deleted"] = sorted(deleted.union(stale))
+            self._write_meta(meta)
+
+            if len(meta["segments"]) > self.max_segments:
+                self.merge_segments()
+
+            return {
+                "added": len(new_items),
+                "skipped": len(unique) - len(new_items),
+                "deleted": len(stale),
+            }
+
+    def _append_documents(
+        self, meta: Dict[str, Any], items: List[Tuple[str, Document]]
+    ):
+        """문서를 문서 저장소에 추가하고 새 세그먼트를 기록 (meta를 갱신)"""
+        num_docs = meta["num_docs"]
+        documents_path = self.directory / "documents.jsonl"
+
+        # 배치 전체를 한 번에 토큰화하여 같은 어절은 한 번만 처리
+        token_lists = self.tokenizer.tokenize_batch(
+            [document.page_content for _, document in items]
+        )
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        offsets, lengths = [], []
+        with open(documents_path, "r+b" if documents_path.exists() else "wb") as f:
+            # meta에 기록된 크기 뒤의 내용은 중단된 쓰기의 나머지이므로 덮어씀
+            f.seek(meta["documents_size"])
+            f.truncate()
+            for docno, (doc_id, document), tokens in zip(
+                range(num_docs, num_docs + len(items)), items, token_lists
+            ):
+                record = {
+                    "id": doc_id,
+                    "page_content": document.page_content,
+                    "metadata": document.metadata,
+                }
+                offsets.append(f.tell())
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+                lengths.append(len(tokens))
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for term, tf in counts.items():
+                    postings.setdefault(term, []).append((docno, tf))
+
+                self._doc_keys[doc_id] = (
+                    docno,
+                    document.metadata.get("source"),
+                    document.metadata.get("type"),
+                )
+            meta["documents_size"] = f.tell()
+
+        self._append_array("doc_offsets.bin", np.asarray(offsets, np.uint64), num_docs)
+        self._append_array("doc_lengths.bin", np.asarray(lengths, np.uint32), num_docs)
+
+        name = f"segment_{meta['next_segment']}"
+        self._write_segment(name, postings)
+        meta["next_segment"] += 1
+        meta["segments"].append(name)
+        meta["num_docs"] = num_docs + len(items)
+        meta["total_length"] += sum(lengths)
+
+    def merge_segments(self):
+        """모든 세그먼트를 하나로 병합하고 삭제된 문서의 포스팅을 제거"""
+        with self._lock:
+            self._refresh()
+            meta = json.loads(json.dumps(self._meta))
+            if len(meta["segments"]) <= 1 and not meta["deleted"]:
+                return
+
+            deleted = set(meta["deleted"])
+            postings: Dict[str, List[Tuple[int, int]]] = {}
+            # 세그먼트는 추가된 순서이므로 이어 붙여도 문서 번호 순서가 유지됨
+            for name in meta["segments"]:
+                vocab, docs, tfs = self._segments[name]
+                for term, (start, count) in vocab.items():
+                    entries = postings.setdefault(term, [])
+                    for docno, tf in zip(
+                        docs[start : start + count].tolist(),
+                        tfs[start : start + count].tolist(),
+                    ):
+                        if docno not in deleted:
+                            entries.append((docno, tf))
+            postings = {term: entries for term, entries in postings.items() if entries}
+
+            old_segments = meta["segments"]
+            name = f"segment_{meta['next_segment']}"
+            self._write_segment(name, postings)
+            meta["next_segment"] += 1
+            meta["segments"] = [name]
+            # 삭제된 문서는 포스팅에서 빠졌지만 문서 번호를 유지하므로 목록은 그대로 둠
+            self._write_meta(meta)
+
+            for old in old_segments:
+                for suffix in (".json", ".docs.bin", ".tfs.bin"):
+                    (self.directory / f"{old}{suffix}").unlink(missing_ok=True)
+
+
+class PersistentBM25Retriever(BaseRetriever):
+    """
+    디스크 BM25 인덱스를 사용하는 LangChain 리트리버
+
+    인덱스 파일은 첫 검색 때 열리고, 인덱스가 갱신되면 다음 검색에서 다시 읽습니다.
+    """
+
+    index: Any
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return [document for document, _ in self.index.search(query, k=self.k)]
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # 토큰화/점수 계산은 CPU 작업이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        results = await asyncio.to_thread(self.index.search, query, self.k)
+        return [document for document, _ in results]
+
+
+def open_bm25_index(
+    directory: Optional[str] = None, tokenizer: Optional[str] = None
+) -> BM25Index:
+    """
+    BM25 인덱스 열기
+
+    토크나이저를 지정하지 않으면 기존 인덱스에 기록된 토크나이저를 사용하므로
+    쿼리는 항상 인덱스와 같은 방식으로 토큰화됩니다.
+
+    환경 변수:
+        BM25_INDEX_PATH: 인덱스 디렉토리 (기본값: data/vectordb/bm25_index)
+        BM25_TOKENIZER: 새 인덱스의 토크나이저 이름 (기본값: korean)
+
+    Args:
+        directory (str, optional): 인덱스 디렉토리 (None이면 BM25_INDEX_PATH)
+        tokenizer (str, optional): 토크나이저 이름
+
+    Returns:
+        BM25Index: BM25 인덱스
+    """
+    directory = directory or os.environ.get(
+        "BM25_INDEX_PATH", "data/vectordb/bm25_index"
+    )
+    if tokenizer is None:
+        meta_path = Path(directory) / "meta.json"
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                tokenizer = json.load(f)["tokenizer"]
+        else:
+            tokenizer = os.environ.get("BM25_TOKENIZER", "korean")
+    return BM25Index(directory, tokenizer=tokenizer)
+
+
+def build_from_collection(
+    index: BM25Index, collection, batch_size: int = 1000
+) -> Dict[str, int]:
+    """
+    기존 Chroma 컬렉션의 문서로 BM25 인덱스를 만들기 (batch_size개씩 읽음)
+
+    Args:
+        index (BM25Index): BM25 인덱스
+        collection: chromadb 컬렉션
+        batch_size (int): 한 번에 읽을 문서 수
+
+    Returns:
+        Dict[str, int]: 추가/건너뜀 문서 수
+    """
+    totals = {"added": 0, "skipped": 0}
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["metadatas", "documents"], limit=batch_size, offset=offset
+        )
+        if not page["ids"]:
+            return totals
+        documents = [
+            Document(page_content=content or "", metadata=metadata or {})
+            for content, metadata in zip(page["documents"], page["metadatas"])
+        ]
+        # 컬렉션 ID를 그대로 사용하고, 페이지 단위로 읽으므로 오래된 문서 삭제는 하지 않음
+        result = index.upsert_documents(
+            documents, page["ids"], min_chars=BM25_MIN_CHARS, delete_stale=False
+        )
+        totals["added"] += result["added"]
+        totals["skipped"] += result["skipped"]
+        offset += len(page["ids"])
+
+
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="Chroma 컬렉션으로 BM25 인덱스 만들기")
+    parser.add_argument(
+        "--persist-directory", default="./data/vectordb", help="벡터스토어 디렉토리"
+    )
+    parser.add_argument("--collection", default="pdf_collection", help="컬렉션 이름")
+    parser.add_argument("--index-path", help="BM25 인덱스 디렉토리")
+    parser.add_argument("--tokenizer", help="토크나이저 이름 (기본값: korean)")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="기존 인덱스를 지우고 새로 만들기"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="한 번에 읽을 문서 수"
+    )
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=args.persist_directory)
+    if args.rebuild:
+        shutil.rmtree(
+            args.index_path
+            or os.environ.get("BM25_INDEX_PATH", "data/vectordb/bm25_index"),
+            ignore_errors=True,
+        )
+    bm25_index = open_bm25_index(args.index_path, args.tokenizer)
+    result = build_from_collection(
+        bm25_index, client.get_collection(args.collection), args.batch_size
+    )
+    print(f"BM25 인덱스 생성 완료: {result} (문서 수: {len(bm25_index)})")
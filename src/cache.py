@@ -0,0 +1,245 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, List
+
+
+class DiskCache:
+    """
+    SQLite 기반의 영속 키-값 캐시
+
+    - 용량 상한(max_size_bytes)을 넘으면 가장 오래 사용되지 않은 항목부터 제거(LRU)
+    - 선택적으로 항목 유효 기간(ttl) 적용
+    - 조회 적중/실패 횟수 집계
+    """
+
+    # get_many에서 한 쿼리에 넣을 최대 키 수 (SQLite 바인딩 변수 제한)
+    MAX_BATCH_KEYS = 500
+
+    def __init__(
+        self,
+        path: str,
+        max_size_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        """
+        캐시 초기화
+
+        Args:
+            path (str): SQLite 캐시 파일 경로
+            max_size_bytes (int, optional): 저장할 값들의 총 크기 상한 (None이면 제한 없음)
+            ttl (float, optional): 항목 유효 기간(초) (None이면 만료 없음)
+        """
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_accessed_at ON cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        캐시에서 값을 조회
+
+        Args:
+            key (str): 캐시 키
+
+        Returns:
+            Optional[bytes]: 저장된 값 (없거나 만료된 경우 None)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or self._is_expired(row[1], now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        여러 키를 한 번에 조회 (키마다 쿼리를 실행하지 않음)
+
+        Args:
+            keys (List[str]): 캐시 키 리스트
+
+        Returns:
+            Dict[str, bytes]: 적중한 키와 값 (없거나 만료된 키는 포함하지 않음)
+        """
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found = {}
+        expired = []
+        with self._lock:
+            # SQLite 바인딩 변수 수 제한을 넘지 않도록 나누어 조회
+            for start in range(0, len(keys), self.MAX_BATCH_KEYS):
+                chunk = keys[start : start + self.MAX_BATCH_KEYS]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT key, value, created_at FROM cache "
+                    f"WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self._is_expired(created_at, now):
+                        expired.append((key,))
+                    else:
+                        found[key] = value
+
+            if expired:
+                self._conn.executemany("DELETE FROM cache WHERE key = ?", expired)
+            if found:
+                self._conn.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: bytes):
+        """
+        캐시에 값을 저장하고 필요하면 LRU 제거를 수행
+
+        Args:
+            key (str): 캐시 키
+            value (bytes): 저장할 값
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, value, len(value), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def set_many(self, items: Dict[str, bytes]):
+        """
+        여러 값을 한 트랜잭션으로 저장하고 필요하면 LRU 제거를 한 번 수행
+
+        Args:
+            items (Dict[str, bytes]): 캐시 키와 저장할 값
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [(key, value, len(value), now, now) for key, value in items.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """용량 상한을 넘는 동안 가장 오래 사용되지 않은 항목부터 제거"""
+        if self.max_size_bytes is None:
+            return
+
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_size_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", evicted)
+
+    def invalidate(self, key: str) -> bool:
+        """
+        캐시 항목 삭제
+
+        Args:
+            key (str): 삭제할 캐시 키
+
+        Returns:
+            bool: 항목이 존재해 삭제되었는지 여부
+        """
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def clear(self):
+        """모든 캐시 항목 삭제"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        캐시 통계 반환
+
+        Returns:
+            Dict[str, Any]: 적중/실패 횟수, 적중률, 항목 수, 총 크기
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self):
+        """SQLite 연결 종료"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,490 @@
+import os
+import re
+import sys
+import time
+import json
+import shutil
+import hashlib
+import argparse
+import threading
+import unicodedata
+from pathlib import Path
+from typing import List, Optional, Dict, Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.cache import DiskCache
+
+DEFAULT_MODEL_NAME = "jhgan/ko-sbert-sts"
+
+# sentence_bert_config.json이 없을 때 사용할 최대 토큰 수 (ko-sbert-sts 기본값)
+DEFAULT_MAX_SEQ_LENGTH = 128
+
+# 임베딩 백엔드 이름: torch(기본), onnx(fp32 ONNX), onnx-int8(동적 int8 양자화 ONNX)
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    sentence-transformers 모델을 ONNX Runtime으로 실행하는 CPU 임베딩
+
+    - 처음 사용할 때 모델을 ONNX로 내보내고(optimum), 선택적으로 int8 동적 양자화
+    - 길이순으로 정렬한 배치로 패딩 낭비를 줄이고 결과는 입력 순서로 복원
+    - ONNX Runtime 스레드 수 제어
+    - ko-sbert-sts와 같은 평균 풀링(mean pooling) 결과를 반환
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache_dir: str = "data/models/onnx",
+        quantize: bool = True,
+        batch_size: int = 32,
+        max_length: Optional[int] = None,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        ONNX 임베딩 초기화
+
+        Args:
+            model_name (str): HuggingFace 모델 이름
+            cache_dir (str): 내보낸 ONNX 모델을 저장할 디렉토리
+            quantize (bool): int8 동적 양자화 모델 사용 여부
+            batch_size (int): 한 번에 임베딩할 문장 수
+            max_length (int, optional): 최대 토큰 수 (초과하면 잘림). None이면 PyTorch
+                백엔드와 같도록 모델의 sentence_bert_config.json의 max_seq_length 사용
+            num_threads (int, optional): ONNX Runtime 연산 스레드 수 (None이면 자동)
+        """
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "ONNX 임베딩에는 onnxruntime, optimum[onnxruntime] 패키지가 필요합니다. "
+                "pip install -r requirements-onnx.txt 로 설치하세요."
+            ) from e
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+
+        model_dir = Path(cache_dir) / model_name.replace("/", "__")
+        model_path = self._prepare_model(model_dir)
+        self.max_length = max_length or self._read_max_seq_length(model_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    def _prepare_model(self, model_dir: Path) -> Path:
+        """
+        ONNX 모델 파일을 준비 (없으면 내보내기/양자화)
+
+        Args:
+            model_dir (Path): 모델 디렉토리
+
+        Returns:
+            Path: 사용할 ONNX 모델 파일 경로
+        """
+        onnx_path = model_dir / "model.onnx"
+        if not onnx_path.exists():
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+
+            print(f"ONNX 모델 내보내기: {self.model_name} -> {model_dir}")
+            model = ORTModelForFeatureExtraction.from_pretrained(
+                self.model_name, export=True
+            )
+            model.save_pretrained(str(model_dir))
+            AutoTokenizer.from_pretrained(self.model_name).save_pretrained(
+                str(model_dir)
+            )
+
+        if not self.quantize:
+            return onnx_path
+
+        quantized_path = model_dir / "model_int8.onnx"
+        if not quantized_path.exists():
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            print(f"int8 동적 양자화: {quantized_path}")
+            quantize_dynamic(
+                str(onnx_path), str(quantized_path), weight_type=QuantType.QInt8
+            )
+        return quantized_path
+
+    def _read_max_seq_length(self, model_dir: Path) -> int:
+        """
+        sentence-transformers 설정의 최대 토큰 수 (PyTorch 백엔드와 같은 길이에서 자르기 위함)
+
+        내보낸 모델 디렉토리에 설정 파일이 없으면 원본 모델(로컬 경로 또는 HuggingFace
+        Hub)에서 가져와 저장하고, 찾을 수 없으면 DEFAULT_MAX_SEQ_LENGTH를 사용합니다.
+
+        Args:
+            model_dir (Path): 모델 디렉토리
+
+        Returns:
+            int: 최대 토큰 수
+        """
+        config_path = model_dir / "sentence_bert_config.json"
+        if not config_path.exists():
+            try:
+                source = Path(self.model_name) / config_path.name
+                if not source.exists():
+                    from huggingface_hub import hf_hub_download
+
+                    source = hf_hub_download(self.model_name, config_path.name)
+                shutil.copyfile(source, config_path)
+            except Exception as e:
+                print(
+                    f"sentence_bert_config.json을 찾을 수 없어 max_seq_length="
+                    f"{DEFAULT_MAX_SEQ_LENGTH}을 사용합니다: {e}"
+                )
+                return DEFAULT_MAX_SEQ_LENGTH
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("max_seq_length", DEFAULT_MAX_SEQ_LENGTH))
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """배치 하나를 임베딩 (평균 풀링)"""
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        inputs = {
+            name: value.astype(np.int64)
+            for name, value in encoded.items()
+            if name in self._input_names
+        }
+        # 내보낸 그래프가 token_type_ids를 요구하지만 토크나이저가 주지 않는 경우
+        if "token_type_ids" in self._input_names and "token_type_ids" not in inputs:
+            inputs["token_type_ids"] = np.zeros_like(inputs["input_ids"])
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return summed / counts
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        문서 임베딩
+
+        Args:
+            texts (List[str]): 임베딩할 텍스트 리스트
+
+        Returns:
+            List[List[float]]: 입력 순서대로의 임베딩 리스트
+        """
+        if not texts:
+            return []
+
+        # 길이가 비슷한 문장끼리 묶어 배치 내 패딩을 줄임
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        embeddings = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start : start + self.batch_size]
+            vectors = self._embed_batch([texts[i] for i in indices])
+            for index, vector in zip(indices, vectors):
+                embeddings[index] = vector.tolist()
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        검색 쿼리 임베딩
+
+        Args:
+            text (str): 쿼리 텍스트
+
+        Returns:
+            List[float]: 쿼리 임베딩
+        """
+        return self.embed_documents([text])[0]
+
+
+def normalize_embedding_text(text: str) -> str:
+    """
+    캐시 키 생성을 위한 텍스트 정규화 (유니코드 NFC, 공백 정리)
+
+    Args:
+        text (str): 원본 텍스트
+
+    Returns:
+        str: 정규화된 텍스트
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    텍스트 내용 해시를 키로 임베딩 결과를 디스크에 저장하는 임베딩 래퍼
+
+    - 키는 모델 이름(백엔드 포함) + 정규화된 텍스트의 SHA-256
+    - 한 번의 조회로 배치 전체의 캐시 적중 여부를 확인하고, 없는 텍스트만 모델로 임베딩
+    - 값은 float32 바이트로 저장
+    - 검색 쿼리는 캐시하지 않고 모델을 바로 호출
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: DiskCache, namespace: str):
+        """
+        임베딩 캐시 초기화
+
+        Args:
+            embeddings (Embeddings): 실제 임베딩 모델
+            cache (DiskCache): 임베딩을 저장할 디스크 캐시
+            namespace (str): 캐시 키 접두사 (모델 이름과 백엔드)
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.namespace = namespace
+        self.embedded = 0
+        self._lock = threading.Lock()
+
+    def cache_key(self, text: str) -> str:
+        """
+        텍스트의 캐시 키 생성
+
+        Args:
+            text (str): 원본 텍스트
+
+        Returns:
+            str: 캐시 키
+        """
+        digest = hashlib.sha256(normalize_embedding_text(text).encode("utf-8"))
+        return f"{self.namespace}:{digest.hexdigest()}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        문서 임베딩 (캐시에 없는 텍스트만 모델로 임베딩)
+
+        Args:
+            texts (List[str]): 임베딩할 텍스트 리스트
+
+        Returns:
+            List[List[float]]: 입력 순서대로의 임베딩 리스트
+        """
+        if not texts:
+            return []
+
+        keys = [self.cache_key(text) for text in texts]
+        vectors = {
+            key: np.frombuffer(value, dtype=np.float32).tolist()
+            for key, value in self.cache.get_many(keys).items()
+        }
+
+        # 배치 안에서 같은 내용의 텍스트는 한 번만 임베딩
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            new_items = {}
+            for key, vector in zip(missing, embedded):
+                vectors[key] = vector
+                new_items[key] = np.asarray(vector, dtype=np.float32).tobytes()
+            self.cache.set_many(new_items)
+            with self._lock:
+                self.embedded += len(missing)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        검색 쿼리 임베딩 (캐시하지 않음)
+
+        Args:
+            text (str): 쿼리 텍스트
+
+        Returns:
+            List[float]: 쿼리 임베딩
+        """
+        return self.embeddings.embed_query(text)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        캐시 통계 반환
+
+        Returns:
+            Dict[str, Any]: 디스크 캐시 통계와 모델로 임베딩한 텍스트 수
+        """
+        return {**self.cache.stats(), "embedded": self.embedded}
+
+
+def open_embedding_cache(
+    embeddings: Embeddings,
+    model_name: str = DEFAULT_MODEL_NAME,
+    backend: Optional[str] = None,
+) -> Embeddings:
+    """
+    임베딩 모델을 디스크 캐시로 감싸서 반환
+
+    환경 변수:
+        EMBEDDING_CACHE_PATH: 캐시 파일 경로 (기본값: data/cache/embeddings.sqlite3)
+        EMBEDDING_CACHE_MAX_BYTES: 캐시 총 크기 상한 (기본값: 2GB)
+        EMBEDDING_CACHE_DISABLED: 1이면 캐시를 사용하지 않음
+
+    Args:
+        embeddings (Embeddings): 실제 임베딩 모델
+        model_name (str): HuggingFace 모델 이름
+        backend (str, optional): 백엔드 이름 (None이면 EMBEDDING_BACKEND)
+
+    Returns:
+        Embeddings: 캐시가 적용된 임베딩 (캐시를 끈 경우 원래 모델)
+    """
+    if os.environ.get("EMBEDDING_CACHE_DISABLED") == "1":
+        return embeddings
+
+    # 백엔드마다 결과가 조금씩 다르므로 키에 백엔드를 포함
+    backend = backend or os.environ.get("EMBEDDING_BACKEND", "torch")
+    cache = DiskCache(
+        os.environ.get("EMBEDDING_CACHE_PATH", "data/cache/embeddings.sqlite3"),
+        max_size_bytes=int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", 2 * 1024**3)),
+    )
+    return CachedEmbeddings(embeddings, cache, f"{model_name}@{backend}")
+
+
+def load_embeddings(
+    model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None
+) -> Embeddings:
+    """
+    설정된 백엔드로 임베딩 모델을 생성
+
+    환경 변수:
+        EMBEDDING_BACKEND: torch(기본값), onnx, onnx-int8
+            (onnx 백엔드는 requirements-onnx.txt 패키지 필요)
+        EMBEDDING_BATCH_SIZE: 배치 크기 (기본값: 32)
+        EMBEDDING_NUM_THREADS: CPU 연산 스레드 수 (기본값: 자동)
+        EMBEDDING_ONNX_DIR: ONNX 모델 저장 디렉토리 (기본값: data/models/onnx)
+
+    Args:
+        model_name (str): HuggingFace 모델 이름
+        backend (str, optional): 백엔드 이름 (None이면 EMBEDDING_BACKEND)
+
+    Returns:
+        Embeddings: LangChain 임베딩 객체
+    """
+    backend = backend or os.environ.get("EMBEDDING_BACKEND", "torch")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"알 수 없는 임베딩 백엔드: {backend} (사용 가능: {EMBEDDING_BACKENDS})"
+        )
+
+    batch_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+    num_threads = os.environ.get("EMBEDDING_NUM_THREADS")
+    num_threads = int(num_threads) if num_threads else None
+
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        if num_threads:
+            import torch
+
+            torch.set_num_threads(num_threads)
+        return HuggingFaceEmbeddings(
+            model_name=model_name, encode_kwargs={"batch_size": batch_size}
+        )
+
+    return OnnxEmbeddings(
+        model_name=model_name,
+        cache_dir=os.environ.get("EMBEDDING_ONNX_DIR", "data/models/onnx"),
+        quantize=backend == "onnx-int8",
+        batch_size=batch_size,
+        num_threads=num_threads,
+    )
+
+
+def check_parity(
+    reference: Embeddings,
+    candidate: Embeddings,
+    texts: List[str],
+    min_cosine: float = 0.99,
+) -> Dict[str, Any]:
+    """
+    두 임베딩 백엔드의 결과가 같은지 코사인 유사도로 비교
+
+    Args:
+        reference (Embeddings): 기준 임베딩 (PyTorch)
+        candidate (Embeddings): 비교할 임베딩 (ONNX)
+        texts (List[str]): 비교에 사용할 문장
+        min_cosine (float): 통과 기준 최소 코사인 유사도
+
+    Returns:
+        Dict[str, Any]: 최소/평균 코사인 유사도, 최대 절대 오차, 소요 시간, 통과 여부
+    """
+    started = time.perf_counter()
+    expected = np.array(reference.embed_documents(texts))
+    reference_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = np.array(candidate.embed_documents(texts))
+    candidate_seconds = time.perf_counter() - started
+
+    cosine = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    return {
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "reference_seconds": reference_seconds,
+        "candidate_seconds": candidate_seconds,
+        "passed": bool(cosine.min() >= min_cosine),
+    }
+
+
+# 패리티 검사 기본 문장 (리포트 요약과 비슷한 길이/형식)
+PARITY_TEXTS = [
+    "삼성전자의 3분기 영업이익은 시장 기대치를 상회했습니다.",
+    "반도체 업황 회복으로 메모리 가격이 상승할 것으로 전망됩니다.",
+    "목표주가를 95,000원으로 상향 조정하고 투자의견 매수를 유지합니다.",
+    "2차전지 소재 업체들의 실적은 원재료 가격 하락으로 부진했습니다.",
+    "- 매출액 79조원 (+17% YoY)\n- 영업이익 9.2조원\n- 순이익 10.1조원",
+    "금리 인하 기대감에 따라 성장주 중심의 반등이 나타났습니다.",
+    "짧은 문장",
+    "환율 상승은 수출 기업의 원화 환산 이익을 늘리지만 수입 원가 부담을 키웁니다. " * 8,
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 백엔드 패리티 검사")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="모델 이름")
+    parser.add_argument(
+        "--backend",
+        default="onnx-int8",
+        choices=EMBEDDING_BACKENDS[1:],
+        help="비교할 ONNX 백엔드",
+    )
+    parser.add_argument("--texts-file", help="한 줄에 한 문장씩 있는 텍스트 파일")
+    parser.add_argument(
+        "--min-cosine", type=float, default=0.99, help="통과 기준 코사인 유사도"
+    )
+    args = parser.parse_args()
+
+    texts = PARITY_TEXTS
+    if args.texts_file:
+        with open(args.texts_file, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    result = check_parity(
+        load_embeddings(args.model, "torch"),
+        load_embeddings(args.model, args.backend),
+        texts,
+        min_cosine=args.min_cosine,
+    )
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    sys.exit(0 if result["passed"] else 1)
@@ -1,4 +1,5 @@
 from .state import GraphState
+from ..scheduler import check_deadline
 from abc import ABC, abstractmethod
 
 
@@ -18,4 +19,6 @@ class BaseNode(ABC):
                 print(f"  {key}: {value}")
 
     def __call__(self, state: GraphState) -> GraphState:
+        # 문서 처리 시간이 지났으면 다음 노드를 시작하지 않음
+        check_deadline()
         return self.execute(state)
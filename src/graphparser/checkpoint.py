@@ -0,0 +1,167 @@
+import os
+import pickle
+import shutil
+import hashlib
+import time
+import threading
+from .state import GraphState
+
+# 다시 만드는 비용이 작은 큰 바이트 데이터 (분할 PDF). 이 필드가 있는 출력은 저장하지 않음
+UNCHECKPOINTED_FIELDS = ("split_batches",)
+
+
+class NodeCheckpointer:
+    """
+    그래프 노드의 출력을 문서 해시별로 디스크에 저장하는 체크포인터
+
+    같은 문서를 다시 처리하면 출력이 저장된 노드는 실행하지 않고 저장된 출력을
+    반환하므로, 실패한 실행은 출력이 없는 첫 노드부터 이어서 진행됩니다.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: 체크포인트를 저장할 디렉토리
+        """
+        self.directory = directory
+        self._document_keys = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def document_key(self, filepath):
+        """
+        문서 내용의 SHA-256 해시를 반환합니다. 파일 경로/수정 시각/크기별로 메모이즈됩니다.
+
+        :param filepath: 문서 파일 경로
+        :return: 문서 해시 문자열
+        """
+        stat = os.stat(filepath)
+        memo_key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if memo_key in self._document_keys:
+                return self._document_keys[memo_key]
+
+        hasher = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        key = hasher.hexdigest()
+
+        with self._lock:
+            self._document_keys[memo_key] = key
+        return key
+
+    def _path(self, document_key, node_name):
+        return os.path.join(self.directory, document_key, f"{node_name}.pkl")
+
+    def load(self, document_key, node_name):
+        """
+        저장된 노드 출력을 불러옵니다.
+
+        :param document_key: 문서 해시
+        :param node_name: 노드 이름
+        :return: 저장된 출력, 없거나 읽을 수 없으면 None
+        """
+        path = self._path(document_key, node_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            # 손상된 체크포인트는 없는 것으로 간주하고 노드를 다시 실행
+            return None
+
+    def save(self, document_key, node_name, output):
+        """
+        노드 출력을 저장합니다. 임시 파일에 쓴 뒤 교체하므로 중간에 실패해도
+        손상된 체크포인트가 남지 않습니다.
+
+        :param document_key: 문서 해시
+        :param node_name: 노드 이름
+        :param output: 노드 출력
+        """
+        path = self._path(document_key, node_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def completed_nodes(self, document_key):
+        """
+        출력이 저장된 노드 이름 목록을 반환합니다.
+
+        :param document_key: 문서 해시
+        :return: 노드 이름 리스트
+        """
+        directory = os.path.join(self.directory, document_key)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            os.path.splitext(name)[0]
+            for name in os.listdir(directory)
+            if name.endswith(".pkl")
+        )
+
+    def clear(self, document_key):
+        """
+        문서의 모든 체크포인트를 삭제합니다.
+
+        :param document_key: 문서 해시
+        """
+        shutil.rmtree(os.path.join(self.directory, document_key), ignore_errors=True)
+
+    def prune(self, max_age):
+        """
+        마지막으로 저장된 지 max_age초가 지난 문서의 체크포인트를 삭제합니다.
+        (중단되거나 실패한 채로 남은 문서의 체크포인트 정리)
+
+        :param max_age: 체크포인트 유지 기간(초)
+        :return: 삭제한 문서 수
+        """
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+class CheckpointedNode:
+    """
+    노드를 감싸 출력을 체크포인트로 저장하고, 저장된 출력이 있으면 재사용하는 래퍼
+    """
+
+    def __init__(self, node, checkpointer, name=None, verbose=False):
+        """
+        :param node: 감쌀 노드 (GraphState를 받아 dict를 반환하는 호출 가능 객체)
+        :param checkpointer: NodeCheckpointer 인스턴스
+        :param name: 체크포인트 이름 (기본값: 노드의 name 속성)
+        :param verbose: 체크포인트 재사용 여부 출력
+        """
+        self.node = node
+        self.checkpointer = checkpointer
+        self.name = name or getattr(node, "name", node.__class__.__name__)
+        self.verbose = verbose
+
+    def __call__(self, state: GraphState) -> GraphState:
+        document_key = self.checkpointer.document_key(state["filepath"])
+
+        output = self.checkpointer.load(document_key, self.name)
+        if output is not None:
+            if self.verbose:
+                print(f"[{self.name}] 체크포인트에서 출력을 불러왔습니다.")
+            return output
+
+        output = self.node(state)
+        # 분할 PDF 바이트는 디스크에 쓰지 않음. 필드만 빼고 저장하면 재개 시 다음 노드가
+        # 빈 배치를 받으므로, 이런 노드는 재개할 때 다시 실행함 (분할은 빠름)
+        if any(output.get(field) for field in UNCHECKPOINTED_FIELDS):
+            return output
+        self.checkpointer.save(document_key, self.name, output)
+        return output
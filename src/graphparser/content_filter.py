@@ -0,0 +1,86 @@
+import re
+import hashlib
+from PIL import Image
+
+# 증권사 리포트의 컴플라이언스/면책 고지 페이지에 반복적으로 나타나는 문구
+BOILERPLATE_FINGERPRINTS = [
+    "compliance notice",
+    "disclaimer",
+    "본 조사분석자료는",
+    "본 자료는",
+    "투자의견 및 목표주가 변동",
+    "투자등급",
+    "투자의견 비율",
+    "고지사항",
+    "무단 복제",
+    "무단으로 복제",
+    "최종 책임",
+    "투자판단의 최종",
+    "이해관계",
+    "당사는 본 자료",
+    "조사분석 담당자",
+    "외부의 부당한 압력",
+]
+
+
+def normalize_text(text):
+    """
+    비교를 위해 텍스트를 정규화합니다. (소문자 변환, 공백 정리)
+
+    :param text: 원본 텍스트
+    :return: 정규화된 텍스트
+    """
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def text_fingerprint(text):
+    """
+    정규화된 텍스트의 해시를 반환합니다. 같은 내용의 페이지를 찾는 데 사용합니다.
+
+    :param text: 원본 텍스트
+    :return: SHA-1 해시 문자열
+    """
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def is_boilerplate(text, fingerprints=None, min_matches=2):
+    """
+    텍스트가 면책 고지 등 반복 문구 페이지인지 판단합니다.
+
+    :param text: 원본 텍스트
+    :param fingerprints: 반복 문구 목록 (기본값: BOILERPLATE_FINGERPRINTS)
+    :param min_matches: 반복 문구 페이지로 판단할 최소 일치 문구 수
+    :return: 반복 문구 페이지 여부
+    """
+    fingerprints = BOILERPLATE_FINGERPRINTS if fingerprints is None else fingerprints
+    normalized = normalize_text(text)
+    matches = sum(1 for phrase in fingerprints if phrase.lower() in normalized)
+    return matches >= min_matches
+
+
+def image_dhash(image_path, hash_size=8):
+    """
+    이미지의 차이 해시(dHash)를 계산합니다. 크기나 인코딩이 달라도 같은 이미지는
+    비슷한 해시를 가집니다.
+
+    :param image_path: 이미지 파일 경로
+    :param hash_size: 해시 한 변의 크기 (hash_size^2 비트)
+    :return: 정수형 해시
+    """
+    with Image.open(image_path) as img:
+        pixels = list(
+            img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).getdata()
+        )
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(a, b):
+    """두 해시 사이의 다른 비트 수를 반환합니다."""
+    return bin(a ^ b).count("1")
@@ -1,9 +1,20 @@
 from .base import BaseNode
-from .layout_utils import LayoutAnalyzer, ImageCropper
+from .layout_utils import LayoutAnalyzer, ImageCropper, crop_pages, count_text_tokens
+from .rate_limit import TokenBucket, get_request_scheduler
+from .llm_cache import get_llm_cache
+from .content_filter import (
+    normalize_text,
+    text_fingerprint,
+    is_boilerplate,
+    image_dhash,
+    hamming_distance,
+)
 from .state import GraphState
 import os
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
+from ..scheduler import bind_deadline
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain.chains.combine_documents import create_stuff_documents_chain
@@ -14,31 +25,87 @@ from .parser_chains import (
     extract_image_summary,
     extract_table_summary,
     table_markdown_extractor,
+    extract_table_analysis,
+    parse_table_analysis,
 )
 
 
 class LayoutAnalyzerNode(BaseNode):
 
-    def __init__(self, api_key, **kwargs):
+    def __init__(
+        self,
+        api_key,
+        max_workers=1,
+        requests_per_second=None,
+        timeout=None,
+        max_retries=0,
+        cache=None,
+        **kwargs,
+    ):
+        """
+        :param api_key: Upstage API 키
+        :param max_workers: 동시에 보낼 레이아웃 분석 요청 수 (1이면 순차 처리)
+        :param requests_per_second: 초당 최대 요청 수, None이면 제한 없음
+        :param timeout: 요청 1회의 타임아웃(초)
+        :param max_retries: 실패한 요청의 최대 재시도 횟수
+        :param cache: 레이아웃 분석 결과를 저장할 DiskCache (선택)
+        """
         super().__init__(**kwargs)
         self.name = "LayoutAnalyzerNode"
         self.api_key = api_key
-        self.layout_analyzer = LayoutAnalyzer(api_key)
+        self.max_workers = max_workers
+        # 속도 제한기는 노드 단위로 공유되어 동시 요청 전체에 적용됩니다.
+        rate_limiter = (
+            TokenBucket(requests_per_second) if requests_per_second else None
+        )
+        self.layout_analyzer = LayoutAnalyzer(
+            api_key,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limiter=rate_limiter,
+            cache=cache,
+        )
+
+    def _map(self, func, items):
+        """
+        설정된 작업자 수에 따라 순차 또는 동시에 func를 적용합니다.
+        결과는 입력 순서대로 반환되며, 하나라도 실패하면 예외가 그대로 전파됩니다.
+        """
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        workers = min(self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(bind_deadline(func), items))
+        self.log("동시 레이아웃 분석 완료", workers=workers, batches=len(items))
+        return results
+
+    def _analyze_batch(self, batch):
+        # 메모리 배치를 분석하고 페이지 범위 메타데이터를 유지합니다.
+        filename = f"{batch['start_page']:04d}_{batch['end_page']:04d}.pdf"
+        return {
+            "start_page": batch["start_page"],
+            "end_page": batch["end_page"],
+            "result": self.layout_analyzer.analyze(batch["document"], filename),
+        }
 
     def execute(self, state: GraphState) -> GraphState:
+        # 메모리 분할 모드: 분할 배치를 파일 없이 바로 분석합니다.
+        split_batches = state.get("split_batches") or []
+        if split_batches:
+            analyzed_batches = self._map(self._analyze_batch, split_batches)
+            return GraphState(
+                analyzed_files=[],
+                analyzed_batches=sorted(
+                    analyzed_batches, key=lambda batch: batch["start_page"]
+                ),
+            )
+
         # 분할된 PDF 파일 목록을 가져옵니다.
         split_files = state["split_filepaths"]
 
-        # LayoutAnalyzer 객체를 생성합니다. API 키는 환경 변수에서 가져옵니다.
-        analyzer = LayoutAnalyzer(self.api_key)
-
-        # 분석된 파일들의 경로를 저장할 리스트를 초기화합니다.
-        analyzed_files = []
-
-        # 각 분할된 PDF 파일에 대해 레이아웃 분석을 수행합니다.
-        for file in split_files:
-            # 레이아웃 분석을 실행하고 결과 파일 경로를 리스트에 추가합니다.
-            analyzed_files.append(analyzer.execute(file))
+        # 각 분할된 PDF 파일에 대해 레이아웃 분석을 수행하고 결과 파일 경로를 모읍니다.
+        analyzed_files = self._map(self.layout_analyzer.execute, split_files)
 
         # 분석된 파일 경로들을 정렬하여 새로운 GraphState 객체를 생성하고 반환합니다.
         # 정렬은 파일들의 순서를 유지하기 위해 수행됩니다.
@@ -68,24 +135,54 @@ class ExtractPageElementsNode(BaseNode):
 
         return start_page, end_page
 
-    def execute(self, state: GraphState) -> GraphState:
+    def load_analysis_results(self, state: GraphState):
         """
-        분석된 JSON 파일들에서 페이지 메타데이터를 추출하고 페이지 요소를 추출하는 함수입니다.
+        분석 결과와 각 결과의 시작 페이지를 페이지 순서대로 반환하는 제너레이터입니다.
+
+        메모리 배치와 로컬 추출 결과는 명시된 페이지 범위를, JSON 파일은 파일 이름의
+        페이지 범위를 사용합니다.
 
         :param state: 현재의 GraphState 객체
-        :return: 페이지 메타데이터, 페이지 요소, 페이지 번호가 추가된 새로운 GraphState 객체
+        :return: (시작 페이지 번호, 분석 결과 딕셔너리) 튜플
         """
-        json_files = state["analyzed_files"]
-        page_metadata = dict()
-        page_elements = dict()
-        element_id = 0
+        results = [
+            (batch["start_page"], batch["result"])
+            for batch in (state.get("analyzed_batches") or [])
+            + (state.get("local_batches") or [])
+        ]
 
-        for json_file in json_files:
+        for json_file in state.get("analyzed_files") or []:
             with open(json_file, "r") as f:
                 data = json.load(f)
-
             start_page, _ = self.extract_start_end_page(json_file)
+            results.append((start_page, data))
+
+        # 로컬 추출 결과와 섞여도 요소 ID가 페이지 순서대로 부여되도록 정렬
+        yield from sorted(results, key=lambda result: result[0])
+
+    def execute(self, state: GraphState) -> GraphState:
+        """
+        분석 결과에서 페이지 메타데이터를 추출하고 페이지 요소를 추출하는 함수입니다.
+
+        :param state: 현재의 GraphState 객체
+        :return: 페이지 메타데이터, 페이지 요소, 페이지 번호가 추가된 새로운 GraphState 객체
+        """
+        output, _ = self.extract_elements(self.load_analysis_results(state))
+        return output
 
+    def extract_elements(self, analysis_results, start_id=0):
+        """
+        분석 결과들에서 페이지 메타데이터와 페이지 요소를 추출합니다.
+
+        :param analysis_results: (시작 페이지 번호, 분석 결과) 튜플의 이터러블
+        :param start_id: 첫 요소에 부여할 ID (배치 단위로 나누어 호출할 때 사용)
+        :return: (GraphState 객체, 다음 요소 ID)
+        """
+        page_metadata = dict()
+        page_elements = dict()
+        element_id = start_id
+
+        for start_page, data in analysis_results:
             for element in data["metadata"]["pages"]:
                 original_page = int(element["page"])
                 relative_page = start_page + original_page - 1
@@ -105,6 +202,8 @@ class ExtractPageElementsNode(BaseNode):
                 if relative_page not in page_elements:
                     page_elements[relative_page] = []
 
+                # 상태에 보관된 분석 결과가 변경되지 않도록 복사본을 수정합니다.
+                element = dict(element)
                 element["id"] = element_id
                 element_id += 1
 
@@ -113,11 +212,12 @@ class ExtractPageElementsNode(BaseNode):
 
         parsed_page_elements = self.extract_tag_elements_per_page(page_elements)
         page_numbers = list(parsed_page_elements.keys())
-        return GraphState(
+        output = GraphState(
             page_metadata=page_metadata,
             page_elements=parsed_page_elements,
             page_numbers=page_numbers,
         )
+        return output, element_id
 
     def extract_tag_elements_per_page(self, page_elements):
         # 파싱된 페이지 요소들을 저장할 새로운 딕셔너리를 생성합니다.
@@ -294,6 +394,94 @@ class TableCropperNode(BaseNode):
         )  # 크롭된 표 이미지 정보를 포함한 GraphState 반환
 
 
+class ElementCropperNode(BaseNode):
+    """
+    이미지(차트)와 표 요소를 한 번에 크롭하는 노드
+
+    문서를 한 번만 열고, 이미지나 표 요소가 있는 페이지만 처리합니다.
+    clip=False이면 페이지를 한 번씩 래스터화하여 모든 크롭을 저장하고,
+    clip=True이면 각 요소 영역만 PDF에서 직접 렌더링합니다.
+    """
+
+    def __init__(self, dpi=300, max_workers=1, clip=False, element_dpi=None, **kwargs):
+        """
+        :param dpi: 기본 렌더링 해상도
+        :param max_workers: 프로세스 풀 작업자 수 (1이면 현재 프로세스에서 처리)
+        :param clip: 요소 영역만 렌더링할지 여부
+        :param element_dpi: 요소 카테고리별 해상도 (예: {"table": 200}), clip=True일 때 적용
+        """
+        super().__init__(**kwargs)
+        self.name = "ElementCropperNode"
+        self.dpi = dpi
+        self.max_workers = max_workers
+        self.clip = clip
+        self.element_dpi = element_dpi or {}
+
+    def execute(self, state: GraphState) -> GraphState:
+        """
+        PDF 파일에서 이미지와 표를 크롭하는 함수
+
+        :param state: GraphState 객체
+        :return: 크롭된 이미지와 표 정보가 포함된 GraphState 객체
+        """
+        pdf_file = state["filepath"]  # PDF 파일 경로
+        page_numbers = state["page_numbers"]  # 처리할 페이지 번호 목록
+        output_folder = os.path.splitext(pdf_file)[0]  # 출력 폴더 경로 설정
+        os.makedirs(output_folder, exist_ok=True)  # 출력 폴더 생성
+
+        cropped_images = dict()  # 크롭된 이미지 정보를 저장할 딕셔너리
+        cropped_tables = dict()  # 크롭된 표 이미지 정보를 저장할 딕셔너리
+        page_crops = dict()  # 페이지별 크롭 작업 목록
+
+        for page_num in page_numbers:
+            page_elements = state["page_elements"][page_num]
+            targets = [
+                (element, cropped_images)
+                for element in page_elements["image_elements"]
+                if element["category"] == "chart"
+            ] + [
+                (element, cropped_tables)
+                for element in page_elements["table_elements"]
+                if element["category"] == "table"
+            ]
+
+            # 크롭할 요소가 없는 페이지는 래스터화하지 않음
+            if not targets:
+                continue
+
+            crops = []
+            for element, output in targets:
+                # 요소의 좌표를 정규화
+                normalized_coordinates = ImageCropper.normalize_coordinates(
+                    element["bounding_box"],
+                    state["page_metadata"][page_num]["size"],
+                )
+                # 크롭된 이미지 저장 경로 설정
+                output_file = os.path.join(output_folder, f"{element['id']}.png")
+                crops.append(
+                    (
+                        normalized_coordinates,
+                        output_file,
+                        self.element_dpi.get(element["category"]),
+                    )
+                )
+                output[element["id"]] = output_file
+                print(f"page:{page_num}, id:{element['id']}, path: {output_file}")
+            page_crops[page_num] = crops
+
+        # 페이지당 한 번 래스터화하거나 요소 영역만 렌더링하여 크롭을 저장
+        crop_pages(
+            pdf_file,
+            page_crops,
+            dpi=self.dpi,
+            max_workers=self.max_workers,
+            clip=self.clip,
+        )
+        self.log("크롭 완료", pages=len(page_crops), total_pages=len(page_numbers))
+
+        return GraphState(images=cropped_images, tables=cropped_tables)
+
+
 class ExtractPageTextNode(BaseNode):
     """
     페이지별 텍스트를 추출하는 노드
@@ -324,11 +512,182 @@ class ExtractPageTextNode(BaseNode):
         return GraphState(texts=extracted_texts)
 
 
+def apply_aliases(output, aliases):
+    """
+    중복으로 판단되어 처리하지 않은 항목에 원본 항목의 결과를 복사합니다.
+
+    :param output: {키: 결과} 딕셔너리 (직접 수정됨)
+    :param aliases: {중복 키: 원본 키} 딕셔너리
+    :return: output
+    """
+    for alias, canonical in (aliases or {}).items():
+        if canonical in output:
+            output[alias] = output[canonical]
+    return output
+
+
+class ContentFilterNode(BaseNode):
+    """
+    LLM 요약 전에 불필요하거나 반복되는 내용을 걸러내는 노드
+
+    - 텍스트가 거의 없는 페이지 제외
+    - 면책 고지 등 반복 문구 페이지 제외
+    - 내용이 같은 페이지는 첫 페이지의 요약을 재사용 (page_aliases)
+    - 지각 해시(dHash)가 비슷한 이미지/표 크롭은 첫 크롭의 요약을 재사용 (element_aliases)
+    """
+
+    def __init__(
+        self,
+        min_text_chars=30,
+        boilerplate_fingerprints=None,
+        min_boilerplate_matches=2,
+        max_hash_distance=4,
+        table_llm_calls=1,
+        **kwargs,
+    ):
+        """
+        :param min_text_chars: 요약할 페이지의 최소 글자 수 (공백 정리 후)
+        :param boilerplate_fingerprints: 반복 문구 목록 (기본값: BOILERPLATE_FINGERPRINTS)
+        :param min_boilerplate_matches: 반복 문구 페이지로 판단할 최소 일치 문구 수
+        :param max_hash_distance: 같은 이미지로 판단할 dHash 최대 해밍 거리
+        :param table_llm_calls: 표 하나당 LLM 호출 수 (절약한 호출 수 집계용,
+            요약과 마크다운을 따로 추출하면 2)
+        """
+        super().__init__(**kwargs)
+        self.name = "ContentFilterNode"
+        self.min_text_chars = min_text_chars
+        self.boilerplate_fingerprints = boilerplate_fingerprints
+        self.min_boilerplate_matches = min_boilerplate_matches
+        self.max_hash_distance = max_hash_distance
+        self.table_llm_calls = table_llm_calls
+
+    def filter_pages(self, texts, seen=None):
+        """
+        요약할 페이지를 고르고, 제외/중복 페이지를 분류합니다.
+
+        :param texts: {페이지 번호: 텍스트}
+        :param seen: 이전 호출에서 본 {텍스트 해시: 페이지 번호} (직접 수정됨, 선택)
+        :return: (요약할 텍스트, 중복 페이지 별칭, 빈 페이지 목록, 반복 문구 페이지 목록)
+        """
+        kept_texts = dict()
+        page_aliases = dict()
+        empty_pages = []
+        boilerplate_pages = []
+        seen = dict() if seen is None else seen
+
+        for page_num, text in sorted(texts.items(), key=lambda x: x[0]):
+            if len(normalize_text(text)) < self.min_text_chars:
+                empty_pages.append(page_num)
+                continue
+
+            if is_boilerplate(
+                text, self.boilerplate_fingerprints, self.min_boilerplate_matches
+            ):
+                boilerplate_pages.append(page_num)
+                continue
+
+            fingerprint = text_fingerprint(text)
+            if fingerprint in seen:
+                page_aliases[page_num] = seen[fingerprint]
+                continue
+
+            seen[fingerprint] = page_num
+            kept_texts[page_num] = text
+
+        return kept_texts, page_aliases, empty_pages, boilerplate_pages
+
+    def dedupe_crops(self, crops, hashes=None):
+        """
+        지각 해시로 중복 크롭을 찾습니다.
+
+        :param crops: {요소 ID: 크롭 이미지 경로}
+        :param hashes: 이전 호출에서 본 (요소 ID, dHash) 리스트 (직접 수정됨, 선택)
+        :return: {중복 요소 ID: 원본 요소 ID}
+        """
+        aliases = dict()
+        hashes = [] if hashes is None else hashes  # (요소 ID, dHash)
+
+        for element_id, path in sorted(crops.items(), key=lambda x: x[0]):
+            try:
+                value = image_dhash(path)
+            except Exception as e:
+                self.log(f"이미지 해시 계산 실패: {path} ({e})")
+                continue
+
+            for canonical_id, canonical_hash in hashes:
+                if hamming_distance(value, canonical_hash) <= self.max_hash_distance:
+                    aliases[element_id] = canonical_id
+                    break
+            else:
+                hashes.append((element_id, value))
+
+        return aliases
+
+    def execute(self, state: GraphState) -> GraphState:
+        return self.filter_content(
+            state["texts"], state.get("images") or {}, state.get("tables") or {}
+        )
+
+    def filter_content(self, texts, images, tables, seen=None):
+        """
+        페이지 텍스트와 크롭을 필터링합니다.
+
+        :param texts: {페이지 번호: 텍스트}
+        :param images: {요소 ID: 이미지 크롭 경로}
+        :param tables: {요소 ID: 표 크롭 경로}
+        :param seen: 배치 단위로 나누어 호출할 때 이전 배치의 해시를 공유하는 딕셔너리
+        :return: 필터링 결과가 담긴 GraphState 객체
+        """
+        seen = dict() if seen is None else seen
+        kept_texts, page_aliases, empty_pages, boilerplate_pages = self.filter_pages(
+            texts, seen.setdefault("pages", {})
+        )
+
+        # 이미지와 표는 서로 다른 프롬프트로 요약하므로 종류별로 중복을 찾습니다.
+        image_aliases = self.dedupe_crops(images, seen.setdefault("images", []))
+        table_aliases = self.dedupe_crops(tables, seen.setdefault("tables", []))
+
+        # 절약한 LLM 호출 수
+        saved_calls = (
+            len(empty_pages)
+            + len(boilerplate_pages)
+            + len(page_aliases)
+            + len(image_aliases)
+            + self.table_llm_calls * len(table_aliases)
+        )
+        filter_report = {
+            "empty_pages": empty_pages,
+            "boilerplate_pages": boilerplate_pages,
+            "duplicate_pages": page_aliases,
+            "duplicate_images": image_aliases,
+            "duplicate_tables": table_aliases,
+            "saved_llm_calls": saved_calls,
+        }
+        print(
+            f"콘텐츠 필터: 빈 페이지 {len(empty_pages)}, "
+            f"반복 문구 페이지 {len(boilerplate_pages)}, "
+            f"중복 페이지 {len(page_aliases)}, 중복 이미지 {len(image_aliases)}, "
+            f"중복 표 {len(table_aliases)} -> LLM 호출 {saved_calls}회 절약"
+        )
+
+        # 원본 페이지 텍스트(texts)는 그대로 두고 요약할 텍스트만 따로 전달
+        return GraphState(
+            summary_texts=kept_texts,
+            page_aliases=page_aliases,
+            element_aliases={**image_aliases, **table_aliases},
+            filter_report=filter_report,
+        )
+
+
 class CreatePageSummaryNode(BaseNode):
     """
     페이지별 요약을 생성하는 노드
     """
 
+    # 요약 프롬프트 템플릿과 예상 응답의 토큰 수 (토큰 예산 계산용)
+    prompt_tokens = 150
+    completion_tokens = 500
+
     def __init__(self, api_key, **kwargs):
         super().__init__(**kwargs)
         self.name = "CreatePageSummaryNode"
@@ -358,6 +717,7 @@ class CreatePageSummaryNode(BaseNode):
             model_name="gpt-4o-mini",
             temperature=0,
             api_key=self.api_key,
+            cache=get_llm_cache(),  # 디스크 응답 캐시
         )
 
         # 문서 요약을 위한 체인을 생성합니다.
@@ -368,7 +728,10 @@ class CreatePageSummaryNode(BaseNode):
 
     def execute(self, state: GraphState) -> GraphState:
         # state에서 텍스트 데이터를 가져옵니다.
-        texts = state["texts"]
+        # 콘텐츠 필터를 거쳤으면 필터링된 텍스트만 요약합니다.
+        texts = state.get("summary_texts")
+        if texts is None:
+            texts = state["texts"]
 
         # 요약된 텍스트를 저장할 딕셔너리를 초기화합니다.
         text_summary = dict()
@@ -385,12 +748,24 @@ class CreatePageSummaryNode(BaseNode):
         text_summary_chain = self.create_text_summary_chain()
 
         # text_summary_chain을 사용하여 일괄 처리로 요약을 생성합니다.
-        summaries = text_summary_chain.batch(inputs)
+        # 프롬프트 + 예상 응답 토큰 수로 요청별 토큰 수를 추정합니다.
+        token_counts = [
+            count_text_tokens(text) + self.prompt_tokens + self.completion_tokens
+            for page_num, text in sorted_texts
+        ]
+
+        # 분당 토큰 예산과 동시 요청 제한 안에서 요약을 생성합니다.
+        summaries = get_request_scheduler("llm").batch(
+            text_summary_chain, inputs, token_counts
+        )
 
         # 생성된 요약을 페이지 번호와 함께 딕셔너리에 저장합니다.
-        for page_num, summary in enumerate(summaries):
+        for (page_num, _), summary in zip(sorted_texts, summaries):
             text_summary[page_num] = summary
 
+        # 내용이 같은 페이지는 원본 페이지의 요약을 재사용합니다.
+        apply_aliases(text_summary, state.get("page_aliases"))
+
         # 요약된 텍스트를 포함한 새로운 GraphState 객체를 반환합니다.
         return GraphState(text_summary=text_summary)
 
@@ -412,13 +787,18 @@ class CreateImageSummaryNode(BaseNode):
         # 페이지 번호를 오름차순으로 정렬
         page_numbers = sorted(list(state["page_elements"].keys()))
 
+        # 중복 이미지는 요약 요청에서 제외 (원본 이미지의 요약을 재사용)
+        element_aliases = state.get("element_aliases") or {}
+
         for page_num in page_numbers:
-            # 각 페이지의 요약된 텍스트를 가져옴
-            text = state["text_summary"][page_num]
+            # 각 페이지의 요약된 텍스트를 가져옴 (필터링된 페이지는 빈 문자열)
+            text = state["text_summary"].get(page_num, "")
             # 해당 페이지의 모든 이미지 요소에 대해 반복
             for image_element in state["page_elements"][page_num]["image_elements"]:
                 # 이미지 ID를 정수로 변환
                 image_id = int(image_element["id"])
+                if image_id in element_aliases:
+                    continue
 
                 # 데이터 배치에 이미지 정보, 관련 텍스트, 페이지 번호, ID를 추가
                 data_batches.append(
@@ -451,6 +831,9 @@ class CreateImageSummaryNode(BaseNode):
             # 데이터 배치의 ID를 키로 사용하여 이미지 요약 저장
             image_summary_output[data_batch["id"]] = image_summary
 
+        # 중복 이미지에 원본 이미지의 요약을 복사
+        apply_aliases(image_summary_output, state.get("element_aliases"))
+
         # 이미지 요약 결과를 포함한 새로운 GraphState 객체 반환
         return GraphState(image_summary=image_summary_output)
 
@@ -472,13 +855,18 @@ class CreateTableSummaryNode(BaseNode):
         # 페이지 번호를 오름차순으로 정렬
         page_numbers = sorted(list(state["page_elements"].keys()))
 
+        # 중복 표는 요약 요청에서 제외 (원본 표의 요약을 재사용)
+        element_aliases = state.get("element_aliases") or {}
+
         for page_num in page_numbers:
-            # 각 페이지의 요약된 텍스트를 가져옴
-            text = state["text_summary"][page_num]
+            # 각 페이지의 요약된 텍스트를 가져옴 (필터링된 페이지는 빈 문자열)
+            text = state["text_summary"].get(page_num, "")
             # 해당 페이지의 모든 테이블 요소에 대해 반복
             for image_element in state["page_elements"][page_num]["table_elements"]:
                 # 테이블 ID를 정수로 변환
                 image_id = int(image_element["id"])
+                if image_id in element_aliases:
+                    continue
 
                 # 데이터 배치에 테이블 정보, 관련 텍스트, 페이지 번호, ID를 추가
                 data_batches.append(
@@ -511,10 +899,48 @@ class CreateTableSummaryNode(BaseNode):
             # 데이터 배치의 ID를 키로 사용하여 테이블 요약 저장
             table_summary_output[data_batch["id"]] = table_summary
 
+        # 중복 표에 원본 표의 요약을 복사
+        apply_aliases(table_summary_output, state.get("element_aliases"))
+
         # 테이블 요약 결과를 포함한 새로운 GraphState 객체 반환
+        return GraphState(table_summary=table_summary_output)
+
+
+class TableAnalysisNode(CreateTableSummaryNode):
+    """
+    표 하나당 한 번의 멀티모달 요청으로 요약과 마크다운을 함께 생성하는 노드
+
+    CreateTableSummaryNode와 TableMarkdownExtractorNode를 대체하며,
+    표 이미지를 한 번만 업로드합니다.
+    """
+
+    def __init__(self, api_key, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.name = "TableAnalysisNode"
+
+    def execute(self, state: GraphState):
+        table_analysis_data_batches = self.create_table_summary_data_batches(state)
+        # 요약, 엔티티, 인사이트, 예상 질문, 마크다운을 한 번에 추출
+        responses = extract_table_analysis.invoke(
+            table_analysis_data_batches,
+        )
+
+        table_summary_output = dict()
+        table_markdown_output = dict()
+
+        # 응답을 표 요약과 마크다운으로 나누어 표 ID별로 저장
+        for data_batch, response in zip(table_analysis_data_batches, responses):
+            summary, markdown = parse_table_analysis(response)
+            table_summary_output[data_batch["id"]] = summary
+            table_markdown_output[data_batch["id"]] = markdown
+
+        # 중복 표에 원본 표의 결과를 복사
+        apply_aliases(table_summary_output, state.get("element_aliases"))
+        apply_aliases(table_markdown_output, state.get("element_aliases"))
+
         return GraphState(
             table_summary=table_summary_output,
-            table_summary_data_batches=table_summary_data_batches,
+            table_markdown=table_markdown_output,
         )
 
 
@@ -527,22 +953,48 @@ class TableMarkdownExtractorNode(BaseNode):
         super().__init__(**kwargs)
         self.name = "TableMarkdownExtractorNode"
 
+    def create_table_markdown_data_batches(self, state: GraphState):
+        # 테이블 마크다운 추출을 위한 데이터 배치를 생성하는 함수
+        # 요약 결과가 필요 없으므로 표 크롭과 페이지 요소만으로 만듭니다.
+        data_batches = []
+
+        # 중복 표는 추출 요청에서 제외 (원본 표의 마크다운을 재사용)
+        element_aliases = state.get("element_aliases") or {}
+
+        for page_num in sorted(state["page_elements"].keys()):
+            for table_element in state["page_elements"][page_num]["table_elements"]:
+                table_id = int(table_element["id"])
+                if table_id in element_aliases:
+                    continue
+
+                data_batches.append(
+                    {
+                        "table": state["tables"][table_id],  # 테이블 이미지 경로
+                        "page": page_num,  # 페이지 번호
+                        "id": table_id,  # 테이블 ID
+                    }
+                )
+        return data_batches
+
     def execute(self, state: GraphState):
+        table_markdown_data_batches = self.create_table_markdown_data_batches(state)
         # table_markdown_extractor를 사용하여 테이블 마크다운 생성
-        # state["table_summary_data_batches"]에 저장된 테이블 데이터를 사용
         table_markdowns = table_markdown_extractor.invoke(
-            state["table_summary_data_batches"],
+            table_markdown_data_batches,
         )
 
         # 결과를 저장할 딕셔너리 초기화
         table_markdown_output = dict()
 
         # 각 데이터 배치와 생성된 테이블 마크다운을 매칭하여 저장
-        for data_batch, table_summary in zip(
-            state["table_summary_data_batches"], table_markdowns
+        for data_batch, table_markdown in zip(
+            table_markdown_data_batches, table_markdowns
         ):
             # 데이터 배치의 id를 키로 사용하여 테이블 마크다운 저장
-            table_markdown_output[data_batch["id"]] = table_summary
+            table_markdown_output[data_batch["id"]] = table_markdown
+
+        # 중복 표에 원본 표의 마크다운을 복사
+        apply_aliases(table_markdown_output, state.get("element_aliases"))
 
         # 새로운 GraphState 객체 반환, table_markdown 키에 결과 저장
         return GraphState(table_markdown=table_markdown_output)
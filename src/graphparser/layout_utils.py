@@ -1,55 +1,140 @@
 import os
 import json
 import pickle
+import math
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
 import requests
 import pymupdf
 import tiktoken
 from PIL import Image
+from .rate_limit import dependency_limit
+from ..scheduler import check_deadline, remaining_time
+from tenacity import (
+    Retrying,
+    stop_after_attempt,
+    wait_exponential,
+    retry_if_exception_type,
+)
+
+
+# Upstage 레이아웃 분석 API 엔드포인트와 요청 옵션
+LAYOUT_ANALYSIS_URL = "https://api.upstage.ai/v1/document-ai/layout-analysis"
+LAYOUT_ANALYSIS_OPTIONS = {"ocr": False}
 
 
 class LayoutAnalyzer:
-    def __init__(self, api_key):
+    def __init__(
+        self, api_key, timeout=None, max_retries=0, rate_limiter=None, cache=None
+    ):
         """
         LayoutAnalyzer 클래스의 생성자
 
         :param api_key: Upstage API 인증을 위한 API 키
+        :param timeout: API 요청 1회의 타임아웃(초), None이면 제한 없음
+        :param max_retries: 실패한 요청의 최대 재시도 횟수
+        :param rate_limiter: 요청 전에 토큰을 획득할 TokenBucket (선택)
+        :param cache: 분석 결과를 저장할 DiskCache (선택)
         """
         self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        self.cache = cache
 
-    def _upstage_layout_analysis(self, input_file):
+    @staticmethod
+    def cache_key(document):
         """
-        Upstage의 레이아웃 분석 API를 호출하여 문서 분석을 수행합니다.
+        PDF 바이트와 요청 옵션(엔드포인트 버전 포함)으로 캐시 키를 생성합니다.
 
-        :param input_file: 분석할 PDF 파일의 경로
-        :return: 분석 결과가 저장된 JSON 파일의 경로
+        :param document: 분석할 PDF 파일의 바이트
+        :return: SHA-256 기반 캐시 키
+        """
+        hasher = hashlib.sha256(document)
+        options = {"endpoint": LAYOUT_ANALYSIS_URL, **LAYOUT_ANALYSIS_OPTIONS}
+        hasher.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def invalidate_cache(self, input_file):
+        """
+        입력 파일에 대한 캐시 항목을 삭제합니다.
+
+        :param input_file: 분석했던 PDF 파일의 경로
+        :return: 캐시 항목이 삭제되었는지 여부
         """
+        if self.cache is None:
+            return False
+        with open(input_file, "rb") as f:
+            return self.cache.invalidate(self.cache_key(f.read()))
+
+    def _post(self, document, filename):
+        """
+        레이아웃 분석 API에 요청을 1회 보냅니다.
+
+        :param document: 분석할 PDF 파일의 바이트
+        :param filename: 요청에 포함할 파일 이름
+        :return: API 응답 객체
+        """
+        # 속도 제한이 설정된 경우 토큰을 얻을 때까지 대기
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        # 문서 처리 시간이 지났으면 요청하지 않고, 남은 시간보다 오래 기다리지 않음
+        check_deadline()
+        timeout = self.timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
         # API 요청 헤더 설정
         headers = {"Authorization": f"Bearer {self.api_key}"}
 
-        # API 요청 데이터 설정 (OCR 비활성화)
-        data = {"ocr": False}
+        # API 요청 보내기 (프로세스 전역 동시 요청 제한 적용)
+        with dependency_limit("layout"):
+            response = requests.post(
+                LAYOUT_ANALYSIS_URL,
+                headers=headers,
+                data=LAYOUT_ANALYSIS_OPTIONS,
+                files={"document": (filename, document)},
+                timeout=timeout,
+            )
 
-        # 분석할 PDF 파일 열기
-        files = {"document": open(input_file, "rb")}
+        # 속도 제한(429)과 서버 오류(5xx)는 재시도 대상
+        if response.status_code == 429 or response.status_code >= 500:
+            raise ValueError(f"API 요청 실패. 상태 코드: {response.status_code}")
+        return response
 
-        # API 요청 보내기
-        response = requests.post(
-            "https://api.upstage.ai/v1/document-ai/layout-analysis",
-            headers=headers,
-            data=data,
-            files=files,
-        )
+    def _upstage_layout_analysis(self, document, filename):
+        """
+        Upstage의 레이아웃 분석 API를 호출하여 문서 분석을 수행합니다.
 
-        # API 응답 처리 및 결과 저장
-        if response.status_code == 200:
-            # 분석 결과를 저장할 JSON 파일 경로 생성
-            output_file = os.path.splitext(input_file)[0] + ".json"
+        :param document: 분석할 PDF 파일의 바이트
+        :param filename: 요청에 포함할 파일 이름
+        :return: 분석 결과 JSON 바이트
+        """
+        # 동일한 PDF와 옵션으로 분석한 결과가 캐시에 있으면 API를 호출하지 않음
+        key = self.cache_key(document) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
 
-            # 분석 결과를 JSON 파일로 저장
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(response.json(), f, ensure_ascii=False)
+        # 타임아웃, 연결 오류, 429/5xx 응답은 지수 백오프로 재시도
+        retrying = Retrying(
+            stop=stop_after_attempt(self.max_retries + 1),
+            wait=wait_exponential(multiplier=1, min=1, max=30),
+            retry=retry_if_exception_type((requests.RequestException, ValueError)),
+            reraise=True,
+        )
+        response = retrying(self._post, document, filename)
 
-            return output_file
+        # API 응답 처리
+        if response.status_code == 200:
+            result = json.dumps(response.json(), ensure_ascii=False).encode("utf-8")
+            if key is not None:
+                self.cache.set(key, result)
+            return result
         else:
             # API 요청이 실패한 경우 예외 발생
             raise ValueError(f"API 요청 실패. 상태 코드: {response.status_code}")
@@ -61,7 +146,27 @@ class LayoutAnalyzer:
         :param input_file: 분석할 PDF 파일의 경로
         :return: 분석 결과가 저장된 JSON 파일의 경로
         """
-        return self._upstage_layout_analysis(input_file)
+        with open(input_file, "rb") as f:
+            document = f.read()
+
+        result = self._upstage_layout_analysis(document, os.path.basename(input_file))
+
+        # 분석 결과를 JSON 파일로 저장
+        output_file = os.path.splitext(input_file)[0] + ".json"
+        with open(output_file, "wb") as f:
+            f.write(result)
+
+        return output_file
+
+    def analyze(self, document, filename="document.pdf"):
+        """
+        메모리에 있는 PDF 바이트에 대해 레이아웃 분석을 실행합니다.
+
+        :param document: 분석할 PDF 파일의 바이트
+        :param filename: 요청에 포함할 파일 이름
+        :return: 분석 결과 딕셔너리
+        """
+        return json.loads(self._upstage_layout_analysis(document, filename))
 
 
 class ImageCropper:
@@ -80,6 +185,65 @@ class ImageCropper:
             page_img = Image.frombytes("RGB", target_page_size, page.samples)
         return page_img
 
+    @staticmethod
+    def page_to_image(page, dpi=300):
+        """
+        이미 열린 PDF 페이지를 이미지로 변환하는 메서드
+
+        :param page: pymupdf 페이지 객체
+        :param dpi: 이미지 해상도 (기본값: 300)
+        :return: 변환된 이미지 객체
+        """
+        pixmap = page.get_pixmap(dpi=dpi)
+        return Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
+
+    @staticmethod
+    def crop_region(page, coordinates, output_file, dpi=300):
+        """
+        페이지 전체가 아닌 요소 영역만 PDF에서 직접 렌더링하여 저장하는 메서드
+
+        :param page: pymupdf 페이지 객체
+        :param coordinates: 정규화된 좌표 (x1, y1, x2, y2)
+        :param output_file: 저장할 파일 경로
+        :param dpi: 이미지 해상도 (기본값: 300)
+        """
+        rect = page.rect
+        x1, y1, x2, y2 = coordinates
+        clip = pymupdf.Rect(
+            rect.x0 + x1 * rect.width,
+            rect.y0 + y1 * rect.height,
+            rect.x0 + x2 * rect.width,
+            rect.y0 + y2 * rect.height,
+        )
+        page.get_pixmap(dpi=dpi, clip=clip).save(output_file)
+
+    @staticmethod
+    def crop_page_elements(doc, page_num, crops, dpi=300, clip=False):
+        """
+        한 페이지의 모든 요소를 크롭하는 메서드
+
+        clip=False이면 페이지를 한 번만 래스터화하여 모든 요소를 잘라내고,
+        clip=True이면 각 요소 영역만 요소별 해상도로 직접 렌더링합니다.
+
+        :param doc: 열린 pymupdf 문서 객체
+        :param page_num: 크롭할 페이지 번호 (0부터 시작)
+        :param crops: (정규화된 좌표, 저장할 파일 경로, 요소별 dpi 또는 None) 튜플 리스트
+        :param dpi: 기본 이미지 해상도 (기본값: 300)
+        :param clip: 요소 영역만 렌더링할지 여부
+        """
+        page = doc[page_num]
+        if clip:
+            for coordinates, output_file, element_dpi in crops:
+                ImageCropper.crop_region(
+                    page, coordinates, output_file, dpi=element_dpi or dpi
+                )
+            return
+
+        # 페이지 전체 래스터화는 요소별 dpi를 적용하지 않습니다.
+        page_img = ImageCropper.page_to_image(page, dpi)
+        for coordinates, output_file, _ in crops:
+            ImageCropper.crop_image(page_img, coordinates, output_file)
+
     @staticmethod
     def normalize_coordinates(coordinates, output_page_size):
         """
@@ -118,6 +282,110 @@ class ImageCropper:
         cropped_img.save(output_file)
 
 
+# 프로세스 풀 작업자마다 한 번만 연 PDF 문서
+_worker_doc = None
+
+
+def _init_crop_worker(pdf_file):
+    """프로세스 풀 작업자 초기화: 작업자당 PDF 문서를 한 번만 엽니다."""
+    global _worker_doc
+    _worker_doc = pymupdf.open(pdf_file)
+
+
+def _crop_page_worker(page_num, crops, dpi, clip):
+    """프로세스 풀 작업자에서 한 페이지의 요소들을 크롭합니다."""
+    ImageCropper.crop_page_elements(_worker_doc, page_num, crops, dpi, clip)
+    return page_num
+
+
+def crop_pages(pdf_file, page_crops, dpi=300, max_workers=1, clip=False):
+    """
+    페이지별 크롭 작업을 실행합니다. 문서는 (작업자당) 한 번만 열립니다.
+
+    :param pdf_file: PDF 파일 경로
+    :param page_crops: {페이지 번호: [(정규화된 좌표, 저장할 파일 경로, dpi 또는 None), ...]}
+    :param dpi: 기본 이미지 해상도 (기본값: 300)
+    :param max_workers: 프로세스 풀 작업자 수 (1이면 현재 프로세스에서 처리)
+    :param clip: 페이지 전체 대신 요소 영역만 렌더링할지 여부
+    """
+    if max_workers <= 1 or len(page_crops) <= 1:
+        with pymupdf.open(pdf_file) as doc:
+            for page_num, crops in page_crops.items():
+                ImageCropper.crop_page_elements(doc, page_num, crops, dpi, clip)
+        return
+
+    workers = min(max_workers, len(page_crops))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_crop_worker,
+        initargs=(pdf_file,),
+    ) as executor:
+        futures = [
+            executor.submit(_crop_page_worker, page_num, crops, dpi, clip)
+            for page_num, crops in page_crops.items()
+        ]
+        for future in futures:
+            future.result()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model_name):
+    """모델에 맞는 tiktoken 인코딩을 반환합니다. 불러올 수 없으면 None을 반환합니다."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+
+
+def count_text_tokens(text, model_name="gpt-4o-mini"):
+    """
+    텍스트의 토큰 수를 계산합니다.
+
+    인코딩 파일을 내려받을 수 없는 환경에서는 글자 수 기반으로 추정합니다.
+
+    :param text: 토큰 수를 계산할 텍스트
+    :param model_name: 모델명
+    :return: 토큰 수
+    """
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        # 한국어는 대략 1~2글자당 1토큰이므로 보수적으로 추정
+        return len(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_image_tokens(image_path, detail="high", max_pixels=None):
+    """
+    이미지 입력의 토큰 수를 OpenAI 비전 모델의 타일 계산 방식으로 추정합니다.
+
+    :param image_path: 이미지 파일 경로
+    :param detail: 이미지 해상도 옵션 ("low" 또는 "high")
+    :param max_pixels: 전송 전에 이미지를 축소하는 최대 픽셀 수 (없으면 원본 크기)
+    :return: 이미지 토큰 수
+    """
+    if detail == "low":
+        return 85
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+
+    if max_pixels and width * height > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+        width, height = width * scale, height * scale
+
+    # 2048x2048 안에 들어가도록 축소한 뒤, 짧은 변을 768로 맞춤
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
 def save_state(state, filepath):
     """상태를 pickle 파일로 저장합니다."""
     base, _ = os.path.splitext(filepath)
@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+import threading
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from ..cache import DiskCache
+from .rate_limit import charge_request_budget, mark_request_cache_hit
+
+
+class LLMResponseCache(BaseCache):
+    """
+    LLM 응답을 디스크에 저장하는 LangChain 캐시
+
+    ChatOpenAI(cache=...)로 연결하면 같은 모델/설정/프롬프트 요청은 API를 호출하지 않습니다.
+    RequestScheduler 안에서 실행되면 조회가 실패한 요청만 토큰 예산을 소비합니다.
+    """
+
+    def __init__(self, path, max_size_bytes=None, ttl=None):
+        """
+        :param path: SQLite 캐시 파일 경로
+        :param max_size_bytes: 캐시 총 크기 상한 (초과 시 LRU 제거)
+        :param ttl: 응답 유효 기간(초)
+        """
+        self.store = DiskCache(path, max_size_bytes=max_size_bytes, ttl=ttl)
+
+    @staticmethod
+    def cache_key(prompt, llm_string):
+        """
+        캐시 키를 생성합니다.
+
+        llm_string에는 모델명과 temperature 등 호출 설정이, prompt에는 직렬화된 메시지
+        (시스템/사용자 프롬프트와 base64 이미지)가 들어 있으므로 해시 하나로
+        모델, 프롬프트, 이미지 내용, temperature가 모두 키에 반영됩니다.
+
+        :param prompt: 직렬화된 프롬프트 문자열
+        :param llm_string: LLM 설정 문자열
+        :return: SHA-256 캐시 키
+        """
+        hasher = hashlib.sha256(llm_string.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(prompt.encode("utf-8"))
+        return hasher.hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        value = self.store.get(self.cache_key(prompt, llm_string))
+        generations = None
+        if value is not None:
+            try:
+                generations = [loads(generation) for generation in json.loads(value)]
+            except Exception:
+                # 역직렬화할 수 없는 항목은 없는 것으로 간주
+                generations = None
+
+        if generations is None:
+            # 이어서 API를 호출하므로 이때 토큰 예산을 소비 (속도 제한 대기)
+            charge_request_budget()
+        else:
+            mark_request_cache_hit()
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        value = json.dumps([dumps(generation) for generation in return_val])
+        self.store.set(self.cache_key(prompt, llm_string), value.encode("utf-8"))
+
+    def clear(self, **kwargs):
+        self.store.clear()
+
+    def stats(self):
+        """캐시 적중/실패 횟수, 적중률, 항목 수, 총 크기를 반환합니다."""
+        return self.store.stats()
+
+    def report(self):
+        """적중률 요약 문자열을 반환합니다."""
+        stats = self.stats()
+        return (
+            f"LLM 캐시 적중률 {stats['hit_rate']:.1%} "
+            f"(적중 {stats['hits']}, 실패 {stats['misses']}, "
+            f"항목 {stats['entries']}, {stats['size_bytes'] / 1024**2:.1f}MB)"
+        )
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    파서 체인들이 공유하는 LLM 응답 캐시를 반환합니다.
+
+    환경 변수:
+        LLM_CACHE_PATH: 캐시 파일 경로 (기본값: data/cache/llm_responses.sqlite3)
+        LLM_CACHE_MAX_BYTES: 캐시 총 크기 상한 (기본값: 1GB)
+        LLM_CACHE_TTL: 응답 유효 기간(초) (기본값: 30일)
+        LLM_CACHE_DISABLED: 1이면 캐시를 사용하지 않음
+    """
+    global _llm_cache
+    if os.environ.get("LLM_CACHE_DISABLED") == "1":
+        return None
+
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(
+                os.environ.get("LLM_CACHE_PATH", "data/cache/llm_responses.sqlite3"),
+                max_size_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", 1024**3)),
+                ttl=float(os.environ.get("LLM_CACHE_TTL", 30 * 24 * 3600)),
+            )
+        return _llm_cache
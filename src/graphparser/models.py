@@ -1,14 +1,127 @@
+import io
+import math
 import base64
+import threading
 import requests
+from collections import OrderedDict
 from IPython.display import Image, display
+from PIL import Image as PILImage
 import os
+from .rate_limit import get_request_scheduler
+from .layout_utils import count_text_tokens, count_image_tokens
+
+
+class ImagePreprocessor:
+    """
+    멀티모달 요청 전에 이미지를 축소/재인코딩하고 결과를 캐시하는 클래스
+
+    같은 크롭 이미지를 여러 체인(표 요약, 마크다운 추출)에서 사용할 때
+    한 번만 인코딩합니다.
+    """
+
+    def __init__(
+        self,
+        max_pixels=2048 * 768,
+        grayscale=False,
+        image_format="PNG",
+        quality=85,
+        cache_size=256,
+    ):
+        """
+        :param max_pixels: 최대 픽셀 수 (가로 x 세로), 초과하면 비율을 유지하며 축소
+        :param grayscale: 흑백으로 변환할지 여부
+        :param image_format: 인코딩 형식 ("PNG" 또는 "JPEG")
+        :param quality: JPEG 품질 (1~95)
+        :param cache_size: 인코딩 결과를 보관할 최대 이미지 수
+        """
+        self.max_pixels = max_pixels
+        self.grayscale = grayscale
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, file_path):
+        """
+        이미지를 설정에 맞게 변환하여 (바이트, MIME 타입)을 반환합니다.
+
+        :param file_path: 이미지 파일 경로
+        :return: (인코딩된 이미지 바이트, MIME 타입)
+        """
+        with PILImage.open(file_path) as img:
+            img.load()
+            width, height = img.size
+            if self.max_pixels and width * height > self.max_pixels:
+                scale = math.sqrt(self.max_pixels / (width * height))
+                img = img.resize(
+                    (max(1, int(width * scale)), max(1, int(height * scale))),
+                    PILImage.LANCZOS,
+                )
+
+            if self.grayscale:
+                img = img.convert("L")
+            elif self.image_format == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+
+            buffer = io.BytesIO()
+            if self.image_format == "JPEG":
+                img.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+                mime_type = "image/jpeg"
+            else:
+                img.save(buffer, format="PNG", optimize=True)
+                mime_type = "image/png"
+
+        return buffer.getvalue(), mime_type
+
+    def encode(self, file_path):
+        """
+        이미지를 변환하여 base64 data URL로 반환합니다. 결과는 LRU 캐시에 보관됩니다.
+
+        :param file_path: 이미지 파일 경로
+        :return: base64 data URL
+        """
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        image_content, mime_type = self.prepare(file_path)
+        encoded = (
+            f"data:{mime_type};base64,{base64.b64encode(image_content).decode('utf-8')}"
+        )
+
+        with self._lock:
+            self._cache[key] = encoded
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return encoded
+
+    def stats(self):
+        """인코딩 캐시 적중/실패 횟수를 반환합니다."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
 
 
 class MultiModal:
-    def __init__(self, model, system_prompt=None, user_prompt=None):
+    # 요청당 예상 응답 토큰 수 (토큰 예산 계산용)
+    completion_tokens = 1000
+
+    def __init__(
+        self, model, system_prompt=None, user_prompt=None, image_preprocessor=None
+    ):
         self.model = model
         self.system_prompt = system_prompt
         self.user_prompt = user_prompt
+        # 설정된 경우 파일 이미지를 축소/재인코딩하여 전송
+        self.image_preprocessor = image_preprocessor
         self.init_prompt()
 
     def init_prompt(self):
@@ -36,6 +149,8 @@ class MultiModal:
 
     # 이미지를 base64로 인코딩하는 함수 (파일)
     def encode_image_from_file(self, file_path):
+        if self.image_preprocessor is not None:
+            return self.image_preprocessor.encode(file_path)
         with open(file_path, "rb") as image_file:
             image_content = image_file.read()
             file_ext = os.path.splitext(file_path)[1].lower()
@@ -54,6 +169,22 @@ class MultiModal:
         else:
             return self.encode_image_from_file(image_path)
 
+    # 요청의 예상 토큰 수를 계산하는 함수 (프롬프트 + 이미지 + 응답)
+    def estimate_tokens(self, image_url, system_prompt=None, user_prompt=None):
+        model_name = getattr(self.model, "model_name", "gpt-4o-mini")
+        text = (system_prompt or self.system_prompt) + (user_prompt or self.user_prompt)
+        if image_url.startswith("http://") or image_url.startswith("https://"):
+            # 원격 이미지는 크기를 알 수 없으므로 1024x1024 기준으로 추정
+            image_tokens = 765
+        else:
+            max_pixels = (
+                self.image_preprocessor.max_pixels if self.image_preprocessor else None
+            )
+            image_tokens = count_image_tokens(image_url, max_pixels=max_pixels)
+        return (
+            count_text_tokens(text, model_name) + image_tokens + self.completion_tokens
+        )
+
     def display_image(self, encoded_image):
         display(Image(url=encoded_image))
 
@@ -109,6 +240,7 @@ class MultiModal:
         display_image=False,
     ):
         messages = []
+        token_counts = []
         for image_url, system_prompt, user_prompt in zip(
             image_urls, system_prompts, user_prompts
         ):
@@ -116,7 +248,13 @@ class MultiModal:
                 image_url, system_prompt, user_prompt, display_image
             )
             messages.append(message)
-        response = self.model.batch(messages)
+            token_counts.append(
+                self.estimate_tokens(image_url, system_prompt, user_prompt)
+            )
+        # 분당 토큰 예산과 동시 요청 제한 안에서 요청을 보냅니다.
+        response = get_request_scheduler("llm").batch(
+            self.model, messages, token_counts
+        )
         return [r.content for r in response]
 
     def stream(
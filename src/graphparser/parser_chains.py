@@ -1,8 +1,19 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.runnables import chain
-from .models import MultiModal
+import os
+import re
+from .models import MultiModal, ImagePreprocessor
+from .llm_cache import get_llm_cache
 from .state import GraphState
 
+# 모든 체인이 공유하는 이미지 전처리기 (같은 크롭은 한 번만 인코딩)
+image_preprocessor = ImagePreprocessor(
+    max_pixels=int(os.environ.get("IMAGE_MAX_PIXELS", 2048 * 768)),
+    grayscale=os.environ.get("IMAGE_GRAYSCALE") == "1",
+    image_format=os.environ.get("IMAGE_FORMAT", "PNG"),
+    quality=int(os.environ.get("IMAGE_JPEG_QUALITY", 85)),
+)
+
 
 @chain
 def extract_image_summary(data_batches):
@@ -10,6 +21,7 @@ def extract_image_summary(data_batches):
     llm = ChatOpenAI(
         temperature=0,  # 창의성 (0.0 ~ 2.0)
         model_name="gpt-4o-mini",  # 모델명
+        cache=get_llm_cache(),  # 디스크 응답 캐시
     )
 
     system_prompt = """You are an expert in extracting useful information from IMAGE.
@@ -53,7 +65,7 @@ Output must be written in {language}.
         user_prompts.append(user_prompt_template)
 
     # 멀티모달 객체 생성
-    multimodal_llm = MultiModal(llm)
+    multimodal_llm = MultiModal(llm, image_preprocessor=image_preprocessor)
 
     # 이미지 파일로 부터 질의
     answer = multimodal_llm.batch(
@@ -68,6 +80,7 @@ def extract_table_summary(data_batches):
     llm = ChatOpenAI(
         temperature=0,  # 창의성 (0.0 ~ 2.0)
         model_name="gpt-4o-mini",  # 모델명
+        cache=get_llm_cache(),  # 디스크 응답 캐시
     )
 
     system_prompt = """You are an expert in extracting useful information from TABLE. 
@@ -115,7 +128,7 @@ Output must be written in {language}.
         user_prompts.append(user_prompt_template)
 
     # 멀티모달 객체 생성
-    multimodal_llm = MultiModal(llm)
+    multimodal_llm = MultiModal(llm, image_preprocessor=image_preprocessor)
 
     # 이미지 파일로 부터 질의
     answer = multimodal_llm.batch(
@@ -130,6 +143,7 @@ def table_markdown_extractor(data_batches):
     llm = ChatOpenAI(
         temperature=0,  # 창의성 (0.0 ~ 2.0)
         model_name="gpt-4o-mini",  # 모델명
+        cache=get_llm_cache(),  # 디스크 응답 캐시
     )
 
     system_prompt = "You are an expert in converting image of the TABLE into markdown format. Be sure to include all the information in the table. DO NOT narrate, just answer in markdown format."
@@ -155,10 +169,104 @@ Output must be written in Korean.
         user_prompts.append(user_prompt_template)
 
     # 멀티모달 객체 생성
-    multimodal_llm = MultiModal(llm)
+    multimodal_llm = MultiModal(llm, image_preprocessor=image_preprocessor)
+
+    # 이미지 파일로 부터 질의
+    answer = multimodal_llm.batch(
+        image_paths, system_prompts, user_prompts, display_image=False
+    )
+    return answer
+
+
+@chain
+def extract_table_analysis(data_batches):
+    """
+    표 이미지 하나당 한 번의 요청으로 요약과 마크다운을 함께 추출합니다.
+    응답은 parse_table_analysis로 요약과 마크다운으로 나눕니다.
+    """
+    # 객체 생성
+    llm = ChatOpenAI(
+        temperature=0,  # 창의성 (0.0 ~ 2.0)
+        model_name="gpt-4o-mini",  # 모델명
+        cache=get_llm_cache(),  # 디스크 응답 캐시
+    )
+
+    system_prompt = """You are an expert in extracting useful information from TABLE. 
+With a given image, your task is to extract key entities, summarize them, and write useful information that can be used later for retrieval.
+If the numbers are present, summarize important insights from the numbers.
+Also, provide five hypothetical questions based on the image that users can ask.
+Finally, convert the TABLE into markdown format. Be sure to include all the information in the table.
+"""
+
+    image_paths = []
+    system_prompts = []
+    user_prompts = []
+
+    for data_batch in data_batches:
+        context = data_batch["text"]
+        image_path = data_batch["table"]
+        language = data_batch["language"]
+        user_prompt_template = f"""Here is the context related to the image of table: {context}
+        
+###
+
+Output Format:
+
+<table>
+<title>
+[title]
+</title>
+<summary>
+[summary]
+</summary>
+<entities> 
+[entities]
+</entities>
+<data_insights>
+[data_insights]
+</data_insights>
+<hypothetical_questions>
+[hypothetical_questions]
+</hypothetical_questions>
+</table>
+<table_markdown>
+[markdown table]
+</table_markdown>
+
+DO NOT wrap the markdown table in ```markdown```.
+Output must be written in {language}.
+"""
+        image_paths.append(image_path)
+        system_prompts.append(system_prompt)
+        user_prompts.append(user_prompt_template)
+
+    # 멀티모달 객체 생성
+    multimodal_llm = MultiModal(llm, image_preprocessor=image_preprocessor)
 
     # 이미지 파일로 부터 질의
     answer = multimodal_llm.batch(
         image_paths, system_prompts, user_prompts, display_image=False
     )
     return answer
+
+
+def parse_table_analysis(response):
+    """
+    extract_table_analysis의 응답을 표 요약과 마크다운으로 나눕니다.
+
+    요약은 기존 extract_table_summary와 같은 <table> 블록 형식으로 반환하며,
+    <table_markdown> 태그가 없으면 마크다운은 빈 문자열입니다.
+
+    :param response: LLM 응답 문자열
+    :return: (표 요약, 표 마크다운)
+    """
+    markdown_match = re.search(
+        r"<table_markdown>(.*?)(?:</table_markdown>|$)", response, re.DOTALL
+    )
+    if markdown_match is None:
+        return response.strip(), ""
+
+    markdown = markdown_match.group(1).strip()
+    markdown = re.sub(r"^```(?:markdown)?\s*|\s*```$", "", markdown)
+    summary = response[: markdown_match.start()] + response[markdown_match.end() :]
+    return summary.strip(), markdown
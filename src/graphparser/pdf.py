@@ -4,23 +4,226 @@ import os
 from .state import GraphState
 
 
+class PageRouterNode(BaseNode):
+    """
+    페이지를 로컬에서 분류하여 텍스트만 있는 페이지는 PyMuPDF로 바로 처리하고,
+    이미지/도형(표, 차트)이 있는 복잡한 페이지만 레이아웃 분석 API로 보내는 노드
+
+    머리글/바닥글 로고처럼 작은 장식용 이미지는 무시하고, 이미지가 페이지에서
+    차지하는 면적 비율로 판단합니다.
+
+    텍스트 전용 페이지의 결과는 레이아웃 분석 결과와 같은 형식(local_batches)으로
+    만들어 ExtractPageElementsNode에서 함께 처리됩니다.
+    """
+
+    def __init__(
+        self, min_text_chars=50, max_drawings=20, max_image_ratio=0.05, **kwargs
+    ):
+        """
+        :param min_text_chars: 텍스트 전용 페이지로 볼 최소 글자 수
+            (이보다 적으면 스캔/그림 페이지일 수 있어 API로 보냄)
+        :param max_drawings: 텍스트 전용 페이지에 허용할 최대 도형 수
+            (구분선 등은 허용하고, 표 테두리나 벡터 차트는 복잡한 페이지로 분류)
+        :param max_image_ratio: 텍스트 전용 페이지에 허용할 이미지 면적 비율
+            (페이지 면적 대비 이미지 영역 합계, 로고 등 작은 이미지는 허용)
+        """
+        super().__init__(**kwargs)
+        self.name = "PageRouterNode"
+        self.min_text_chars = min_text_chars
+        self.max_drawings = max_drawings
+        self.max_image_ratio = max_image_ratio
+
+    @staticmethod
+    def image_area_ratio(page):
+        """
+        페이지 면적 대비 이미지가 그려진 영역 합계의 비율을 계산합니다.
+
+        같은 이미지가 여러 번 그려지면 각 위치를 모두 더하고(xref별로 한 번만 조회),
+        페이지 밖으로 나간 부분은 제외합니다.
+
+        :param page: PyMuPDF 페이지 객체
+        :return: 이미지 면적 비율 (0 이상)
+        """
+        page_area = page.rect.get_area()
+        if page_area <= 0:
+            return 0.0
+        image_area = 0.0
+        for xref in {image[0] for image in page.get_images(full=False)}:
+            for rect in page.get_image_rects(xref):
+                image_area += (rect & page.rect).get_area()
+        return image_area / page_area
+
+    def is_complex_page(self, page):
+        """
+        페이지에 레이아웃 분석이 필요한지 판단합니다.
+
+        :param page: PyMuPDF 페이지 객체
+        :return: 복잡한 페이지 여부
+        """
+        if self.image_area_ratio(page) > self.max_image_ratio:
+            return True
+        if len(page.get_text().strip()) < self.min_text_chars:
+            return True
+        return len(page.get_drawings()) > self.max_drawings
+
+    @staticmethod
+    def extract_local_elements(page, page_number):
+        """
+        텍스트 블록을 레이아웃 분석 결과와 같은 형식의 요소로 변환합니다.
+
+        :param page: PyMuPDF 페이지 객체
+        :param page_number: 배치 내 페이지 번호 (1부터 시작)
+        :return: 요소 리스트
+        """
+        elements = []
+        for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks", sort=True):
+            # 이미지 블록은 제외 (텍스트 전용 페이지에는 없어야 함)
+            if block_type != 0 or not text.strip():
+                continue
+            elements.append(
+                {
+                    "category": "paragraph",
+                    "page": page_number,
+                    "text": text.strip() + "\n",
+                    "bounding_box": [
+                        {"x": x0, "y": y0},
+                        {"x": x1, "y": y0},
+                        {"x": x1, "y": y1},
+                        {"x": x0, "y": y1},
+                    ],
+                }
+            )
+        return elements
+
+    def execute(self, state: GraphState) -> GraphState:
+        filepath = state["filepath"]
+
+        complex_pages = []
+        local_batches = []
+        with pymupdf.open(filepath) as doc:
+            for page_num, page in enumerate(doc):
+                if self.is_complex_page(page):
+                    complex_pages.append(page_num)
+                    continue
+
+                # 페이지 크기를 포인트 단위로 기록하여 좌표와 같은 기준을 사용
+                local_batches.append(
+                    {
+                        "start_page": page_num,
+                        "end_page": page_num,
+                        "result": {
+                            "metadata": {
+                                "pages": [
+                                    {
+                                        "page": 1,
+                                        "width": page.rect.width,
+                                        "height": page.rect.height,
+                                    }
+                                ]
+                            },
+                            "elements": self.extract_local_elements(page, 1),
+                        },
+                    }
+                )
+
+        print(
+            f"페이지 라우팅: 로컬 처리 {len(local_batches)}페이지, "
+            f"레이아웃 분석 {len(complex_pages)}페이지"
+        )
+        return GraphState(complex_pages=complex_pages, local_batches=local_batches)
+
+
 class SplitPDFFilesNode(BaseNode):
 
-    def __init__(self, batch_size=10, **kwargs):
+    def __init__(self, batch_size=10, in_memory=False, **kwargs):
+        """
+        :param batch_size: 분할 단위 페이지 수
+        :param in_memory: True이면 분할 파일을 쓰지 않고 메모리 버퍼로만 유지
+        """
         super().__init__(**kwargs)
         self.name = "SplitPDFNode"
         self.batch_size = batch_size
+        self.in_memory = in_memory
+
+    def page_ranges(self, num_pages, pages=None):
+        """
+        분할할 페이지 범위를 계산합니다.
+
+        pages가 주어지면 해당 페이지들 중 연속된 구간만 batch_size 단위로 나눕니다.
+
+        :param num_pages: 전체 페이지 수
+        :param pages: 분할할 페이지 번호 목록 (0부터 시작, None이면 전체 페이지)
+        :return: (시작 페이지, 끝 페이지) 튜플 리스트
+        """
+        pages = range(num_pages) if pages is None else sorted(pages)
+
+        ranges = []
+        start_page = end_page = None
+        for page_num in pages:
+            if (
+                start_page is not None
+                and page_num == end_page + 1
+                and page_num - start_page < self.batch_size
+            ):
+                end_page = page_num
+                continue
+            if start_page is not None:
+                ranges.append((start_page, end_page))
+            start_page = end_page = page_num
+        if start_page is not None:
+            ranges.append((start_page, end_page))
+        return ranges
+
+    def iter_batches(self, filepath, pages=None):
+        """
+        PDF를 batch_size 페이지씩 나눈 메모리 배치를 하나씩 생성합니다.
+
+        스트리밍 모드에서 분할 배치를 모두 메모리에 올리지 않고 필요할 때마다 만듭니다.
+
+        :param filepath: PDF 파일 경로
+        :param pages: 분할할 페이지 번호 목록 (None이면 전체 페이지)
+        :return: {"start_page", "end_page", "document"} 딕셔너리를 생성하는 제너레이터
+        """
+        with pymupdf.open(filepath) as input_pdf:
+            num_pages = len(input_pdf)
+            print(f"총 페이지 수: {num_pages}")
+            for start_page, end_page in self.page_ranges(num_pages, pages):
+                with pymupdf.open() as output_pdf:
+                    output_pdf.insert_pdf(
+                        input_pdf, from_page=start_page, to_page=end_page
+                    )
+                    # 새 문서 ID를 만들지 않아야 같은 배치가 항상 같은 바이트가 되어
+                    # 레이아웃 분석 캐시 키가 재실행 간에 일치함
+                    document = output_pdf.tobytes(no_new_id=True)
+                print(f"분할 PDF 생성 (메모리): {start_page}-{end_page}")
+                yield {
+                    "start_page": start_page,
+                    "end_page": end_page,
+                    "document": document,
+                }
 
     def execute(self, state: GraphState) -> GraphState:
         """
         입력 PDF를 여러 개의 작은 PDF 파일로 분할합니다.
 
         :param state: GraphState 객체, PDF 파일 경로와 배치 크기 정보를 포함
-        :return: 분할된 PDF 파일 경로 목록을 포함한 GraphState 객체
+        :return: 분할된 PDF 파일 경로 목록(또는 메모리 배치 목록)을 포함한 GraphState 객체
         """
         # PDF 파일 경로와 배치 크기 추출
         filepath = state["filepath"]
 
+        # 페이지 라우터가 있으면 레이아웃 분석이 필요한 페이지만 분할
+        complex_pages = state.get("complex_pages")
+
+        if self.in_memory:
+            # 분할 PDF를 파일로 저장하지 않고 페이지 범위와 함께 바이트로 보관
+            return GraphState(
+                filepath=filepath,
+                filetype="pdf",
+                split_filepaths=[],
+                split_batches=list(self.iter_batches(filepath, complex_pages)),
+            )
+
         # PDF 파일 열기
         input_pdf = pymupdf.open(filepath)
         num_pages = len(input_pdf)
@@ -28,10 +231,8 @@ class SplitPDFFilesNode(BaseNode):
 
         ret = []
         # PDF 분할 작업 시작
-        for start_page in range(0, num_pages, self.batch_size):
-            # 배치의 마지막 페이지 계산 (전체 페이지 수를 초과하지 않도록)
-            end_page = min(start_page + self.batch_size, num_pages) - 1
-
+        # 배치의 페이지 범위 계산 (전체 페이지 수를 초과하지 않도록)
+        for start_page, end_page in self.page_ranges(num_pages, complex_pages):
             # 분할된 PDF 파일명 생성
             input_file_basename = os.path.splitext(filepath)[0]
             output_file = f"{input_file_basename}_{start_page:04d}_{end_page:04d}.pdf"
@@ -40,12 +241,18 @@ class SplitPDFFilesNode(BaseNode):
             # 새로운 PDF 파일 생성 및 페이지 삽입
             with pymupdf.open() as output_pdf:
                 output_pdf.insert_pdf(input_pdf, from_page=start_page, to_page=end_page)
-                output_pdf.save(output_file)
+                # 새 문서 ID를 만들지 않아야 같은 분할 파일이 항상 같은 바이트가 되어
+                # 레이아웃 분석 캐시 키가 재실행 간에 일치함 (메모리 배치와도 같은 바이트)
+                output_pdf.save(output_file, no_new_id=True)
                 ret.append(output_file)
 
         # 원본 PDF 파일 닫기
         input_pdf.close()
 
         # 분할된 PDF 파일 경로 목록을 포함한 GraphState 객체 반환
-        return GraphState(filepath=filepath, filetype="pdf", split_filepaths=ret)
-
+        return GraphState(
+            filepath=filepath,
+            filetype="pdf",
+            split_filepaths=ret,
+            split_batches=[],
+        )
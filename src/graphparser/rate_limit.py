@@ -0,0 +1,358 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from ..scheduler import bind_deadline, check_deadline
+
+
+class TokenBucket:
+    """
+    토큰 버킷 방식의 요청 속도 제한기
+
+    초당 rate 개의 토큰이 채워지며, 최대 capacity 개까지 쌓일 수 있습니다.
+    여러 스레드에서 동시에 사용해도 안전합니다.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        :param rate: 초당 채워지는 토큰 수
+        :param capacity: 버킷의 최대 토큰 수 (기본값: rate, 최소 1)
+        """
+        if rate <= 0:
+            raise ValueError(f"rate는 0보다 커야 합니다: {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def set_rate(self, rate):
+        """
+        초당 채워지는 토큰 수를 변경합니다. 이미 쌓인 토큰은 유지됩니다.
+
+        :param rate: 새로운 초당 토큰 수
+        """
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def try_acquire(self, tokens=1):
+        """
+        토큰을 즉시 얻을 수 있으면 소비하고 True를 반환합니다.
+
+        :param tokens: 소비할 토큰 수
+        :return: 토큰 획득 여부
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """
+        토큰을 얻을 수 있을 때까지 대기한 뒤 소비합니다.
+
+        capacity보다 많은 토큰을 요청하면 capacity만큼만 기다립니다.
+
+        :param tokens: 소비할 토큰 수
+        """
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# 외부 의존성(레이아웃 API, LLM 등)별 전역 동시 요청 제한
+_dependency_limits = {}
+_dependency_limits_lock = threading.Lock()
+
+
+def configure_dependency_limit(name, max_concurrency):
+    """
+    외부 의존성의 프로세스 전역 동시 요청 수를 설정합니다.
+
+    여러 문서를 동시에 처리할 때도 같은 의존성에 대한 요청 수는 이 값을 넘지 않습니다.
+
+    :param name: 의존성 이름 (예: "layout", "llm")
+    :param max_concurrency: 최대 동시 요청 수, None 또는 0이면 제한 없음
+    """
+    with _dependency_limits_lock:
+        if max_concurrency:
+            _dependency_limits[name] = threading.BoundedSemaphore(max_concurrency)
+        else:
+            _dependency_limits.pop(name, None)
+
+
+@contextmanager
+def dependency_limit(name):
+    """
+    설정된 동시 요청 제한 안에서 블록을 실행하는 컨텍스트 매니저입니다.
+    제한이 설정되지 않은 의존성은 바로 실행됩니다.
+
+    :param name: 의존성 이름
+    """
+    semaphore = _dependency_limits.get(name)
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+
+def is_rate_limit_error(error):
+    """예외가 속도 제한(HTTP 429) 응답에 의한 것인지 확인합니다."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code == 429 or type(error).__name__ == "RateLimitError"
+
+
+class RequestBudget:
+    """
+    스케줄러가 실행 중인 요청 하나의 토큰 예산
+
+    캐시 조회가 실패했을 때(실제 API 호출 직전)에만 토큰 버킷에서 토큰을 소비하므로
+    캐시에서 응답한 요청은 예산을 쓰지 않고 속도 제한도 받지 않습니다.
+    """
+
+    def __init__(self, bucket, tokens):
+        """
+        :param bucket: 토큰을 소비할 TokenBucket
+        :param tokens: 요청의 예상 토큰 수
+        """
+        self.bucket = bucket
+        self.tokens = tokens
+        self.consulted = False  # 캐시 조회 여부
+        self.charged = False
+
+    def charge(self):
+        """토큰을 아직 소비하지 않았으면 얻을 수 있을 때까지 대기한 뒤 소비합니다."""
+        self.consulted = True
+        if not self.charged:
+            self.charged = True
+            self.bucket.acquire(self.tokens)
+
+    def mark_cache_hit(self):
+        self.consulted = True
+
+
+_current_budget = contextvars.ContextVar("request_budget", default=None)
+
+
+def charge_request_budget():
+    """
+    현재 요청의 토큰 예산을 소비합니다. 캐시 조회가 실패해 API를 호출하기 직전에
+    호출하며, 스케줄러 밖에서 실행 중이면 아무것도 하지 않습니다.
+    """
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.charge()
+
+
+def mark_request_cache_hit():
+    """현재 요청이 캐시에서 응답되었음을 스케줄러에 알립니다."""
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.mark_cache_hit()
+
+
+class RequestScheduler:
+    """
+    토큰 예산 기반 LLM 요청 스케줄러
+
+    - 분당 토큰 수(tokens_per_minute) 예산 안에서 요청을 내보냄
+    - 동시 요청 수(max_concurrency) 제한 및 전역 의존성 제한 적용
+    - 429 응답 시 지수 백오프로 재시도하고 전송 속도를 절반으로 낮춘 뒤,
+      성공할 때마다 설정값까지 조금씩 회복 (AIMD)
+    - 처리량(요청/토큰 수, 분당 토큰 수) 집계
+    - charge_on_cache_miss이면 응답 캐시 조회가 실패한 요청만 토큰 예산을 소비
+      (캐시에서 응답한 요청은 예산을 쓰지 않고 대기하지도 않음)
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute=200_000,
+        max_concurrency=8,
+        max_retries=6,
+        base_delay=1.0,
+        max_delay=60.0,
+        dependency="llm",
+        charge_on_cache_miss=False,
+    ):
+        """
+        :param tokens_per_minute: 분당 토큰 예산
+        :param max_concurrency: 최대 동시 요청 수
+        :param max_retries: 429 응답에 대한 최대 재시도 횟수
+        :param base_delay: 재시도 대기 시간의 기준값(초)
+        :param max_delay: 재시도 대기 시간의 최댓값(초)
+        :param dependency: 함께 적용할 전역 의존성 제한 이름
+        :param charge_on_cache_miss: True이면 요청 전에 토큰을 소비하지 않고, 응답 캐시가
+            조회 실패를 알릴 때(charge_request_budget) 소비. 캐시를 조회하지 않은 요청은
+            실행 후에 소비
+        """
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dependency = dependency
+        self.charge_on_cache_miss = charge_on_cache_miss
+
+        self._max_rate = tokens_per_minute / 60
+        self._min_rate = self._max_rate / 10
+        self.bucket = TokenBucket(self._max_rate, capacity=tokens_per_minute)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self._started_at = None
+        self.requests = 0
+        self.tokens = 0
+        self.cache_hits = 0
+        self.rate_limited = 0
+
+    def _on_rate_limited(self, attempt):
+        # 속도를 절반으로 낮추고 지수 백오프(지터 포함)만큼 대기
+        with self._stats_lock:
+            self.rate_limited += 1
+            self.bucket.set_rate(max(self._min_rate, self.bucket.rate / 2))
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _on_success(self, budget):
+        if not budget.charged:
+            # 캐시에서 응답한 요청은 API 처리량과 속도 회복에 반영하지 않음
+            with self._stats_lock:
+                self.cache_hits += 1
+            return
+        # 성공할 때마다 설정 속도의 5%씩 회복
+        with self._stats_lock:
+            self.requests += 1
+            self.tokens += budget.tokens
+            if self.bucket.rate < self._max_rate:
+                self.bucket.set_rate(
+                    min(self._max_rate, self.bucket.rate + self._max_rate * 0.05)
+                )
+
+    def invoke(self, runnable, item, tokens):
+        """
+        토큰 예산과 동시 요청 제한 안에서 runnable.invoke(item)을 실행합니다.
+
+        :param runnable: invoke 메서드를 가진 실행 객체 (LLM, 체인 등)
+        :param item: 입력
+        :param tokens: 요청의 예상 토큰 수 (프롬프트 + 이미지 + 응답)
+        :return: 실행 결과
+        """
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            # 문서 처리 시간이 지났으면 새 요청을 보내지 않음
+            check_deadline()
+            budget = RequestBudget(self.bucket, tokens)
+            if not self.charge_on_cache_miss:
+                budget.charge()
+            context_token = _current_budget.set(budget)
+            try:
+                with self._semaphore, dependency_limit(self.dependency):
+                    result = runnable.invoke(item)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._on_rate_limited(attempt)
+                continue
+            finally:
+                _current_budget.reset(context_token)
+            if not budget.consulted:
+                # 캐시를 거치지 않은 요청은 실행 후에라도 예산에 반영
+                budget.charge()
+            self._on_success(budget)
+            return result
+
+    def batch(self, runnable, inputs, token_counts):
+        """
+        입력들을 동시에 처리합니다. 결과는 입력 순서대로 반환됩니다.
+
+        :param runnable: invoke 메서드를 가진 실행 객체
+        :param inputs: 입력 리스트
+        :param token_counts: 입력별 예상 토큰 수 리스트
+        :return: 결과 리스트
+        """
+        if not inputs:
+            return []
+
+        workers = min(self.max_concurrency, len(inputs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    bind_deadline(lambda args: self.invoke(runnable, *args)),
+                    zip(inputs, token_counts),
+                )
+            )
+
+    def stats(self):
+        """요청 수, 토큰 수, 캐시 적중 수, 429 횟수, 분당 처리량, 현재 전송 속도를 반환합니다."""
+        started_at = self._started_at or time.monotonic()
+        elapsed_minutes = max(time.monotonic() - started_at, 1e-9) / 60
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "tokens": self.tokens,
+                "cache_hits": self.cache_hits,
+                "rate_limited": self.rate_limited,
+                "requests_per_minute": self.requests / elapsed_minutes,
+                "tokens_per_minute": self.tokens / elapsed_minutes,
+                "current_rate_per_minute": self.bucket.rate * 60,
+            }
+
+    def report(self):
+        """처리량 요약 문자열을 반환합니다."""
+        stats = self.stats()
+        return (
+            f"LLM 요청 {stats['requests']}건 (캐시 적중 {stats['cache_hits']}건 제외), "
+            f"토큰 {stats['tokens']}개 "
+            f"(분당 {stats['tokens_per_minute']:.0f} 토큰, "
+            f"{stats['requests_per_minute']:.1f} 요청), "
+            f"429 응답 {stats['rate_limited']}회, "
+            f"현재 예산 분당 {stats['current_rate_per_minute']:.0f} 토큰"
+        )
+
+
+_request_schedulers = {}
+
+
+def get_request_scheduler(name="llm"):
+    """
+    의존성별로 공유되는 RequestScheduler를 반환합니다.
+
+    환경 변수:
+        LLM_TOKENS_PER_MINUTE: 분당 토큰 예산 (기본값: 200000)
+        LLM_MAX_CONCURRENCY: 최대 동시 요청 수 (기본값: 8)
+
+    LLM 응답 캐시가 켜져 있으면 캐시 조회가 실패한 요청만 토큰 예산을 소비합니다.
+    """
+    from .llm_cache import get_llm_cache
+
+    with _dependency_limits_lock:
+        if name not in _request_schedulers:
+            _request_schedulers[name] = RequestScheduler(
+                tokens_per_minute=int(os.environ.get("LLM_TOKENS_PER_MINUTE", 200_000)),
+                max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 8)),
+                dependency=name,
+                charge_on_cache_miss=get_llm_cache() is not None,
+            )
+        return _request_schedulers[name]
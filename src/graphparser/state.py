@@ -7,8 +7,12 @@ class GraphState(TypedDict):
     filetype: str  # pdf
     page_numbers: list[int]  # page numbers
     batch_size: int  # batch size
+    complex_pages: list[int]  # pages that need layout analysis
+    local_batches: list[dict]  # locally extracted pages (analyzed_batches shape)
     split_filepaths: list[str]  # split files
+    split_batches: list[dict]  # in-memory split batches (page range, bytes)
     analyzed_files: list[str]  # analyzed files
+    analyzed_batches: list[dict]  # in-memory analysis results (page range, result)
     page_elements: dict[int, dict[str, list[dict]]]  # page elements
     page_metadata: dict[int, dict]  # page metadata
     page_summary: dict[int, str]  # page summary
@@ -18,6 +22,9 @@ class GraphState(TypedDict):
     table_summary: dict[int, str]  # table summary
     table_markdown: dict[int, str]  # table markdown
     texts: list[str]  # text
+    summary_texts: dict[int, str]  # texts left for page summary after filtering
+    page_aliases: dict[int, int]  # duplicate page -> canonical page
+    element_aliases: dict[int, int]  # duplicate crop id -> canonical crop id
+    filter_report: dict  # content filter report
     text_summary: dict[int, str]  # text summary
-    table_summary_data_batches: list[dict]  # table summary data batches
     language: str  # language
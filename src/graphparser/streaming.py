@@ -0,0 +1,372 @@
+import heapq
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ..scheduler import bind_deadline, check_deadline
+from .core import apply_aliases
+from .state import GraphState
+
+# 스테이지 종료를 알리는 표식
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """파이프라인이 중단되어 출력을 넘길 수 없을 때 사용하는 내부 예외"""
+
+
+class PipelineStage:
+    """
+    스트리밍 파이프라인의 한 단계
+    """
+
+    def __init__(self, name, func, workers=1, ordered=False):
+        """
+        :param name: 단계 이름
+        :param func: 입력 하나를 받아 출력 하나를 반환하는 함수
+        :param workers: 이 단계를 동시에 실행할 스레드 수
+        :param ordered: True이면 입력 순서대로 처리 (workers는 1로 고정)
+        """
+        self.name = name
+        self.func = func
+        self.workers = 1 if ordered else max(1, workers)
+        self.ordered = ordered
+
+
+class StreamingPipeline:
+    """
+    단계 사이를 크기가 제한된 큐로 연결하여 항목을 단계별로 흘려보내는 파이프라인
+
+    앞 단계가 다음 항목을 처리하는 동안 뒤 단계가 이전 항목을 처리하므로 단계들이
+    겹쳐 실행되며, 큐 크기(queue_size)만큼만 항목이 대기하므로 메모리 사용량이
+    제한됩니다. 한 단계에서 예외가 발생하면 파이프라인을 멈추고 예외를 다시 발생시킵니다.
+    """
+
+    def __init__(self, stages, queue_size=2):
+        """
+        :param stages: PipelineStage 리스트
+        :param queue_size: 단계 사이 큐의 최대 크기
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items):
+        """
+        항목들을 파이프라인에 흘려보내고, 마지막 단계의 출력을 완료되는 순서대로 생성합니다.
+
+        :param items: 입력 이터러블 (지연 생성 가능)
+        :return: 마지막 단계 출력의 제너레이터
+        """
+        queues = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)
+        ]
+        stop = threading.Event()
+        errors = []
+
+        def put(q, item):
+            # 파이프라인이 중단되면 대기 중인 put을 포기
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fail(error):
+            errors.append(error)
+            stop.set()
+
+        def feed():
+            try:
+                for seq, item in enumerate(items):
+                    if not put(queues[0], (seq, item)):
+                        return
+            except Exception as e:
+                fail(e)
+            finally:
+                put(queues[0], _DONE)
+
+        def make_worker(stage, in_q, out_q, remaining, lock):
+            pending = dict()  # 순서 보장 단계의 대기 항목 (seq -> 항목)
+            next_seq = [0]
+
+            def process(seq, item):
+                # 문서 처리 시간이 지났으면 남은 배치를 처리하지 않음
+                check_deadline()
+                if not put(out_q, (seq, stage.func(item))):
+                    raise _Stopped()
+
+            def worker():
+                try:
+                    while not stop.is_set():
+                        try:
+                            entry = in_q.get(timeout=0.1)
+                        except queue.Empty:
+                            continue
+                        if entry is _DONE:
+                            # 같은 단계의 다른 작업자도 종료하도록 표식을 되돌려 놓음
+                            put(in_q, _DONE)
+                            break
+
+                        seq, item = entry
+                        if not stage.ordered:
+                            process(seq, item)
+                            continue
+
+                        pending[seq] = item
+                        while next_seq[0] in pending:
+                            process(next_seq[0], pending.pop(next_seq[0]))
+                            next_seq[0] += 1
+                except _Stopped:
+                    return
+                except Exception as e:
+                    fail(e)
+                    return
+
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    put(out_q, _DONE)
+
+            return worker
+
+        # 작업 스레드도 문서의 마감 시각을 확인하도록 전달
+        threads = [threading.Thread(target=bind_deadline(feed), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for _ in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=bind_deadline(
+                            make_worker(
+                                stage, queues[index], queues[index + 1], remaining, lock
+                            )
+                        ),
+                        name=f"pipeline-{stage.name}",
+                        daemon=True,
+                    )
+                )
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    entry = queues[-1].get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if entry is _DONE:
+                    break
+                yield entry[1]
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+
+class StreamingPDFParser:
+    """
+    분할 배치 단위로 파싱 그래프의 노드들을 스트리밍 실행하는 파서
+
+    각 분할 배치는 레이아웃 분석 → 요소 추출 → 크롭/텍스트 추출 → 필터링 → 요약을
+    독립적으로 거치며, 결과는 마지막에 하나의 상태로 병합됩니다.
+    요소 추출과 필터링 단계는 배치 순서대로 실행되어 요소 ID와 중복 판단이
+    그래프 실행과 동일하게 유지됩니다.
+    """
+
+    def __init__(
+        self,
+        split_node,
+        layout_node,
+        element_node,
+        cropper_node,
+        text_node,
+        filter_node,
+        page_summary_node,
+        element_summary_nodes,
+        layout_workers=2,
+        summary_workers=2,
+        queue_size=2,
+        router_node=None,
+    ):
+        """
+        :param split_node: SplitPDFFilesNode
+        :param layout_node: LayoutAnalyzerNode
+        :param element_node: ExtractPageElementsNode
+        :param cropper_node: ElementCropperNode
+        :param text_node: ExtractPageTextNode
+        :param filter_node: ContentFilterNode
+        :param page_summary_node: CreatePageSummaryNode
+        :param element_summary_nodes: 페이지 요약 후 동시에 실행할 노드 리스트
+            (예: CreateImageSummaryNode, TableAnalysisNode)
+        :param layout_workers: 동시에 레이아웃 분석할 배치 수
+        :param summary_workers: 동시에 요약할 배치 수
+        :param queue_size: 단계 사이 큐의 최대 크기
+        :param router_node: PageRouterNode (선택, 텍스트 전용 페이지는 API 없이 처리)
+        """
+        self.split_node = split_node
+        self.layout_node = layout_node
+        self.element_node = element_node
+        self.cropper_node = cropper_node
+        self.text_node = text_node
+        self.filter_node = filter_node
+        self.page_summary_node = page_summary_node
+        self.element_summary_nodes = element_summary_nodes
+        self.layout_workers = layout_workers
+        self.summary_workers = summary_workers
+        self.queue_size = queue_size
+        self.router_node = router_node
+
+    def stream(self, filepath, language="ko"):
+        """
+        배치별 결과를 완료되는 순서대로 생성합니다.
+
+        :param filepath: PDF 파일 경로
+        :param language: 요약 언어
+        :return: 배치별 부분 상태의 제너레이터
+        """
+        next_element_id = [0]
+        seen = dict()
+
+        def analyze(batch):
+            # 로컬에서 추출한 페이지는 레이아웃 분석 없이 그대로 전달
+            if "result" not in batch:
+                # 분할 PDF 바이트는 분석 후 버려 메모리에 남지 않도록 함
+                batch = self.layout_node._analyze_batch(batch)
+            return {
+                "filepath": filepath,
+                "language": language,
+                "analyzed_batches": [batch],
+            }
+
+        def extract(state):
+            output, next_element_id[0] = self.element_node.extract_elements(
+                self.element_node.load_analysis_results(state), next_element_id[0]
+            )
+            return {**state, **output}
+
+        def crop(state):
+            return {
+                **state,
+                **self.cropper_node.execute(state),
+                **self.text_node.execute(state),
+            }
+
+        def filter_content(state):
+            return {
+                **state,
+                **self.filter_node.filter_content(
+                    state["texts"], state["images"], state["tables"], seen
+                ),
+            }
+
+        def summarize(state):
+            state = {**state, **self.page_summary_node.execute(state)}
+            # 이미지/표 요약 노드들은 서로 독립적이므로 동시에 실행
+            nodes = self.element_summary_nodes
+            with ThreadPoolExecutor(max_workers=len(nodes)) as executor:
+                outputs = list(
+                    executor.map(bind_deadline(lambda node: node.execute(state)), nodes)
+                )
+            for output in outputs:
+                state = {**state, **output}
+            return state
+
+        pipeline = StreamingPipeline(
+            [
+                PipelineStage("layout", analyze, workers=self.layout_workers),
+                PipelineStage("extract", extract, ordered=True),
+                PipelineStage("crop", crop),
+                PipelineStage("filter", filter_content, ordered=True),
+                PipelineStage("summary", summarize, workers=self.summary_workers),
+            ],
+            queue_size=self.queue_size,
+        )
+        # 페이지 라우터가 있으면 복잡한 페이지만 분할하고, 로컬 추출 결과와
+        # 페이지 순서대로 섞어 흘려보냄
+        if self.router_node is None:
+            return pipeline.run(self.split_node.iter_batches(filepath))
+
+        routed = self.router_node.execute({"filepath": filepath})
+        batches = heapq.merge(
+            routed["local_batches"],
+            self.split_node.iter_batches(filepath, routed["complex_pages"]),
+            key=lambda batch: batch["start_page"],
+        )
+        return pipeline.run(batches)
+
+    def run(self, filepath, language="ko", on_batch=None):
+        """
+        문서를 스트리밍으로 처리하고 배치별 결과를 하나의 상태로 병합합니다.
+
+        :param filepath: PDF 파일 경로
+        :param language: 요약 언어
+        :param on_batch: 배치 결과가 나올 때마다 호출할 함수 (선택)
+        :return: 그래프 실행 결과와 같은 키를 가진 GraphState 객체
+        """
+        merged = GraphState(
+            filepath=filepath,
+            filetype="pdf",
+            language=language,
+            page_numbers=[],
+            page_elements={},
+            page_metadata={},
+            images={},
+            tables={},
+            texts={},
+            page_aliases={},
+            element_aliases={},
+            text_summary={},
+            image_summary={},
+            table_summary={},
+            table_markdown={},
+        )
+        reports = []
+
+        for state in self.stream(filepath, language):
+            if on_batch is not None:
+                on_batch(state)
+            merged["page_numbers"].extend(state["page_numbers"])
+            for key in (
+                "page_elements",
+                "page_metadata",
+                "images",
+                "tables",
+                "texts",
+                "page_aliases",
+                "element_aliases",
+                "text_summary",
+                "image_summary",
+                "table_summary",
+                "table_markdown",
+            ):
+                merged[key].update(state.get(key) or {})
+            reports.append(state["filter_report"])
+
+        # 다른 배치에 있는 원본의 결과를 중복 항목에 복사
+        apply_aliases(merged["text_summary"], merged["page_aliases"])
+        for key in ("image_summary", "table_summary", "table_markdown"):
+            apply_aliases(merged[key], merged["element_aliases"])
+
+        merged["page_numbers"].sort()
+        merged["filter_report"] = {
+            "empty_pages": sum((r["empty_pages"] for r in reports), []),
+            "boilerplate_pages": sum((r["boilerplate_pages"] for r in reports), []),
+            "duplicate_pages": merged["page_aliases"],
+            "duplicate_images": {
+                k: v for r in reports for k, v in r["duplicate_images"].items()
+            },
+            "duplicate_tables": {
+                k: v for r in reports for k, v in r["duplicate_tables"].items()
+            },
+            "saved_llm_calls": sum(r["saved_llm_calls"] for r in reports),
+        }
+        return merged
@@ -4,11 +4,15 @@ import os
 import sys
 import io
 from pathlib import Path
+from src.cache import DiskCache
 from src.graphparser.state import GraphState
+from src.graphparser.llm_cache import get_llm_cache
+from src.graphparser.rate_limit import get_request_scheduler
+from src.graphparser.checkpoint import NodeCheckpointer, CheckpointedNode
+from src.graphparser.streaming import StreamingPDFParser
 import src.graphparser.core as parser_core
 import src.graphparser.pdf as pdf
 from langgraph.graph import END, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
 from langchain.schema import Document
 
 # 콘솔 인코딩을 utf-8로 설정
@@ -22,24 +26,47 @@ load_dotenv(verbose=True)
 print("UPSTAGE_API_KEY:", os.environ.get("UPSTAGE_API_KEY"))
 print("환경 변수 로드 위치:", os.getcwd())
 
-# 문서 분할
-split_pdf_node = pdf.SplitPDFFilesNode(batch_size=10)
+# 페이지 라우팅 (텍스트 전용 페이지는 레이아웃 API 없이 로컬에서 추출)
+page_router_node = pdf.PageRouterNode(
+    min_text_chars=int(os.environ.get("ROUTER_MIN_TEXT_CHARS", 50)),
+    max_drawings=int(os.environ.get("ROUTER_MAX_DRAWINGS", 20)),
+    max_image_ratio=float(os.environ.get("ROUTER_MAX_IMAGE_RATIO", 0.05)),
+)
+
+# 문서 분할 (분할 파일 없이 메모리 배치로 유지)
+split_pdf_node = pdf.SplitPDFFilesNode(batch_size=10, in_memory=True)
+
+# 레이아웃 분석 결과 캐시 (재시도/재처리 시 API 재호출 방지)
+layout_cache = DiskCache(
+    os.environ.get("LAYOUT_CACHE_PATH", "data/cache/layout_analysis.sqlite3"),
+    max_size_bytes=int(os.environ.get("LAYOUT_CACHE_MAX_BYTES", 2 * 1024**3)),
+)
 
 # Layout Analyzer
-layout_analyze_node = parser_core.LayoutAnalyzerNode(os.environ.get("UPSTAGE_API_KEY"))
+layout_analyze_node = parser_core.LayoutAnalyzerNode(
+    os.environ.get("UPSTAGE_API_KEY"),
+    max_workers=int(os.environ.get("LAYOUT_MAX_WORKERS", 4)),
+    requests_per_second=float(os.environ.get("LAYOUT_REQUESTS_PER_SECOND", 2)),
+    timeout=float(os.environ.get("LAYOUT_TIMEOUT", 120)),
+    max_retries=int(os.environ.get("LAYOUT_MAX_RETRIES", 3)),
+    cache=layout_cache,
+)
 
 # 페이지 요소 추출
 page_element_extractor_node = parser_core.ExtractPageElementsNode()
 
-# 이미지 자르기
-image_cropper_node = parser_core.ImageCropperNode()
-
-# 테이블 자르기
-table_cropper_node = parser_core.TableCropperNode()
+# 이미지/테이블 자르기 (요소 영역만 렌더링)
+element_cropper_node = parser_core.ElementCropperNode(
+    max_workers=int(os.environ.get("CROP_MAX_WORKERS", 1)),
+    clip=True,
+)
 
 # 페이지별 텍스트 추출
 extract_page_text = parser_core.ExtractPageTextNode()
 
+# 요약 전 빈/반복 문구/중복 콘텐츠 필터링
+content_filter_node = parser_core.ContentFilterNode()
+
 # 페이지별 요약
 page_summary_node = parser_core.CreatePageSummaryNode(
     api_key=os.environ.get("OPENAI_API_KEY")
@@ -50,51 +77,127 @@ image_summary_node = parser_core.CreateImageSummaryNode(
     api_key=os.environ.get("OPENAI_API_KEY")
 )
 
-# 테이블 요약
-table_summary_node = parser_core.CreateTableSummaryNode(
+# 테이블 요약 + Markdown 추출 (표 하나당 한 번 요청)
+table_analysis_node = parser_core.TableAnalysisNode(
     api_key=os.environ.get("OPENAI_API_KEY")
 )
 
-# 테이블 Markdown 추출
-table_markdown_extractor = parser_core.TableMarkdownExtractorNode()
+# 노드별 출력 체크포인트 (실패 후 재실행 시 출력이 없는 첫 노드부터 재개)
+checkpointer = NodeCheckpointer(
+    os.environ.get("CHECKPOINT_DIR", "data/cache/checkpoints")
+)
+
+
+def discard_checkpoints(filepath):
+    """
+    문서의 노드 체크포인트를 삭제합니다. 다시 처리해도 실패하는 잘못된 PDF에 사용합니다.
+
+    Args:
+        filepath (str): PDF 파일 경로
+    """
+    if os.path.exists(filepath):
+        checkpointer.clear(checkpointer.document_key(filepath))
+
+
+def prune_checkpoints():
+    """
+    실패하거나 중단된 채로 CHECKPOINT_TTL초(기본값: 7일)가 지난 체크포인트를 정리합니다.
+    일괄 처리를 시작할 때 호출합니다.
+
+    Returns:
+        int: 삭제한 문서 수
+    """
+    return checkpointer.prune(float(os.environ.get("CHECKPOINT_TTL", 7 * 24 * 3600)))
+
+
+def add_checkpointed_node(name, node):
+    workflow.add_node(name, CheckpointedNode(node, checkpointer, name=name))
+
 
 # LangGraph을 생성
 workflow = StateGraph(GraphState)
 
 # 노드들을 정의합니다.
-workflow.add_node("split_pdf_node", split_pdf_node)
-workflow.add_node("layout_analyzer_node", layout_analyze_node)
-workflow.add_node("page_element_extractor_node", page_element_extractor_node)
-workflow.add_node("image_cropper_node", image_cropper_node)
-workflow.add_node("table_cropper_node", table_cropper_node)
-workflow.add_node("extract_page_text_node", extract_page_text)
-workflow.add_node("page_summary_node", page_summary_node)
-workflow.add_node("image_summary_node", image_summary_node)
-workflow.add_node("table_summary_node", table_summary_node)
-workflow.add_node("table_markdown_node", table_markdown_extractor)
+add_checkpointed_node("page_router_node", page_router_node)
+add_checkpointed_node("split_pdf_node", split_pdf_node)
+add_checkpointed_node("layout_analyzer_node", layout_analyze_node)
+add_checkpointed_node("page_element_extractor_node", page_element_extractor_node)
+add_checkpointed_node("element_cropper_node", element_cropper_node)
+add_checkpointed_node("extract_page_text_node", extract_page_text)
+add_checkpointed_node("content_filter_node", content_filter_node)
+add_checkpointed_node("page_summary_node", page_summary_node)
+add_checkpointed_node("image_summary_node", image_summary_node)
+add_checkpointed_node("table_analysis_node", table_analysis_node)
 
 # 각 노드들을 연결합니다.
+workflow.add_edge("page_router_node", "split_pdf_node")
 workflow.add_edge("split_pdf_node", "layout_analyzer_node")
 workflow.add_edge("layout_analyzer_node", "page_element_extractor_node")
-workflow.add_edge("page_element_extractor_node", "image_cropper_node")
-workflow.add_edge("page_element_extractor_node", "table_cropper_node")
+workflow.add_edge("page_element_extractor_node", "element_cropper_node")
 workflow.add_edge("page_element_extractor_node", "extract_page_text_node")
-workflow.add_edge("image_cropper_node", "page_summary_node")
-workflow.add_edge("table_cropper_node", "page_summary_node")
-workflow.add_edge("extract_page_text_node", "page_summary_node")
+workflow.add_edge("element_cropper_node", "content_filter_node")
+workflow.add_edge("extract_page_text_node", "content_filter_node")
+workflow.add_edge("content_filter_node", "page_summary_node")
 workflow.add_edge("page_summary_node", "image_summary_node")
-workflow.add_edge("page_summary_node", "table_summary_node")
+workflow.add_edge("page_summary_node", "table_analysis_node")
 workflow.add_edge("image_summary_node", END)
-workflow.add_edge("table_summary_node", "table_markdown_node")
-workflow.add_edge("table_markdown_node", END)
+workflow.add_edge("table_analysis_node", END)
 
-workflow.set_entry_point("split_pdf_node")
+workflow.set_entry_point("page_router_node")
 
-memory = MemorySaver()
 graph = workflow.compile()
 
+# 분할 배치 단위 스트리밍 실행 (단계들이 겹쳐 실행되고 첫 결과가 빨리 나옴)
+streaming_parser = StreamingPDFParser(
+    split_pdf_node,
+    layout_analyze_node,
+    page_element_extractor_node,
+    element_cropper_node,
+    extract_page_text,
+    content_filter_node,
+    page_summary_node,
+    [image_summary_node, table_analysis_node],
+    layout_workers=int(os.environ.get("LAYOUT_MAX_WORKERS", 4)),
+    summary_workers=int(os.environ.get("STREAMING_SUMMARY_WORKERS", 2)),
+    queue_size=int(os.environ.get("STREAMING_QUEUE_SIZE", 2)),
+    router_node=page_router_node,
+)
+
+
+def process_single_pdf_streaming(filepath, on_batch=None):
+    """
+    PDF를 분할 배치 단위로 스트리밍 처리합니다.
+
+    Args:
+        filepath (str): PDF 파일 경로
+        on_batch (Callable, optional): 배치 결과가 나올 때마다 호출할 함수
+
+    Returns:
+        GraphState: 병합된 처리 결과 (실패 시 None)
+    """
+    if not os.path.exists(filepath):
+        raise ValueError(f"PDF 파일을 찾을 수 없습니다: {filepath}")
+
+    print(f"처리할 PDF 파일 (스트리밍): {filepath}")
+
+    try:
+        final_state = streaming_parser.run(filepath, on_batch=on_batch)
+        print("PDF 처리가 완료되었습니다.")
+        print(f"레이아웃 분석 캐시: {layout_cache.stats()}")
+        if get_llm_cache() is not None:
+            print(get_llm_cache().report())
+        print(get_request_scheduler("llm").report())
+        return final_state
+    except Exception as e:
+        print(f"PDF 처리 중 오류 발생: {str(e)}")
+        return None
+
 
 def process_single_pdf(filepath="data/pdf/20241122_company_22650000.pdf"):
+    # PARSER_STREAMING=1이면 분할 배치 단위 스트리밍 모드로 처리
+    if os.environ.get("PARSER_STREAMING") == "1":
+        return process_single_pdf_streaming(filepath)
+
     if not os.path.exists(filepath):
         raise ValueError(f"PDF 파일을 찾을 수 없습니다: {filepath}")
 
@@ -107,8 +210,12 @@ def process_single_pdf(filepath="data/pdf/20241122_company_22650000.pdf"):
         "language": "ko",
         "page_numbers": [],
         "batch_size": 10,
+        "complex_pages": None,
+        "local_batches": [],
         "split_filepaths": [],
+        "split_batches": [],
         "analyzed_files": [],
+        "analyzed_batches": [],
         "page_elements": {},
         "page_metadata": {},
         "page_summary": {},
@@ -118,17 +225,35 @@ def process_single_pdf(filepath="data/pdf/20241122_company_22650000.pdf"):
         "table_summary": {},
         "table_markdown": {},
         "texts": {},
+        "summary_texts": None,
+        "page_aliases": {},
+        "element_aliases": {},
+        "filter_report": {},
         "text_summary": {},
-        "table_summary_data_batches": [],
     }
 
     try:
+        document_key = checkpointer.document_key(filepath)
+        completed = checkpointer.completed_nodes(document_key)
+        if completed:
+            print(f"체크포인트에서 재개합니다. 완료된 노드: {completed}")
+
         final_state = graph.invoke(initial_state)
         print("PDF 처리가 완료되었습니다.")
+
+        # 처리가 끝난 문서의 체크포인트는 삭제 (CHECKPOINT_KEEP=1이면 유지)
+        if os.environ.get("CHECKPOINT_KEEP") != "1":
+            checkpointer.clear(document_key)
+        print(f"레이아웃 분석 캐시: {layout_cache.stats()}")
+        if get_llm_cache() is not None:
+            print(get_llm_cache().report())
+        print(get_request_scheduler("llm").report())
         return final_state
     except Exception as e:
         error_message = str(e)
         print(f"PDF 처리 중 오류 발생: {error_message}")
+        # 체크포인트는 남겨 두어 재시도 시 실패한 노드부터 재개
+        return None
 
     # def create_chatbot(state, persist_directory: str = "vectorstore"):
     """
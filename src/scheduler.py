@@ -0,0 +1,226 @@
+import time
+import logging
+import threading
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentTimeoutError(TimeoutError):
+    """문서 처리 시간이 제한을 넘었을 때 발생하는 예외"""
+
+
+# 현재 처리 중인 문서의 마감 시각 (time.monotonic 기준, 제한이 없으면 None)
+_deadline = contextvars.ContextVar("document_deadline", default=None)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    현재 문서의 남은 처리 시간 반환
+
+    Returns:
+        Optional[float]: 남은 시간(초, 0 이상). 시간 제한이 없으면 None
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def check_deadline():
+    """
+    현재 문서의 처리 시간이 지났으면 DocumentTimeoutError 발생
+
+    노드 실행, API 요청 등 작업 단위 사이에서 호출하여 시간 초과된 문서가
+    더 이상 작업을 시작하지 않도록 합니다.
+    """
+    if remaining_time() == 0.0:
+        raise DocumentTimeoutError("문서 처리 시간 초과")
+
+
+def bind_deadline(func: Callable) -> Callable:
+    """
+    현재 문서의 마감 시각을 다른 스레드에서도 사용하도록 함수를 감쌈
+
+    스레드 풀/스레드는 contextvars를 물려받지 않으므로, 문서 처리 중에 새로
+    만드는 스레드의 대상 함수는 이 함수로 감싸야 합니다.
+
+    Args:
+        func (Callable): 다른 스레드에서 실행할 함수
+
+    Returns:
+        Callable: 마감 시각을 설정한 뒤 func를 실행하는 함수
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _deadline.set(deadline)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    return wrapper
+
+
+class DocumentScheduler:
+    """
+    여러 문서를 스레드 풀에서 동시에 처리하는 스케줄러
+
+    - 동시에 처리할 문서 수(max_workers) 제한
+    - 문서별 처리 시간 제한(document_timeout)
+    - 진행률 및 남은 예상 시간(ETA) 로깅
+
+    시간 제한은 협조적으로 적용됩니다. 처리 함수는 마감 시각을 contextvars로 전달받고,
+    파서의 노드 실행/레이아웃 분석 요청/LLM 요청은 시작 전에 check_deadline으로 확인하며
+    레이아웃 요청 타임아웃은 남은 시간으로 줄어듭니다. 따라서 시간 초과된 문서의 작업
+    스레드는 진행 중인 요청 하나가 끝나면 DocumentTimeoutError로 종료됩니다.
+
+    결과 콜백(on_result)은 항상 호출한 스레드에서 실행되므로,
+    상태 파일 저장이나 벡터스토어 추가 같은 작업을 별도의 잠금 없이 수행할 수 있습니다.
+    외부 API별 동시 요청 수는 rate_limit.configure_dependency_limit으로 제한합니다.
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[[Any], Any],
+        max_workers: int = 1,
+        document_timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+    ):
+        """
+        스케줄러 초기화
+
+        Args:
+            process_fn (Callable): 문서 하나를 처리하는 함수
+            max_workers (int): 동시에 처리할 문서 수
+            document_timeout (float, optional): 문서별 처리 시간 제한(초)
+            poll_interval (float): 완료/시간 초과 확인 주기(초)
+        """
+        self.process_fn = process_fn
+        self.max_workers = max(1, max_workers)
+        self.document_timeout = document_timeout
+        self.poll_interval = poll_interval
+
+    def run(
+        self,
+        items: Iterable[Any],
+        on_result: Callable[[Any, Any, Optional[BaseException]], None],
+    ):
+        """
+        문서들을 처리하고 완료될 때마다 on_result(item, result, error)를 호출
+
+        시간 제한을 넘긴 문서는 DocumentTimeoutError로 보고됩니다.
+        파이썬 스레드는 강제로 종료할 수 없으므로 해당 작업은 진행 중인 요청이 끝나고
+        다음 마감 확인 지점에서 종료되며 그 결과는 무시됩니다.
+
+        Args:
+            items (Iterable): 처리할 문서 목록
+            on_result (Callable): 문서별 결과 콜백
+
+        Returns:
+            Dict[str, Any]: 성공/실패/시간 초과 건수와 총 소요 시간
+        """
+        items = list(items)
+        total = len(items)
+        summary = {"total": total, "succeeded": 0, "failed": 0, "timed_out": 0}
+        if not items:
+            summary["elapsed"] = 0.0
+            return summary
+
+        started_at = {}
+        started_lock = threading.Lock()
+
+        def run_item(index):
+            with started_lock:
+                started_at[index] = time.monotonic()
+            deadline = None
+            if self.document_timeout is not None:
+                deadline = started_at[index] + self.document_timeout
+            token = _deadline.set(deadline)
+            try:
+                return self.process_fn(items[index])
+            finally:
+                _deadline.reset(token)
+
+        run_started = time.monotonic()
+        durations = []
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending = {
+                executor.submit(run_item, index): index for index in range(total)
+            }
+
+            while pending:
+                done, _ = wait(
+                    pending, timeout=self.poll_interval, return_when=FIRST_COMPLETED
+                )
+
+                for future in done:
+                    index = pending.pop(future)
+                    durations.append(time.monotonic() - started_at[index])
+                    error = future.exception()
+                    if error is None:
+                        summary["succeeded"] += 1
+                        on_result(items[index], future.result(), None)
+                    else:
+                        summary["failed"] += 1
+                        on_result(items[index], None, error)
+                    self._report_progress(summary, durations, run_started)
+
+                if self.document_timeout is None:
+                    continue
+
+                # 시간 제한을 넘긴 문서는 실패로 처리하고 결과를 더 기다리지 않음
+                now = time.monotonic()
+                with started_lock:
+                    expired = [
+                        future
+                        for future, index in pending.items()
+                        if index in started_at
+                        and now - started_at[index] > self.document_timeout
+                    ]
+                for future in expired:
+                    index = pending.pop(future)
+                    durations.append(now - started_at[index])
+                    summary["timed_out"] += 1
+                    on_result(
+                        items[index],
+                        None,
+                        DocumentTimeoutError(
+                            f"문서 처리 시간 초과 ({self.document_timeout}초)"
+                        ),
+                    )
+                    self._report_progress(summary, durations, run_started)
+        finally:
+            # 시간 초과로 남은 작업은 기다리지 않음
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        summary["elapsed"] = time.monotonic() - run_started
+        logger.info(
+            f"문서 처리 완료: 성공 {summary['succeeded']}, 실패 {summary['failed']}, "
+            f"시간 초과 {summary['timed_out']} / 총 {total}개 "
+            f"({summary['elapsed']:.1f}초)"
+        )
+        return summary
+
+    def _report_progress(self, summary, durations, run_started):
+        """진행률과 남은 예상 시간을 로깅"""
+        finished = summary["succeeded"] + summary["failed"] + summary["timed_out"]
+        remaining = summary["total"] - finished
+        average = sum(durations) / len(durations)
+        eta = remaining * average / self.max_workers
+        elapsed = time.monotonic() - run_started
+        logger.info(
+            f"진행: {finished}/{summary['total']} "
+            f"(성공 {summary['succeeded']}, 실패 {summary['failed']}, "
+            f"시간 초과 {summary['timed_out']}) | "
+            f"문서당 평균 {average:.1f}초 | 경과 {elapsed:.0f}초 | "
+            f"남은 예상 시간 {eta:.0f}초"
+        )
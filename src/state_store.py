@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, Tuple, Set
+
+# 상태 컬럼으로 관리하는 처리 여부 플래그
+STATUS_FLAGS = ("parsing_processed", "vectorstore_processed")
+
+
+class StateStore:
+    """
+    SQLite 기반의 문서별 처리 상태 저장소
+
+    - 문서 하나의 상태만 원자적으로 갱신(upsert)하므로 전체 파일을 다시 쓰지 않음
+    - 처리 여부 플래그는 컬럼으로 저장하여 상태별 조회가 가능
+    - 요약/마크다운 등 나머지 상태는 JSON으로 저장하고 커서로 스트리밍 조회
+    - 기존 processed_states.json에서 마이그레이션 지원
+    """
+
+    def __init__(self, path: str):
+        """
+        저장소 초기화
+
+        Args:
+            path (str): SQLite 파일 경로
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                filename TEXT PRIMARY KEY,
+                parsing_processed INTEGER NOT NULL DEFAULT 0,
+                vectorstore_processed INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        for flag in STATUS_FLAGS:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_documents_{flag} ON documents ({flag})"
+            )
+        self._conn.commit()
+
+    @staticmethod
+    def _split(state: Dict[str, Any]) -> Tuple[Dict[str, bool], Dict[str, Any]]:
+        """상태를 플래그와 나머지 필드로 분리"""
+        flags = {flag: bool(state[flag]) for flag in STATUS_FLAGS if flag in state}
+        fields = {key: value for key, value in state.items() if key not in flags}
+        return flags, fields
+
+    @staticmethod
+    def _join(row) -> Dict[str, Any]:
+        """조회한 행을 상태 딕셔너리로 변환"""
+        parsing_processed, vectorstore_processed, state = row
+        state = json.loads(state)
+        state["parsing_processed"] = bool(parsing_processed)
+        state["vectorstore_processed"] = bool(vectorstore_processed)
+        return state
+
+    def _upsert(self, filename: str, state: Dict[str, Any], now: float):
+        """트랜잭션 안에서 기존 상태와 병합하여 저장 (잠금은 호출자가 보유)"""
+        row = self._conn.execute(
+            "SELECT parsing_processed, vectorstore_processed, state "
+            "FROM documents WHERE filename = ?",
+            (filename,),
+        ).fetchone()
+
+        flags, fields = self._split(state)
+        if row is not None:
+            merged = self._join(row)
+            merged.update(state)
+            flags, fields = self._split(merged)
+
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO documents
+                (filename, parsing_processed, vectorstore_processed, state, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                filename,
+                int(flags.get("parsing_processed", False)),
+                int(flags.get("vectorstore_processed", False)),
+                json.dumps(fields, ensure_ascii=False),
+                now,
+            ),
+        )
+
+    def upsert(self, filename: str, state: Dict[str, Any]):
+        """
+        문서 상태를 기존 상태와 병합하여 원자적으로 저장
+
+        Args:
+            filename (str): PDF 파일 이름
+            state (Dict[str, Any]): 저장할 상태 (기존 키는 덮어씀)
+        """
+        with self._lock, self._conn:
+            self._upsert(filename, state, time.time())
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        문서 상태 조회
+
+        Args:
+            filename (str): PDF 파일 이름
+
+        Returns:
+            Optional[Dict[str, Any]]: 저장된 상태 (없으면 None)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parsing_processed, vectorstore_processed, state "
+                "FROM documents WHERE filename = ?",
+                (filename,),
+            ).fetchone()
+        return None if row is None else self._join(row)
+
+    def __contains__(self, filename: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM documents WHERE filename = ?", (filename,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def filenames(self, **flags: bool) -> Set[str]:
+        """
+        조건에 맞는 문서 이름 목록 조회 (상태 본문은 읽지 않음)
+
+        Args:
+            **flags: 처리 여부 조건 (예: vectorstore_processed=True)
+
+        Returns:
+            Set[str]: 문서 이름 집합
+        """
+        condition, params = self._where(flags)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT filename FROM documents WHERE {condition}", params
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def status_counts(self) -> Dict[str, int]:
+        """
+        처리 상태별 문서 수 조회
+
+        Returns:
+            Dict[str, int]: 전체 문서 수와 플래그별 문서 수
+        """
+        with self._lock:
+            total, parsed, vectorized = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(parsing_processed), 0), "
+                "COALESCE(SUM(vectorstore_processed), 0) FROM documents"
+            ).fetchone()
+        return {
+            "total": total,
+            "parsing_processed": parsed,
+            "vectorstore_processed": vectorized,
+        }
+
+    def iter_states(
+        self, batch_size: int = 100, **flags: bool
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        문서 상태를 batch_size개씩 읽어 하나씩 반환 (전체를 메모리에 올리지 않음)
+
+        Args:
+            batch_size (int): 한 번에 읽을 행 수
+            **flags: 처리 여부 조건 (예: parsing_processed=True)
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: (문서 이름, 상태)
+        """
+        condition, params = self._where(flags)
+        last_filename = ""
+        while True:
+            # 키셋 페이지네이션으로 다음 batch_size개를 읽음
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT filename, parsing_processed, vectorstore_processed, state "
+                    f"FROM documents WHERE {condition} AND filename > ? "
+                    "ORDER BY filename LIMIT ?",
+                    (*params, last_filename, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], self._join(row[1:])
+            last_filename = rows[-1][0]
+
+    @staticmethod
+    def _where(flags: Dict[str, bool]) -> Tuple[str, tuple]:
+        """플래그 조건을 WHERE 조건식과 파라미터로 변환"""
+        unknown = set(flags) - set(STATUS_FLAGS)
+        if unknown:
+            raise ValueError(f"알 수 없는 상태 플래그: {unknown}")
+        if not flags:
+            return "1 = 1", ()
+        condition = " AND ".join(f"{flag} = ?" for flag in flags)
+        return condition, tuple(int(value) for value in flags.values())
+
+    def delete(self, filename: str) -> bool:
+        """
+        문서 상태 삭제
+
+        Args:
+            filename (str): PDF 파일 이름
+
+        Returns:
+            bool: 상태가 존재해 삭제되었는지 여부
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM documents WHERE filename = ?", (filename,)
+            )
+        return cursor.rowcount > 0
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        기존 processed_states.json의 상태를 한 트랜잭션으로 가져옴
+
+        이미 저장소에 있는 문서는 JSON의 값과 병합됩니다. 원본 JSON 파일은 그대로 둡니다.
+
+        Args:
+            json_path (str): processed_states.json 경로
+
+        Returns:
+            int: 가져온 문서 수
+        """
+        with open(json_path, "r", encoding="utf-8") as f:
+            states = json.load(f)
+
+        now = time.time()
+        with self._lock, self._conn:
+            for filename, state in states.items():
+                self._upsert(filename, state, now)
+        return len(states)
+
+    def close(self):
+        """WAL 내용을 본 파일에 반영하고 연결 종료 (파일 복사/업로드 전에 호출)"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+
+def open_state_store(persist_directory: str = "./data/vectordb") -> StateStore:
+    """
+    벡터스토어 디렉토리의 상태 저장소를 열고, 비어 있으면 기존 JSON에서 마이그레이션
+
+    Args:
+        persist_directory (str): 벡터스토어 저장 경로
+
+    Returns:
+        StateStore: 상태 저장소
+    """
+    store = StateStore(str(Path(persist_directory) / "processed_states.sqlite3"))
+    json_path = Path(persist_directory) / "processed_states.json"
+    if len(store) == 0 and json_path.exists():
+        count = store.migrate_from_json(str(json_path))
+        print(f"processed_states.json에서 {count}개 문서 상태를 마이그레이션했습니다.")
+    return store
@@ -0,0 +1,200 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Dict, Callable, Iterable
+
+# 조사/어미 제거 후 남아야 하는 최소 어간 길이 (예: "나이"가 "나"로 잘리지 않도록)
+MIN_STEM_LENGTH = 2
+
+# 한글 어절 뒤에 붙는 조사 (긴 것부터 비교하므로 순서는 상관없음)
+JOSA = (
+    "에서부터 으로부터 으로서는 으로써는 에서는 에서도 에서의 에게서 으로는 으로도 "
+    "으로의 으로서 으로써 까지는 까지도 부터는 부터도 보다는 이라는 이라고 이라며 "
+    "에게는 처럼 만큼 마저 조차 까지 부터 보다 에서 에게 한테 으로 에는 에도 와의 "
+    "과의 로의 로는 로도 로서 로써 라는 라고 라며 이며 이고 이나 이란 이다 이자 께서 "
+    "은 는 이 가 을 를 의 에 로 와 과 도 만 나 란 며 고"
+).split()
+
+# 서술어 어미 (명사 + 하다/되다 형태의 동사를 명사 어간으로 줄임)
+EOMI = (
+    "하였습니다 되었습니다 했습니다 됐습니다 합니다 됩니다 입니다 하였으며 되었으며 "
+    "했으며 됐으며 하였고 되었고 하였다 되었다 했다 됐다 하며 되며 하고 되고 하는 "
+    "되는 하여 되어 해서 돼서 하면 되면 할 될 한 된 함 됨 습니다 였다 였으며 이었다 "
+    "이었으며"
+).split()
+
+# 앞 글자의 받침 유무에 따라 붙는 조사 (예: "전망이"는 조사, "디스플레이"의 "이"는 조사가 아님)
+AFTER_BATCHIM = {"이", "을", "은", "과"}
+AFTER_VOWEL = {"가", "를", "는", "와"}
+# "로"로 시작하는 조사는 받침이 없거나 ㄹ 받침 뒤에만 붙음
+RIEUL = 8
+
+# 조사와 같은 글자로 끝나는 명사 (복합명사 끝에 오면 조사로 잘못 떼지 않도록 보호)
+PROTECTED_ENDINGS = tuple(
+    (
+        "주가 물가 원가 단가 유가 종가 시가 고가 저가 호가 평가 증가 대가 "
+        "결과 효과 성과 초과 통과 부과 "
+        "한도 정도 제도 속도 강도 시도 의도 태도 온도 용도 빈도 연도 년도 "
+        "재고 최고 광고 보고 참고 신고 잔고 경고 미만 불만 회의 논의 합의"
+    ).split()
+)
+
+# 조사/어미 자체만으로 이루어진 토큰은 검색에 쓸모가 없으므로 제거
+STOPWORDS = set(JOSA) | set(EOMI) | {"및", "등", "또한", "그리고", "하지만", "그러나"}
+
+# 한글 어절, 영문/숫자(소수점 포함)를 각각 하나의 토큰 후보로 추출
+TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+(?:\.[0-9]+)?")
+
+_SUFFIXES = sorted(set(JOSA) | set(EOMI), key=len, reverse=True)
+
+
+def normalize(text: str) -> str:
+    """토큰화 전 텍스트 정규화 (유니코드 NFKC, 소문자 변환)"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _final_consonant(char: str) -> int:
+    """한글 음절의 받침 인덱스 (0이면 받침 없음)"""
+    return (ord(char) - ord("가")) % 28
+
+
+def _josa_fits(stem: str, suffix: str) -> bool:
+    """앞 글자의 받침으로 보아 suffix가 조사/어미로 붙을 수 있는지 여부"""
+    final = _final_consonant(stem[-1])
+    if suffix in AFTER_BATCHIM or suffix.startswith("으"):
+        return final != 0
+    if suffix in AFTER_VOWEL:
+        return final == 0
+    if suffix.startswith("로"):
+        return final in (0, RIEUL)
+    return True
+
+
+def strip_suffix(word: str) -> str:
+    """
+    한글 어절에서 조사/어미를 떼어낸 어간을 반환
+
+    가장 긴 접미사부터 비교하며, 어간이 MIN_STEM_LENGTH보다 짧아지거나 앞 글자의
+    받침과 맞지 않는 조사, PROTECTED_ENDINGS로 끝나는 어절은 떼지 않습니다. "삼성전자에서는"처럼 조사가 겹친 경우도
+    한 번에 제거됩니다.
+
+    Args:
+        word (str): 한글 어절
+
+    Returns:
+        str: 어간
+    """
+    if word.endswith(PROTECTED_ENDINGS):
+        return word
+    for suffix in _SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < MIN_STEM_LENGTH:
+            continue
+        stem = word[: -len(suffix)]
+        if _josa_fits(stem, suffix):
+            return stem
+    return word
+
+
+class WhitespaceTokenizer:
+    """공백 기준 토크나이저 (소문자 변환)"""
+
+    name = "whitespace"
+
+    def __call__(self, text: str) -> List[str]:
+        return text.lower().split()
+
+    def tokenize_batch(self, texts: Iterable[str]) -> List[List[str]]:
+        return [self(text) for text in texts]
+
+
+class KoreanTokenizer:
+    """
+    순수 파이썬 한국어 토크나이저
+
+    - 한글 어절에서 조사/어미를 제거해 "삼성전자의", "삼성전자는", "삼성전자를"을
+      모두 "삼성전자"로 만듦
+    - 영문/숫자는 그대로 하나의 토큰으로 사용
+    - 어절별 어간 추출 결과를 LRU 캐시에 저장 (같은 어절이 반복되는 문서/쿼리에 유리)
+    - 배치 토큰화 시 배치 안의 고유 어절만 한 번씩 처리
+    """
+
+    name = "korean"
+
+    def __init__(self, cache_size: int = 100_000):
+        """
+        Args:
+            cache_size (int): 어간 추출 결과 캐시 크기
+        """
+        self._stem = lru_cache(maxsize=cache_size)(self._stem_word)
+
+    @staticmethod
+    def _stem_word(word: str) -> str:
+        """어절 하나의 어간 (한글이 아니면 그대로, 불용어면 빈 문자열)"""
+        if word in STOPWORDS:
+            return ""
+        if "가" <= word[0] <= "힣":
+            return strip_suffix(word)
+        return word
+
+    def __call__(self, text: str) -> List[str]:
+        stems = (self._stem(word) for word in TOKEN_PATTERN.findall(normalize(text)))
+        return [stem for stem in stems if stem]
+
+    def tokenize_batch(self, texts: Iterable[str]) -> List[List[str]]:
+        """
+        여러 텍스트를 한 번에 토큰화
+
+        Args:
+            texts (Iterable[str]): 텍스트 리스트
+
+        Returns:
+            List[List[str]]: 텍스트 순서대로의 토큰 리스트
+        """
+        words = [TOKEN_PATTERN.findall(normalize(text)) for text in texts]
+        stems = {word: self._stem(word) for word in set().union(*words)}
+        return [[stems[word] for word in text if stems[word]] for text in words]
+
+    def cache_info(self):
+        """어간 추출 캐시 적중/실패 통계"""
+        return self._stem.cache_info()
+
+
+# 토크나이저 이름 -> 생성 함수 (BM25 인덱스는 이 이름을 기록하여 쿼리와 같은 토크나이저를 사용)
+TOKENIZERS: Dict[str, Callable[[], Callable[[str], List[str]]]] = {
+    WhitespaceTokenizer.name: WhitespaceTokenizer,
+    KoreanTokenizer.name: KoreanTokenizer,
+}
+
+_instances: Dict[str, Callable[[str], List[str]]] = {}
+
+
+def register_tokenizer(name: str, factory: Callable[[], Callable[[str], List[str]]]):
+    """
+    토크나이저 등록
+
+    Args:
+        name (str): 토크나이저 이름
+        factory (Callable): 인자 없이 토크나이저를 만드는 함수. 토크나이저는 텍스트를
+            받아 토큰 리스트를 반환하고 tokenize_batch 메서드를 가져야 합니다.
+    """
+    TOKENIZERS[name] = factory
+    _instances.pop(name, None)
+
+
+def get_tokenizer(name: str) -> Callable[[str], List[str]]:
+    """
+    이름으로 토크나이저 반환 (프로세스 안에서 하나의 인스턴스와 캐시를 공유)
+
+    Args:
+        name (str): 토크나이저 이름
+
+    Returns:
+        Callable[[str], List[str]]: 토크나이저
+    """
+    if name not in _instances:
+        if name not in TOKENIZERS:
+            raise ValueError(
+                f"알 수 없는 토크나이저: {name} (사용 가능: {list(TOKENIZERS)})"
+            )
+        _instances[name] = TOKENIZERS[name]()
+    return _instances[name]
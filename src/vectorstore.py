@@ -1,15 +1,190 @@
 from dotenv import load_dotenv
 import os
-import json
+import shutil
+import hashlib
+import threading
 import chromadb
 from tqdm import tqdm
 from pathlib import Path
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
+from src.state_store import open_state_store
+from src.embeddings import load_embeddings, open_embedding_cache
+from src.bm25_index import (
+    BM25Index,
+    BM25_MIN_CHARS,
+    build_from_collection,
+    open_bm25_index,
+)
+
+
+def document_id(source: Any, doc_type: Any, index: Any, content: str) -> str:
+    """
+    문서의 결정적 ID 생성
+
+    같은 문서(source), 타입(type), 위치(index), 내용이면 항상 같은 ID가 생성되므로
+    다시 저장해도 벡터가 중복되지 않습니다.
+
+    Args:
+        source (Any): 원본 파일 이름
+        doc_type (Any): 문서 타입 (text_summary, table_markdown 등)
+        index (Any): 원본 안에서의 위치 (페이지 번호, 요소 ID 등)
+        content (str): 문서 내용
+
+    Returns:
+        str: SHA-256 기반 문서 ID
+    """
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    key = "\0".join(
+        "" if value is None else str(value)
+        for value in (source, doc_type, index, content_hash)
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def assign_document_ids(documents: List[Document]) -> List[str]:
+    """
+    문서 리스트의 결정적 ID 생성
+
+    metadata에 index가 없는 문서(예: PDF 청크)는 같은 (source, type) 안에서의
+    순서를 index로 사용합니다.
+
+    Args:
+        documents (List[Document]): 문서 리스트
+
+    Returns:
+        List[str]: 문서 순서대로의 ID 리스트
+    """
+    ordinals = {}
+    ids = []
+    for document in documents:
+        metadata = document.metadata
+        group = (metadata.get("source"), metadata.get("type"))
+        ordinal = ordinals.get(group, 0)
+        ordinals[group] = ordinal + 1
+        ids.append(
+            document_id(
+                group[0],
+                group[1],
+                metadata.get("index", ordinal),
+                document.page_content,
+            )
+        )
+    return ids
+
+
+class CollectionRegistry:
+    """
+    하나의 Chroma 클라이언트로 컬렉션별 벡터스토어를 관리하는 레지스트리
+
+    - 컬렉션별 Chroma 래퍼는 처음 사용할 때 한 번만 생성하고 재사용
+    - 여러 쿼리를 한 번에 임베딩하고 컬렉션마다 한 번의 쿼리로 검색
+    """
+
+    def __init__(self, client, embedding):
+        """
+        레지스트리 초기화
+
+        Args:
+            client: chromadb 클라이언트
+            embedding: LangChain 임베딩 객체
+        """
+        self.client = client
+        self.embedding = embedding
+        self._vectorstores: Dict[str, Chroma] = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection_name: str) -> Chroma:
+        """
+        컬렉션의 벡터스토어 반환 (없으면 컬렉션과 함께 생성)
+
+        Args:
+            collection_name (str): 컬렉션 이름
+
+        Returns:
+            Chroma: 컬렉션의 벡터스토어
+        """
+        with self._lock:
+            vectorstore = self._vectorstores.get(collection_name)
+            if vectorstore is None:
+                vectorstore = Chroma(
+                    client=self.client,
+                    collection_name=collection_name,
+                    embedding_function=self.embedding,
+                )
+                self._vectorstores[collection_name] = vectorstore
+            return vectorstore
+
+    def count(self, collection_name: str) -> int:
+        """
+        컬렉션의 벡터 수 반환
+
+        Args:
+            collection_name (str): 컬렉션 이름
+
+        Returns:
+            int: 벡터 수
+        """
+        return self.get(collection_name)._collection.count()
+
+    def similarity_search_many(
+        self,
+        queries: List[str],
+        collection_names: List[str],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Document]]:
+        """
+        여러 쿼리를 여러 컬렉션에서 한 번에 검색
+
+        쿼리 임베딩은 한 번의 배치로 계산하고, 컬렉션마다 모든 쿼리를 한 번의
+        요청으로 검색한 뒤 쿼리별로 거리가 가까운 순서대로 k개를 반환합니다.
+
+        Args:
+            queries (List[str]): 검색 쿼리 리스트
+            collection_names (List[str]): 검색할 컬렉션 이름 리스트
+            k (int): 쿼리별 반환할 결과 개수
+            filter (dict, optional): 메타데이터 필터
+
+        Returns:
+            List[List[Document]]: 쿼리 순서대로의 검색 결과
+        """
+        if not queries:
+            return []
+
+        # ko-sbert는 쿼리와 문서를 같은 방식으로 임베딩하므로 배치 임베딩을 사용
+        query_embeddings = self.embedding.embed_documents(queries)
+        scored: List[List[Tuple[float, Document]]] = [[] for _ in queries]
+        for collection_name in collection_names:
+            results = self.get(collection_name)._collection.query(
+                query_embeddings=query_embeddings,
+                n_results=k,
+                where=filter,
+                include=["documents", "metadatas", "distances"],
+            )
+            for index in range(len(queries)):
+                for doc_id, content, metadata, distance in zip(
+                    results["ids"][index],
+                    results["documents"][index],
+                    results["metadatas"][index],
+                    results["distances"][index],
+                ):
+                    scored[index].append(
+                        (
+                            distance,
+                            Document(
+                                page_content=content, metadata=metadata or {}, id=doc_id
+                            ),
+                        )
+                    )
+
+        return [
+            [document for _, document in sorted(hits, key=lambda hit: hit[0])[:k]]
+            for hits in scored
+        ]
 
 
 class VectorStore:
@@ -18,6 +193,7 @@ class VectorStore:
         persist_directory: str,
         collection_name: str = "pdf_collection",
         model_name: str = "jhgan/ko-sbert-sts",
+        bm25_index: Optional[BM25Index] = None,
     ):
         """
         벡터스토어 초기화
@@ -26,24 +202,52 @@ class VectorStore:
             persist_directory (str): 벡터스토어를 저장할 디렉토리 경로
             collection_name (str): 사용할 컬렉션 이름 (기본값: "pdf_collection")
             model_name (str): HuggingFace 임베딩 모델 이름
+            bm25_index (BM25Index, optional): 문서를 저장할 때 함께 갱신할 BM25 인덱스
         """
         # .env 파일 로드
         load_dotenv()
 
         self.persist_directory = persist_directory
-        self.embedding = HuggingFaceEmbeddings(
-            model_name=model_name,
-        )
+        self.bm25_index = bm25_index
+        # EMBEDDING_BACKEND 환경 변수로 torch/onnx/onnx-int8 백엔드 선택
+        self.embedding = load_embeddings(model_name)
+        # 같은 텍스트는 다시 임베딩하지 않도록 내용 해시 기반 디스크 캐시 적용
+        self.embedding = open_embedding_cache(self.embedding, model_name)
 
         # Chroma 클라이언트 설정
         self.client = chromadb.PersistentClient(path=persist_directory)
 
-        # Langchain Chroma 벡터스토어 초기화
-        self.vectorstore = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=self.embedding,
-            client=self.client,
+        # 컬렉션별 벡터스토어는 레지스트리에서 한 번만 생성해 재사용
+        self.collection_name = collection_name
+        self.collections = CollectionRegistry(self.client, self.embedding)
+        self.vectorstore = self.collections.get(collection_name)
+
+        # BM25 인덱스가 아직 없으면 증분 갱신 전에 기존 컬렉션 전체로 먼저 생성
+        if bm25_index is not None and not bm25_index.exists():
+            self._bootstrap_bm25_index()
+
+    def _bootstrap_bm25_index(self):
+        """
+        기존 컬렉션의 문서로 BM25 인덱스 생성
+
+        인덱스 없이 증분 갱신을 시작하면 이번 실행에서 저장한 문서만 인덱스에 들어가므로,
+        컬렉션에 이미 저장된 문서를 먼저 모두 넣습니다. 도중에 실패하면 일부만 담긴
+        인덱스가 남지 않도록 인덱스 디렉토리를 지우고 다음 실행에서 다시 만듭니다.
+        """
+        collection = self.vectorstore._collection
+        if collection.count() == 0:
+            return
+
+        print(
+            f"BM25 인덱스 생성: {self.bm25_index.directory} "
+            f"(컬렉션 '{self.collection_name}' 문서 {collection.count()}개)"
         )
+        try:
+            result = build_from_collection(self.bm25_index, collection)
+        except Exception:
+            shutil.rmtree(self.bm25_index.directory, ignore_errors=True)
+            raise
+        print(f"BM25 인덱스 생성 완료: {result}")
 
     @staticmethod
     def load_pdf(filepath: str, chunk_size: int = 1000, chunk_overlap: int = 30):
@@ -69,49 +273,120 @@ class VectorStore:
 
         return text_splitter.split_documents(pages)
 
+    def _get_vectorstore(self, collection_name: Optional[str] = None) -> Chroma:
+        """컬렉션 이름에 해당하는 Chroma 벡터스토어 반환 (없으면 생성)"""
+        return self.collections.get(collection_name or self.collection_name)
+
+    def upsert_documents(
+        self,
+        documents: List[Document],
+        collection_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        결정적 ID로 문서를 저장 (여러 번 실행해도 중복되지 않음)
+
+        - ID는 (source, type, index, 내용 해시)로 생성
+        - 이미 같은 ID가 저장된 문서는 임베딩/저장을 건너뜀
+        - 이번에 저장하는 (source, type)의 기존 벡터 중 새 문서에 없는 것은 삭제
+        - 새 문서는 batch_size개씩 나누어 저장
+
+        Args:
+            documents (List[Document]): 저장할 문서 리스트
+            collection_name (str, optional): 컬렉션 이름
+            batch_size (int, optional): 한 번에 저장할 문서 수 (기본값: 클라이언트 최대 배치 크기)
+
+        Returns:
+            Dict[str, int]: 추가/건너뜀/삭제된 문서 수
+        """
+        vectorstore = self._get_vectorstore(collection_name)
+        batch_size = batch_size or min(self.client.max_batch_size, 5000)
+
+        # 같은 ID의 문서는 하나만 남김
+        unique = dict(zip(assign_document_ids(documents), documents))
+
+        # 원본 파일별로 기존 벡터의 ID와 타입을 한 번에 조회
+        groups: Dict[Any, set] = {}
+        for document in unique.values():
+            groups.setdefault(document.metadata.get("source"), set()).add(
+                document.metadata.get("type")
+            )
+
+        existing_ids = set()
+        stale_ids = []
+        for source, types in groups.items():
+            where = {"source": source} if source is not None else None
+            existing = vectorstore.get(where=where, include=["metadatas"])
+            for existing_id, metadata in zip(existing["ids"], existing["metadatas"]):
+                if (metadata or {}).get("type") not in types:
+                    continue
+                if existing_id in unique:
+                    existing_ids.add(existing_id)
+                else:
+                    stale_ids.append(existing_id)
+
+        new_items: List[Tuple[str, Document]] = [
+            (doc_id, document)
+            for doc_id, document in unique.items()
+            if doc_id not in existing_ids
+        ]
+        for start in range(0, len(new_items), batch_size):
+            batch = new_items[start : start + batch_size]
+            vectorstore.add_documents(
+                [document for _, document in batch],
+                ids=[doc_id for doc_id, _ in batch],
+            )
+
+        for start in range(0, len(stale_ids), batch_size):
+            vectorstore.delete(ids=stale_ids[start : start + batch_size])
+
+        # 기본 컬렉션의 문서는 같은 ID로 BM25 인덱스에도 반영
+        if self.bm25_index is not None and vectorstore is self.vectorstore:
+            self.bm25_index.upsert_documents(
+                list(unique.values()), list(unique), min_chars=BM25_MIN_CHARS
+            )
+
+        return {
+            "added": len(new_items),
+            "skipped": len(existing_ids),
+            "deleted": len(stale_ids),
+        }
+
     def add_documents(
         self, documents: List[Document], collection_name: Optional[str] = None
     ):
         """
-        문서를 벡터스토어에 추가
+        문서를 벡터스토어에 추가 (결정적 ID로 upsert하므로 다시 실행해도 중복되지 않음)
 
         Args:
             documents (List[Document]): 추가할 문서 리스트
             collection_name (str, optional): 컬렉션 이름
         """
         try:
-            if collection_name:
-                try:
-                    # 기존 컬렉션이 있는지 확인
-                    existing_collection = self.client.get_collection(collection_name)
-                    vectorstore = Chroma(
-                        client=self.client,
-                        collection_name=collection_name,
-                        embedding_function=self.embedding,
-                    )
-                    vectorstore.add_documents(documents)
-                except ValueError:
-                    # 컬렉션이 없는 경우 새로 생성
-                    self.vectorstore = Chroma.from_documents(
-                        documents=documents,
-                        embedding=self.embedding,
-                        persist_directory=self.persist_directory,
-                        collection_name=collection_name,
-                        client=self.client,
-                    )
-            else:
-                self.vectorstore.add_documents(documents)
+            result = self.upsert_documents(documents, collection_name=collection_name)
+            print(
+                f"추가 {result['added']}개, 변경 없음 {result['skipped']}개, "
+                f"삭제 {result['deleted']}개"
+            )
 
             # persist() 메서드 호출 시도는 제거하고 저장 확인으로 대체
-            collection = self.client.get_collection(
-                collection_name if collection_name else "default"
-            )
-            doc_count = collection.count()
+            collection_name = collection_name or self.collection_name
+            doc_count = self.collections.count(collection_name)
             print(f"컬렉션 '{collection_name}' 저장 완료 (문서 수: {doc_count})")
 
         except Exception as e:
             print(f"저장 중 오류 발생: {str(e)}")
 
+    def embedding_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        임베딩 캐시 통계 반환
+
+        Returns:
+            Optional[Dict[str, Any]]: 캐시 통계 (캐시를 사용하지 않으면 None)
+        """
+        stats = getattr(self.embedding, "stats", None)
+        return stats() if stats else None
+
     def similarity_search(
         self, query: str, k: int = 4, collection_name: Optional[str] = None
     ):
@@ -126,16 +401,34 @@ class VectorStore:
         Returns:
             List[Document]: 검색된 문서 리스트
         """
-        if collection_name:
-            collection = self.client.get_collection(collection_name)
-            vectorstore = Chroma(
-                client=self.client,
-                collection_name=collection_name,
-                embedding_function=self.embedding,
-            )
-            return vectorstore.similarity_search(query, k=k)
+        return self._get_vectorstore(collection_name).similarity_search(query, k=k)
 
-        return self.vectorstore.similarity_search(query, k=k)
+    def similarity_search_many(
+        self,
+        queries: List[str],
+        k: int = 4,
+        collection_names: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Document]]:
+        """
+        여러 쿼리를 한 번에 유사도 검색
+
+        Args:
+            queries (List[str]): 검색 쿼리 리스트
+            k (int): 쿼리별 반환할 결과 개수
+            collection_names (List[str], optional): 검색할 컬렉션 이름 리스트
+                (기본값: 기본 컬렉션)
+            filter (dict, optional): 메타데이터 필터
+
+        Returns:
+            List[List[Document]]: 쿼리 순서대로의 검색 결과
+        """
+        return self.collections.similarity_search_many(
+            queries,
+            collection_names or [self.collection_name],
+            k=k,
+            filter=filter,
+        )
 
     def get_retriever(
         self, search_kwargs: Optional[Dict[str, Any]] = None, **kwargs
@@ -173,19 +466,13 @@ def process_pdf_directory(
     pdf_files = list(pdf_path.glob("*.pdf"))
     print(f"발견된 PDF 파일들: {[pdf.name for pdf in pdf_files]}")
 
-    processed_states_path = (
-        Path(vector_store.persist_directory) / "processed_states.json"
-    )
-    print(f"처리 상태 파일 경로: {processed_states_path.absolute()}")
-
-    # 처리된 상태 로드
-    processed_states = {}
-    if processed_states_path.exists():
-        with open(processed_states_path, "r", encoding="utf-8") as f:
-            processed_states = json.load(f)
+    # 문서별 처리 상태 저장소 (처음 실행 시 processed_states.json에서 마이그레이션)
+    state_store = open_state_store(vector_store.persist_directory)
+    print(f"처리 상태 저장소 경로: {Path(state_store.path).absolute()}")
 
     # 새로운 PDF 파일 찾기
-    new_pdf_files = [pdf for pdf in pdf_files if pdf.name not in processed_states]
+    processed_files = state_store.filenames()
+    new_pdf_files = [pdf for pdf in pdf_files if pdf.name not in processed_files]
 
     if not new_pdf_files:
         print("처리할 새로운 PDF 파일이 없습니다.")
@@ -200,27 +487,28 @@ def process_pdf_directory(
             vector_store.add_documents(
                 documents=documents, collection_name=collection_name
             )
-            # 벡터스토어 처리 상태만 기록
-            if pdf_path.name not in processed_states:
-                processed_states[pdf_path.name] = {"vectorstore_processed": True}
-            else:
-                processed_states[pdf_path.name]["vectorstore_processed"] = True
-
-            # 상태 저장
-            with open(processed_states_path, "w", encoding="utf-8") as f:
-                json.dump(processed_states, f, ensure_ascii=False, indent=2)
+            # 벡터스토어 처리 상태만 기록 (이 문서의 상태만 갱신)
+            state_store.upsert(pdf_path.name, {"vectorstore_processed": True})
 
             print(f"완료: {pdf_path}")
 
         except Exception as e:
             print(f"오류 발생 ({pdf_path}): {str(e)}")
 
+    print(f"임베딩 캐시: {vector_store.embedding_cache_stats()}")
+    state_store.close()
+
 
 # 파일이 직접 실행될 때만 실행되는 코드
 if __name__ == "__main__":
     # 절대 경로 사용
     current_dir = Path(__file__).parent.parent
-    vector_store = VectorStore(persist_directory=str(current_dir / "data" / "vectordb"))
+    vector_store = VectorStore(
+        persist_directory=str(current_dir / "data" / "vectordb"),
+        bm25_index=open_bm25_index(
+            str(current_dir / "data" / "vectordb" / "bm25_index")
+        ),
+    )
 
     # PDF 처리
     process_pdf_directory(